@@ -0,0 +1,190 @@
+import warnings
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .fragments import TEMPO_FRAGMENTOS, assinatura
+from .models import Aluno, Disciplina, Nota, Turma
+from .services import media_aprovacao
+
+BIMESTRES = ('1º', '2º', '3º', '4º')
+# Média de um aluno numa disciplina a mais de LIMITE_Z desvios da média da disciplina
+LIMITE_Z = 2.0
+MAX_ATIPICOS = 20
+# A análise depende de todas as notas, alunos, disciplinas e turmas: qualquer mudança gera outra
+ESCOPOS = ['notas', 'alunos', 'disciplinas', 'turmas']
+PREFIXO_CACHE = 'analise-notas:'
+
+
+class ErroAnalise(Exception):
+    pass
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ErroAnalise('Para a análise de notas instale o pacote numpy.')
+    return numpy
+
+
+def _numero(valor):
+    # NaN (coluna vazia, desvio de um valor só) vira None para o template e o JSON
+    valor = float(valor)
+    return None if valor != valor else valor
+
+
+def carregar_colunas(np):
+    """
+    Uma consulta só, com as notas de cada aluno nas disciplinas da própria turma.
+    Retorna (aluno_ids, disciplina_ids, turma_ids, notas), com notas em uma matriz
+    n x 4 e NaN onde a nota não foi lançada.
+    """
+    linhas = list(
+        Nota.objects.filter(aluno__turma_id=F('disciplina__turma_id'))
+        .order_by()
+        .values_list('aluno_id', 'disciplina_id', 'disciplina__turma_id', 'nota1', 'nota2', 'nota3', 'nota4')
+    )
+    # None -> NaN na conversão para float
+    matriz = np.array(linhas, dtype=float).reshape(-1, 7)
+    ids = matriz[:, :3].astype(np.int64)
+    return ids[:, 0], ids[:, 1], ids[:, 2], matriz[:, 3:]
+
+
+def _resumo_colunas(np, valores, media):
+    """Estatísticas de cada coluna de valores (NaN ignorado), em operações sobre a matriz toda."""
+    quantidade = (~np.isnan(valores)).sum(axis=0)
+    with warnings.catch_warnings():
+        # Colunas sem nenhuma nota resultam em NaN, sem aviso
+        warnings.simplefilter('ignore', RuntimeWarning)
+        medias = np.nanmean(valores, axis=0)
+        desvios = np.nanstd(valores, axis=0, ddof=1)
+        minimos = np.nanmin(valores, axis=0) if valores.size else np.full(valores.shape[1], np.nan)
+        maximos = np.nanmax(valores, axis=0) if valores.size else np.full(valores.shape[1], np.nan)
+        quartis = np.nanpercentile(valores, [25, 50, 75], axis=0) if valores.size else np.full((3, valores.shape[1]), np.nan)
+    aprovados = (valores >= media).sum(axis=0)
+    return [
+        {
+            'quantidade': int(quantidade[i]),
+            'media': _numero(medias[i]),
+            'desvio': _numero(desvios[i]),
+            'minimo': _numero(minimos[i]),
+            'p25': _numero(quartis[0, i]),
+            'mediana': _numero(quartis[1, i]),
+            'p75': _numero(quartis[2, i]),
+            'maximo': _numero(maximos[i]),
+            'aprovados': 100 * int(aprovados[i]) / int(quantidade[i]) if quantidade[i] else None,
+        }
+        for i in range(valores.shape[1])
+    ]
+
+
+def _correlacoes(np, notas):
+    """Correlação de Pearson entre cada par de bimestres, só com as linhas que têm as duas notas."""
+    preenchidas = ~np.isnan(notas)
+    matriz = [[1.0 if i == j else None for j in range(notas.shape[1])] for i in range(notas.shape[1])]
+    for i in range(notas.shape[1]):
+        for j in range(i + 1, notas.shape[1]):
+            ambas = preenchidas[:, i] & preenchidas[:, j]
+            x, y = notas[ambas, i], notas[ambas, j]
+            if x.size > 2 and x.std() > 0 and y.std() > 0:
+                matriz[i][j] = matriz[j][i] = float(np.corrcoef(x, y)[0, 1])
+    return matriz
+
+
+def _por_grupo(np, grupos, valores):
+    """Quantidade, média e desvio (amostral) de valores por grupo, com bincount. Retorna (chaves, inverso, n, média, desvio)."""
+    chaves, inverso = np.unique(grupos, return_inverse=True)
+    n = np.bincount(inverso, minlength=chaves.size)
+    soma = np.bincount(inverso, valores, minlength=chaves.size)
+    quadrados = np.bincount(inverso, valores ** 2, minlength=chaves.size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = soma / n
+        desvio = np.sqrt(np.maximum(quadrados - n * media ** 2, 0) / (n - 1))
+    desvio[n < 2] = np.nan
+    return chaves, inverso, n, media, desvio
+
+
+def calcular_analise(media=None):
+    """
+    Estatísticas da escola inteira calculadas com NumPy sobre as colunas nota1..nota4:
+    resumo por bimestre e da média, correlação entre bimestres, distribuição das médias,
+    resumo por turma e médias atípicas (z-score dentro da disciplina).
+    """
+    np = _numpy()
+    media = media_aprovacao() if media is None else media
+    aluno_ids, disciplina_ids, turma_ids, notas = carregar_colunas(np)
+
+    # Média de cada linha: a das notas lançadas, como Nota.media()
+    preenchidas = ~np.isnan(notas)
+    quantos = preenchidas.sum(axis=1)
+    com_media = quantos > 0
+    medias = np.where(preenchidas, notas, 0).sum(axis=1)[com_media] / quantos[com_media]
+    aluno_ids, disciplina_ids, turma_ids = aluno_ids[com_media], disciplina_ids[com_media], turma_ids[com_media]
+
+    contagens, _ = np.histogram(medias, bins=np.arange(11))
+    distribuicao = [
+        (inicio, int(n), 100 * int(n) / medias.size if medias.size else 0) for inicio, n in enumerate(contagens)
+    ]
+
+    chaves, _, n, media_turma, desvio_turma = _por_grupo(np, turma_ids, medias)
+    nomes_turmas = dict(Turma.objects.filter(id__in=chaves.tolist()).values_list('id', 'nome'))
+    turmas = sorted(
+        (
+            {'nome': nomes_turmas.get(int(t), ''), 'quantidade': int(q), 'media': _numero(m), 'desvio': _numero(d)}
+            for t, q, m, d in zip(chaves, n, media_turma, desvio_turma)
+        ),
+        key=lambda t: t['nome'],
+    )
+
+    _, inverso, _, media_disciplina, desvio_disciplina = _por_grupo(np, disciplina_ids, medias)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (medias - media_disciplina[inverso]) / desvio_disciplina[inverso]
+    z = np.nan_to_num(z, nan=0.0, posinf=0.0, neginf=0.0)
+    indices = np.flatnonzero(np.abs(z) >= LIMITE_Z)
+    indices = indices[np.argsort(-np.abs(z[indices]), kind='stable')][:MAX_ATIPICOS]
+    atipicos = []
+    if indices.size:
+        nomes_alunos = dict(
+            Aluno.objects.filter(id__in=aluno_ids[indices].tolist()).values_list('id', 'nome_completo')
+        )
+        disciplinas = {
+            d: (nome, turma) for d, nome, turma in
+            Disciplina.objects.filter(id__in=disciplina_ids[indices].tolist()).values_list('id', 'nome', 'turma__nome')
+        }
+        for i in indices:
+            nome_disciplina, nome_turma = disciplinas.get(int(disciplina_ids[i]), ('', ''))
+            atipicos.append({
+                'aluno': nomes_alunos.get(int(aluno_ids[i]), ''),
+                'disciplina': nome_disciplina,
+                'turma': nome_turma,
+                'media': float(medias[i]),
+                'media_disciplina': float(media_disciplina[inverso[i]]),
+                'z': float(z[i]),
+            })
+
+    return {
+        'media_aprovacao': media,
+        'notas': int(notas.shape[0]),
+        'geral': _resumo_colunas(np, medias.reshape(-1, 1), media)[0],
+        'bimestres': list(zip(BIMESTRES, _resumo_colunas(np, notas, media))),
+        'correlacoes': list(zip(BIMESTRES, _correlacoes(np, notas))),
+        'distribuicao': distribuicao,
+        'turmas': turmas,
+        'atipicos': atipicos,
+        'limite_z': LIMITE_Z,
+    }
+
+
+def analise_notas(media=None):
+    """
+    calcular_analise() guardada no cache até alguma nota, aluno, disciplina ou turma
+    mudar (versões dos escopos de core/fragments.py).
+    """
+    media = media_aprovacao() if media is None else media
+    chave = f'{PREFIXO_CACHE}{assinatura(ESCOPOS, str(media))}'
+    resultado = cache.get(chave)
+    if resultado is None:
+        resultado = calcular_analise(media)
+        cache.set(chave, resultado, TEMPO_FRAGMENTOS)
+    return resultado
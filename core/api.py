@@ -0,0 +1,150 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .backends import papel_do_usuario
+from .models import Aluno, Disciplina, Nota, Turma
+
+# Campos de cada recurso: nome na resposta -> campo no banco. ?campos=id,nome escolhe quais vêm.
+CAMPOS_TURMA = {'id': 'id', 'nome': 'nome'}
+CAMPOS_DISCIPLINA = {
+    'id': 'id', 'nome': 'nome', 'turma_id': 'turma_id', 'turma': 'turma__nome',
+    'professor_id': 'professor_id', 'professor': 'professor__nome_completo',
+}
+CAMPOS_ALUNO = {'id': 'id', 'nome_completo': 'nome_completo', 'idade': 'idade', 'turma_id': 'turma_id'}
+CAMPOS_NOTA = {
+    'id': 'id', 'aluno_id': 'aluno_id', 'aluno': 'aluno__nome_completo',
+    'disciplina_id': 'disciplina_id', 'disciplina': 'disciplina__nome',
+    'nota1': 'nota1', 'nota2': 'nota2', 'nota3': 'nota3', 'nota4': 'nota4', 'media': 'valor_media',
+}
+
+
+class ErroApi(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _erro(mensagem, status):
+    return JsonResponse({'erro': mensagem}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def api(view):
+    """Só GET/HEAD, usuário autenticado e erros em JSON (401, 403, 404, 400)."""
+    @require_safe
+    @wraps(view)
+    def envolvida(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _erro('Autenticação necessária.', 401)
+        try:
+            return view(request, papel_do_usuario(request.user), *args, **kwargs)
+        except ErroApi as e:
+            return _erro(str(e), e.status)
+        except Http404:
+            return _erro('Não encontrado.', 404)
+    return envolvida
+
+
+def _campos(request, disponiveis):
+    pedidos = [c.strip() for c in request.GET.get('campos', '').split(',') if c.strip()]
+    if not pedidos:
+        return disponiveis
+    desconhecidos = [c for c in pedidos if c not in disponiveis]
+    if desconhecidos:
+        raise ErroApi(f'Campos desconhecidos: {", ".join(desconhecidos)}. Disponíveis: {", ".join(disponiveis)}.')
+    return {c: disponiveis[c] for c in pedidos}
+
+
+def _negar():
+    raise ErroApi('Sem permissão.', 403)
+
+
+def resposta_json(request, queryset, campos):
+    """
+    Resposta com as linhas de queryset (só os campos pedidos) e ETag tirada delas mesmas:
+    qualquer mudança no banco muda a ETag, passe ou não pelos sinais (ex.: QuerySet.update()
+    ou outro processo). Se o cliente já tem essa versão (If-None-Match), volta 304 sem
+    montar o JSON.
+    """
+    valores = list(queryset.values_list(*campos.values()))
+    texto = repr((list(campos), valores))
+    etag = f'"{hashlib.md5(texto.encode(), usedforsecurity=False).hexdigest()}"'
+    resposta = get_conditional_response(request, etag=etag)
+    if resposta is None:
+        linhas = [dict(zip(campos, v)) for v in valores]
+        corpo = json.dumps(linhas, ensure_ascii=False, separators=(',', ':'))
+        resposta = HttpResponse(corpo, content_type='application/json')
+    resposta['ETag'] = etag
+    # O navegador guarda, mas confere a ETag a cada uso
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
+
+@api
+def turmas(request, papel):
+    campos = _campos(request, CAMPOS_TURMA)
+    qs = Turma.objects.order_by('nome', 'id')
+    if papel == 'professor':
+        qs = qs.filter(disciplina__professor=request.user.professor).distinct()
+    elif papel == 'aluno':
+        qs = qs.filter(id=request.user.aluno.turma_id)
+    elif papel not in ('super', 'gestor'):
+        _negar()
+    return resposta_json(request, qs, campos)
+
+
+@api
+def disciplinas(request, papel):
+    campos = _campos(request, CAMPOS_DISCIPLINA)
+    qs = Disciplina.objects.order_by('turma__nome', 'nome', 'id')
+    if papel == 'professor':
+        qs = qs.filter(professor=request.user.professor)
+    elif papel == 'aluno':
+        qs = qs.filter(turma_id=request.user.aluno.turma_id)
+    elif papel not in ('super', 'gestor'):
+        _negar()
+    return resposta_json(request, qs, campos)
+
+
+@api
+def alunos_da_turma(request, papel, turma_id):
+    campos = _campos(request, CAMPOS_ALUNO)
+    turma = get_object_or_404(Turma, id=turma_id)
+    if papel == 'professor':
+        if not Disciplina.objects.filter(turma=turma, professor=request.user.professor).exists():
+            _negar()
+    elif papel not in ('super', 'gestor'):
+        _negar()
+    qs = Aluno.objects.filter(turma=turma).order_by('nome_completo', 'id')
+    return resposta_json(request, qs, campos)
+
+
+@api
+def notas_da_disciplina(request, papel, disciplina_id):
+    campos = _campos(request, CAMPOS_NOTA)
+    disciplina = get_object_or_404(Disciplina, id=disciplina_id)
+    if papel == 'professor':
+        if disciplina.professor_id != request.user.professor.id:
+            _negar()
+    elif papel not in ('super', 'gestor'):
+        _negar()
+    qs = Nota.objects.filter(disciplina=disciplina).with_media().order_by('aluno__nome_completo', 'aluno_id')
+    return resposta_json(request, qs, campos)
+
+
+@api
+def notas_do_aluno(request, papel, aluno_id):
+    campos = _campos(request, CAMPOS_NOTA)
+    aluno = get_object_or_404(Aluno, id=aluno_id)
+    if papel == 'aluno':
+        if aluno.id != request.user.aluno.id:
+            _negar()
+    elif papel not in ('super', 'gestor'):
+        _negar()
+    qs = Nota.objects.filter(aluno=aluno).with_media().order_by('disciplina__nome', 'disciplina_id')
+    return resposta_json(request, qs, campos)
@@ -0,0 +1,107 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+
+# Larguras geradas para o srcset: os ícones dos painéis aparecem com 160px (1x, 2x e 3x)
+LARGURAS = (160, 320, 480)
+FORMATOS = ('avif', 'webp')
+QUALIDADE = 70
+PASTA_VARIANTES = 'core/img/otimizadas'
+MANIFESTO_VARIANTES = f'{PASTA_VARIANTES}/variantes.json'
+
+
+class ErroOtimizacao(Exception):
+    pass
+
+
+def _salvar(imagem, destino, formato, qualidade):
+    if formato == 'png':
+        imagem.save(destino, 'PNG', optimize=True)
+    elif formato == 'avif':
+        imagem.save(destino, 'AVIF', quality=qualidade)
+    else:
+        imagem.save(destino, 'WEBP', quality=qualidade, method=6)
+
+
+def gerar_variantes(pasta_estaticos, imagens, larguras=LARGURAS, qualidade=QUALIDADE):
+    """
+    Gera versões redimensionadas de cada imagem (caminhos relativos à pasta de
+    estáticos) em AVIF e WebP, mais um PNG reduzido para navegadores antigos, e grava
+    o manifesto usado pela tag {% imagem_responsiva %}. Retorna o manifesto.
+    """
+    try:
+        from PIL import Image, features
+    except ImportError:
+        raise ErroOtimizacao('Para otimizar as imagens instale o pacote Pillow.')
+
+    formatos = [f for f in FORMATOS if features.check(f)]
+    os.makedirs(os.path.join(pasta_estaticos, PASTA_VARIANTES), exist_ok=True)
+
+    manifesto = {}
+    for caminho in imagens:
+        with Image.open(os.path.join(pasta_estaticos, caminho)) as original:
+            original.load()
+        largura, altura = original.size
+        nome = os.path.splitext(os.path.basename(caminho))[0]
+
+        entrada = {'largura': largura, 'altura': altura, 'variantes': {}}
+        tamanhos = sorted({min(l, largura) for l in larguras})
+        for formato in formatos + ['png']:
+            # O PNG é só o fallback do <img>: basta o tamanho 2x
+            alvos = tamanhos if formato != 'png' else [tamanhos[min(1, len(tamanhos) - 1)]]
+            geradas = []
+            for alvo in alvos:
+                reduzida = original.resize((alvo, round(altura * alvo / largura)), Image.LANCZOS)
+                relativo = f'{PASTA_VARIANTES}/{nome}-{alvo}.{formato}'
+                _salvar(reduzida, os.path.join(pasta_estaticos, relativo), formato, qualidade)
+                geradas.append([alvo, relativo])
+            entrada['variantes'][formato] = geradas
+        manifesto[caminho] = entrada
+
+    with open(os.path.join(pasta_estaticos, MANIFESTO_VARIANTES), 'w', encoding='utf-8') as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    carregar_variantes.cache_clear()
+    return manifesto
+
+
+@lru_cache(maxsize=None)
+def carregar_variantes():
+    """Manifesto gerado por otimizar_estaticos ({} se ainda não foi gerado)."""
+    caminho = finders.find(MANIFESTO_VARIANTES)
+    if not caminho:
+        return {}
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+# Strings e url(...) passam intactas; comentários fora delas viram um espaço
+_STRING = r'"(?:\\.|[^"\\])*"|' r"'(?:\\.|[^'\\])*'"
+_TRECHOS = re.compile(rf'{_STRING}|url\(\s*(?:{_STRING}|[^)]*)\s*\)|/\*.*?\*/', re.S)
+_MARCADOR = re.compile(r'\x00(\d+)\x00')
+_ESPACOS = re.compile(r'\s+')
+_AO_REDOR = re.compile(r'\s*([{};,>])\s*')
+
+
+def minificar_css(css):
+    """
+    Minificação conservadora: remove comentários e espaços redundantes. Não mexe
+    em strings, url(...), espaços antes de ':' (seletores como 'a :hover') nem
+    dentro de calc().
+    """
+    preservados = []
+
+    def guardar(trecho):
+        if trecho.group().startswith('/*'):
+            return ' '
+        preservados.append(trecho.group())
+        return f'\x00{len(preservados) - 1}\x00'
+
+    css = _TRECHOS.sub(guardar, css)
+    css = _ESPACOS.sub(' ', css)
+    css = _AO_REDOR.sub(r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return _MARCADOR.sub(lambda m: preservados[int(m.group(1))], css.strip())
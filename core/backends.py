@@ -0,0 +1,76 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+
+# Relações um-para-um que definem o papel do usuário no sistema
+PAPEIS = ('professor', 'aluno', 'gestor')
+
+PAINEL_POR_PAPEL = {
+    'super': 'painel_super',
+    'professor': 'painel_professor',
+    'aluno': 'painel_aluno',
+    'gestor': 'painel_gestor',
+}
+
+
+class EmailBackend(ModelBackend):
+    """
+    Autentica pelo e-mail (indexado, sem diferenciar maiúsculas) numa única consulta,
+    que já traz professor, aluno e gestor. O mesmo vale para o usuário carregado da
+    sessão a cada requisição, então hasattr(user, 'professor') etc. não consultam o banco.
+    """
+
+    def _usuarios(self):
+        return User._default_manager.select_related(*PAPEIS)
+
+    @staticmethod
+    def por_email(queryset, email):
+        """Filtra pelo e-mail sem diferenciar maiúsculas, pelo índice único em LOWER(email) (migração 0014)."""
+        if not email:
+            return queryset.none()
+        return queryset.alias(email_minusculo=Lower('email')).filter(email_minusculo=email.lower())
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        user = self.por_email(self._usuarios(), email).first()
+        if user is None:
+            # Gera um hash mesmo assim, para o tempo de resposta não revelar se o e-mail existe
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        user = self._usuarios().filter(pk=user_id).first()
+        if user is not None and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def papel_do_usuario(user):
+    if user.is_superuser:
+        return 'super'
+    for papel in PAPEIS:
+        if hasattr(user, papel):
+            return papel
+    return None
+
+
+def _tem_papel(user, papel):
+    if papel == 'super':
+        return user.is_superuser
+    return papel in PAPEIS and not user.is_superuser and hasattr(user, papel)
+
+
+def papel_da_sessao(request):
+    """
+    Papel do usuário logado, guardado na sessão no login. O papel guardado é conferido
+    com o usuário da requisição, que o EmailBackend já traz com professor, aluno e
+    gestor (sem consulta): perfil criado ou removido depois do login é percebido.
+    """
+    papel = request.session.get('papel')
+    if papel is None or not _tem_papel(request.user, papel):
+        papel = request.session['papel'] = papel_do_usuario(request.user)
+    return papel
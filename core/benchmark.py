@@ -0,0 +1,89 @@
+import time
+from collections import namedtuple
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from . import urls
+
+PAPEIS = ('anonimo', 'super', 'gestor', 'professor', 'aluno')
+
+Medicao = namedtuple('Medicao', ['rota', 'papel', 'status', 'consultas', 'tempo_sql', 'tempo_total'])
+
+
+def rotas():
+    """Nome de todas as rotas do app core, na ordem de core/urls.py."""
+    return [p.name for p in urls.urlpatterns if isinstance(p, URLPattern) and p.name]
+
+
+def argumentos_da_rota(nome, dados):
+    """Preenche os parâmetros da rota com objetos dos usuários de exemplo de gerar_dados()."""
+    disciplina = dados.disciplinas[0]
+    aluno = dados.usuarios['aluno']
+    valores = {
+        'disciplina_id': disciplina.id,
+        'turma_id': disciplina.turma_id,
+        'professor_id': disciplina.professor_id,
+        'aluno_id': aluno.aluno.id,
+        'gestor_id': dados.gestores[0].id,
+        'formato': 'csv',
+        'uidb64': urlsafe_base64_encode(force_bytes(aluno.pk)),
+        'token': default_token_generator.make_token(aluno),
+    }
+    padrao = next(p for p in urls.urlpatterns if getattr(p, 'name', None) == nome)
+    return {chave: valores[chave] for chave in padrao.pattern.converters}
+
+
+def medir(cliente, url):
+    """
+    GET na url. Retorna (status, consultas, tempo SQL, tempo total). As respostas em
+    streaming são consumidas dentro da medição, já que as consultas rodam durante o envio.
+    """
+    inicio = time.perf_counter()
+    with CaptureQueriesContext(connection) as consultas:
+        resposta = cliente.get(url)
+        if resposta.streaming:
+            b''.join(resposta.streaming_content)
+    total = time.perf_counter() - inicio
+    tempo_sql = sum(float(c['time']) for c in consultas.captured_queries)
+    return resposta.status_code, len(consultas), tempo_sql, total
+
+
+def medir_rotas(dados, papeis=PAPEIS):
+    """
+    Acessa cada rota do app como cada papel e mede as consultas. Cada acesso roda com o
+    cache vazio (pior caso) e dentro de uma transação desfeita ao final, porque algumas
+    rotas (excluir_*) alteram dados mesmo via GET.
+    """
+    cliente = Client()
+    medicoes = []
+    for papel in papeis:
+        usuario = dados.usuarios.get(papel)
+        for nome in rotas():
+            url = reverse(nome, kwargs=argumentos_da_rota(nome, dados))
+            with transaction.atomic():
+                if usuario is None:
+                    cliente.logout()
+                else:
+                    cliente.force_login(usuario)
+                cache.clear()
+                status, consultas, tempo_sql, total = medir(cliente, url)
+                transaction.set_rollback(True)
+            medicoes.append(Medicao(nome, papel, status, consultas, tempo_sql, total))
+    return medicoes
+
+
+def formatar_relatorio(medicoes):
+    linhas = [f'{"rota":<28} {"papel":<10} {"status":>6} {"consultas":>9} {"SQL (ms)":>9} {"total (ms)":>10}']
+    for m in medicoes:
+        linhas.append(
+            f'{m.rota:<28} {m.papel:<10} {m.status:>6} {m.consultas:>9} '
+            f'{m.tempo_sql * 1000:>9.1f} {m.tempo_total * 1000:>10.1f}'
+        )
+    return '\n'.join(linhas)
@@ -0,0 +1,48 @@
+from django.core.cache import cache
+
+from .models import Aluno, Disciplina, Professor, Turma
+
+# nome do contador -> model contado; o contexto dos painéis usa total_<nome>
+MODELOS_CONTADOS = {
+    'professores': Professor,
+    'alunos': Aluno,
+    'turmas': Turma,
+    'disciplinas': Disciplina,
+}
+
+PREFIXO = 'contador:'
+
+# Os contadores expiram de tempos em tempos e são recontados, corrigindo qualquer desvio
+TEMPO_CONTADORES = 60 * 60
+
+
+def _chave(nome):
+    return f'{PREFIXO}{nome}'
+
+
+def totais_painel():
+    """Totais dos painéis lidos do cache; só conta no banco o que estiver faltando."""
+    valores = cache.get_many([_chave(nome) for nome in MODELOS_CONTADOS])
+    totais = {}
+    for nome, modelo in MODELOS_CONTADOS.items():
+        total = valores.get(_chave(nome))
+        if total is None:
+            total = modelo.objects.count()
+            cache.add(_chave(nome), total, TEMPO_CONTADORES)
+        totais[f'total_{nome}'] = total
+    return totais
+
+
+def ajustar_contador(modelo, delta):
+    for nome, contado in MODELOS_CONTADOS.items():
+        if contado is modelo:
+            try:
+                cache.incr(_chave(nome), delta)
+            except ValueError:
+                # Contador ainda não está no cache: o próximo painel reconta
+                pass
+
+
+def invalidar_contadores():
+    """Para cargas em lote (bulk_create não dispara sinais): força recontagem."""
+    cache.delete_many([_chave(nome) for nome in MODELOS_CONTADOS])
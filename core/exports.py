@@ -0,0 +1,174 @@
+import csv
+import os
+import tempfile
+from xml.sax.saxutils import escape
+
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import Nota
+from .workers import pool_de_processos
+
+TAMANHO_LOTE = 2000
+
+CABECALHO = ['Aluno', 'Turma', 'Disciplina', '1º', '2º', '3º', '4º', 'Média']
+CAMPOS = (
+    'aluno__nome_completo', 'disciplina__turma__nome', 'disciplina__nome',
+    'nota1', 'nota2', 'nota3', 'nota4', 'valor_media',
+)
+
+
+class ErroExportacao(Exception):
+    pass
+
+
+def linhas_notas(**filtros):
+    """
+    Tuplas (aluno, turma, disciplina, nota1..nota4, média) lidas do banco em blocos,
+    sem montar objetos Nota: a memória usada não depende do número de linhas.
+    """
+    notas = (
+        Nota.objects.filter(**filtros).with_media()
+        .order_by('disciplina__turma__nome', 'aluno__nome_completo', 'disciplina__nome', 'id')
+        .values_list(*CAMPOS)
+    )
+    return notas.iterator(chunk_size=TAMANHO_LOTE)
+
+
+def _formatar(valor):
+    # Planilhas em pt-BR esperam vírgula decimal
+    if isinstance(valor, float):
+        return f'{valor:.2f}'.replace('.', ',')
+    return '' if valor is None else valor
+
+
+class _Eco:
+    """Pseudo-arquivo: csv.writer escreve e o texto volta direto para a resposta."""
+
+    def write(self, valor):
+        return valor
+
+
+def _csv(linhas):
+    escritor = csv.writer(_Eco(), delimiter=';')
+    yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+    yield escritor.writerow(CABECALHO)
+    for linha in linhas:
+        yield escritor.writerow([_formatar(v) for v in linha])
+
+
+def escrever_xlsx(linhas, destino):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ErroExportacao('Para exportar .xlsx instale o pacote openpyxl.')
+
+    # write_only grava as linhas em disco à medida que chegam
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet('Notas')
+    aba.append(CABECALHO)
+    for linha in linhas:
+        aba.append(list(linha))
+    planilha.save(destino)
+
+
+def tabela_pdf(linhas, com_aluno=True):
+    """
+    Linhas da tabela do PDF. Sem com_aluno (boletim, um aluno só) fica só a disciplina;
+    a turma é a mesma em todas as exportações e vai no título.
+    """
+    if com_aluno:
+        yield ['Aluno', 'Disciplina', '1º', '2º', '3º', '4º', 'Média']
+    else:
+        yield ['Disciplina', '1º', '2º', '3º', '4º', 'Média']
+    for aluno, _, disciplina, *notas in linhas:
+        yield ([aluno] if com_aluno else []) + [disciplina] + [_formatar(n) or '-' for n in notas]
+
+
+def escrever_pdf(linhas, destino, titulo, com_aluno=True):
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+    except ImportError:
+        raise ErroExportacao('Para gerar o boletim em PDF instale o pacote reportlab.')
+
+    primeira_nota = 2 if com_aluno else 1
+    tabela = Table(list(tabela_pdf(linhas, com_aluno)), repeatRows=1)
+    tabela.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f3b57')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ALIGN', (primeira_nota, 0), (-1, -1), 'CENTER'),
+    ]))
+    SimpleDocTemplate(destino, pagesize=A4, title=titulo).build(
+        # Paragraph interpreta marcação: nomes com < ou & quebrariam o PDF
+        [Paragraph(escape(titulo), getSampleStyleSheet()['Title']), tabela]
+    )
+
+
+def resposta_exportacao(linhas, formato, nome_arquivo, titulo='', com_aluno=True):
+    """
+    Monta a resposta de download. CSV é gerado linha a linha durante o envio.
+    com_aluno=False tira a coluna do aluno do PDF (boletim).
+    """
+    if formato == 'csv':
+        resposta = StreamingHttpResponse(_csv(linhas), content_type='text/csv; charset=utf-8')
+        resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.csv"'
+        return resposta
+
+    if formato not in ('xlsx', 'pdf'):
+        raise ErroExportacao(f'Formato "{formato}" não suportado.')
+
+    # XLSX e PDF precisam do arquivo completo: são gravados num temporário e enviados em blocos
+    temporario = tempfile.TemporaryFile()
+    if formato == 'xlsx':
+        escrever_xlsx(linhas, temporario)
+    else:
+        escrever_pdf(linhas, temporario, titulo, com_aluno)
+    temporario.seek(0)
+    return FileResponse(temporario, as_attachment=True, filename=f'{nome_arquivo}.{formato}')
+
+
+# -------------------- BOLETINS EM LOTE --------------------
+def escrever_boletim(aluno_id, nome, pasta, formato):
+    linhas = linhas_notas(aluno_id=aluno_id)
+    caminho = os.path.join(pasta, f'boletim_{aluno_id}.{formato}')
+    if formato == 'csv':
+        with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+            arquivo.writelines(_csv(linhas))
+    elif formato == 'xlsx':
+        escrever_xlsx(linhas, caminho)
+    else:
+        escrever_pdf(linhas, caminho, f'Boletim - {nome}', com_aluno=False)
+    return caminho
+
+
+def _escrever_boletins(alunos, pasta, formato):
+    # Executado em cada processo de trabalho
+    return [escrever_boletim(aluno_id, nome, pasta, formato) for aluno_id, nome in alunos]
+
+
+def gerar_boletins(alunos, pasta, formato='csv', processos=None, tamanho_lote=200, progresso=None):
+    """
+    Gera um boletim por aluno em processos paralelos. alunos: pares (id, nome).
+    Cada processo recebe um lote de alunos e abre sua própria conexão com o banco.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    lotes, lote = [], []
+    for aluno in alunos:
+        lote.append(aluno)
+        if len(lote) >= tamanho_lote:
+            lotes.append(lote)
+            lote = []
+    if lote:
+        lotes.append(lote)
+
+    gerados = 0
+    with pool_de_processos(processos) as pool:
+        futuros = [pool.submit(_escrever_boletins, lote, pasta, formato) for lote in lotes]
+        for futuro in futuros:
+            gerados += len(futuro.result())
+            if progresso:
+                progresso(gerados)
+    return gerados
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.models import User
 from .models import Professor, Aluno, Disciplina, Turma, Nota, Gestor
 from django.contrib.auth import authenticate
+from .backends import EmailBackend
+from .hashers import hash_de_cadastro
 
 
 # --- LOGIN ---
@@ -12,14 +14,15 @@ class LoginForm(forms.Form):
     def clean(self):
         email = self.cleaned_data.get('email')
         password = self.cleaned_data.get('password')
+        if not email or not password:
+            # E-mail inválido ou campo vazio: os erros dos campos já foram registrados
+            return self.cleaned_data
 
-        try:
-            user_obj = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise forms.ValidationError("E-mail não encontrado.")
-
-        user = authenticate(username=user_obj.username, password=password)
+        # Caminho normal: uma consulta só, pelo e-mail (core.backends.EmailBackend)
+        user = authenticate(email=email, password=password)
         if not user:
+            if not EmailBackend.por_email(User.objects.all(), email).exists():
+                raise forms.ValidationError("E-mail não encontrado.")
             raise forms.ValidationError("Senha incorreta.")
         self.user = user
         return self.cleaned_data
@@ -175,7 +178,7 @@ class GestorForm(forms.ModelForm):
         if not email:
             raise forms.ValidationError("O e-mail é obrigatório.")
 
-        qs = User.objects.filter(email=email)
+        qs = EmailBackend.por_email(User.objects.all(), email)
         if self.instance.pk and hasattr(self.instance, 'user') and self.instance.user:
             qs = qs.exclude(pk=self.instance.user.pk)
         if qs.exists():
@@ -196,7 +199,11 @@ class GestorForm(forms.ModelForm):
 
             # Atualiza senha apenas se preenchida
             if senha:
-                gestor.user.set_password(senha)
+                if self.request and self.request.user != gestor.user:
+                    # Senha definida por outra pessoa: hash provisório até o login do gestor
+                    gestor.user.password = hash_de_cadastro(senha)
+                else:
+                    gestor.user.set_password(senha)
                 if commit:
                     gestor.user.save()
                     # Atualiza sessão se request estiver disponível
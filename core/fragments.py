@@ -0,0 +1,101 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+# Cada escopo ('aluno:5', 'turma:3', 'turmas', ...) tem uma versão no cache. A chave de um
+# fragmento inclui as versões dos escopos de que ele depende: trocar a versão de um escopo
+# (invalidar) torna inalcançáveis todos os fragmentos que dependem dele, sem precisar
+# saber quais são. Os fragmentos antigos simplesmente expiram.
+PREFIXO_VERSAO = 'versao:'
+PREFIXO_FRAGMENTO = 'fragmento:'
+PREFIXO_ESTATISTICA = 'fragmento-estatistica:'
+TEMPO_FRAGMENTOS = 60 * 60 * 24
+
+# Fragmentos existentes, para o monitoramento
+FRAGMENTOS = ('notas_aluno', 'disciplinas_professor', 'disciplinas_por_turma', 'relatorio_turma')
+
+
+def _nova_versao():
+    return uuid.uuid4().hex[:12]
+
+
+def versoes(*escopos):
+    """Versão atual de cada escopo; escopos ainda sem versão recebem uma nova."""
+    chaves = [f'{PREFIXO_VERSAO}{e}' for e in escopos]
+    atuais = cache.get_many(chaves)
+    faltando = [c for c in chaves if c not in atuais]
+    if faltando:
+        for chave in faltando:
+            cache.add(chave, _nova_versao(), None)
+        # Outra requisição pode ter criado a versão antes (cache.add não sobrescreve)
+        atuais.update(cache.get_many(faltando))
+    return [atuais.get(c, '') for c in chaves]
+
+
+def invalidar(*escopos):
+    cache.set_many({f'{PREFIXO_VERSAO}{e}': _nova_versao() for e in escopos}, None)
+
+
+def invalidar_ao_confirmar(*escopos):
+    """Invalida só depois do commit, para nenhuma requisição guardar dados ainda não confirmados."""
+    transaction.on_commit(lambda: invalidar(*escopos))
+
+
+def _contar(nome, tipo):
+    chave = f'{PREFIXO_ESTATISTICA}{nome}:{tipo}'
+    try:
+        cache.incr(chave)
+    except ValueError:
+        if not cache.add(chave, 1, None):
+            cache.incr(chave)
+
+
+def assinatura(escopos, variacao=''):
+    """Hash das versões atuais dos escopos (e da variação): muda quando algum escopo é invalidado."""
+    texto = '|'.join([variacao, *escopos, *versoes(*escopos)])
+    return hashlib.md5(texto.encode(), usedforsecurity=False).hexdigest()
+
+
+def fragmento(nome, escopos, gerar, variacao=''):
+    """
+    HTML do fragmento `nome` lido do cache, ou gerado por gerar() e guardado.
+
+    escopos: escopos cujos dados aparecem no fragmento.
+    variacao: o que mais muda o conteúdo além dos escopos (ex.: a querystring da página).
+    """
+    chave = f'{PREFIXO_FRAGMENTO}{nome}:{assinatura(escopos, variacao)}'
+    html = cache.get(chave)
+    if html is None:
+        _contar(nome, 'falhas')
+        html = str(gerar())
+        cache.set(chave, html, TEMPO_FRAGMENTOS)
+    else:
+        _contar(nome, 'acertos')
+    return mark_safe(html)
+
+
+def estatisticas():
+    """Acertos e falhas por fragmento desde que os contadores entraram no cache."""
+    chaves = [f'{PREFIXO_ESTATISTICA}{n}:{t}' for n in FRAGMENTOS for t in ('acertos', 'falhas')]
+    valores = cache.get_many(chaves)
+    por_fragmento = {}
+    for nome in FRAGMENTOS:
+        acertos = valores.get(f'{PREFIXO_ESTATISTICA}{nome}:acertos', 0)
+        falhas = valores.get(f'{PREFIXO_ESTATISTICA}{nome}:falhas', 0)
+        total = acertos + falhas
+        por_fragmento[nome] = {
+            'acertos': acertos,
+            'falhas': falhas,
+            'taxa_acerto': round(acertos / total, 4) if total else None,
+        }
+    acertos = sum(f['acertos'] for f in por_fragmento.values())
+    falhas = sum(f['falhas'] for f in por_fragmento.values())
+    return {
+        'acertos': acertos,
+        'falhas': falhas,
+        'taxa_acerto': round(acertos / (acertos + falhas), 4) if acertos + falhas else None,
+        'fragmentos': por_fragmento,
+    }
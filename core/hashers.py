@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hashers_by_algorithm, make_password
+
+
+class PBKDF2Configuravel(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 com o número de iterações de SENHA_ITERACOES (padrão: o do Django).
+    Mesmo algoritmo do hasher do Django, então os hashes existentes continuam valendo;
+    os que tiverem outro número de iterações são refeitos no próximo login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'SENHA_ITERACOES', None) or PBKDF2PasswordHasher.iterations
+
+
+class HashProvisorio(PBKDF2PasswordHasher):
+    """
+    Hash barato para senhas definidas por outra pessoa (cadastro pelo administrador,
+    importação em lote). Como não é o primeiro de PASSWORD_HASHERS, o Django troca
+    pelo hash definitivo no primeiro login do usuário (check_password com setter).
+    """
+
+    algorithm = 'pbkdf2_provisorio'
+    iterations = 5000
+
+
+def hash_provisorio(senha):
+    # Sem HashProvisorio em PASSWORD_HASHERS (configuração própria), usa o hash padrão
+    if HashProvisorio.algorithm not in get_hashers_by_algorithm():
+        return make_password(senha)
+    return make_password(senha, hasher=HashProvisorio.algorithm)
+
+
+def hash_de_cadastro(senha):
+    """Hash usado nas contas criadas por outra pessoa: provisório se SENHA_PROVISORIA estiver ligado."""
+    if getattr(settings, 'SENHA_PROVISORIA', True):
+        return hash_provisorio(senha)
+    return make_password(senha)
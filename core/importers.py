@@ -0,0 +1,211 @@
+import codecs
+import csv
+import io
+import zipfile
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from . import search
+from .counters import invalidar_contadores
+from .fragments import invalidar
+from .hashers import hash_provisorio
+from .models import Aluno, Turma
+from .workers import pool_de_processos
+
+COLUNAS = ('nome_completo', 'idade', 'email', 'senha', 'turma')
+TAMANHO_LOTE = 500
+
+# Abaixo disso não compensa subir processos para gerar os hashes definitivos
+MINIMO_PARA_PROCESSOS = 20
+
+
+class ErroImportacao(Exception):
+    pass
+
+
+class ResultadoImportacao:
+    def __init__(self):
+        self.processadas = 0
+        self.criados = 0
+        self.erros = []  # (número da linha, mensagem)
+
+
+def _codificacao(arquivo, tamanho_bloco=64 * 1024):
+    """UTF-8 (com ou sem BOM) se o arquivo todo for UTF-8 válido; senão cp1252, o do Excel em português."""
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    try:
+        while bloco := arquivo.read(tamanho_bloco):
+            decodificador.decode(bloco)
+        decodificador.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return 'cp1252'
+    finally:
+        arquivo.seek(0)
+    return 'utf-8-sig'
+
+
+def _linhas_csv(arquivo):
+    if isinstance(arquivo.read(0), bytes):
+        arquivo = io.TextIOWrapper(arquivo, encoding=_codificacao(arquivo), newline='')
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(arquivo, dialeto)
+    cabecalho = next(leitor, None)
+    if cabecalho is None:
+        return
+    cabecalho = [c.strip().lower() for c in cabecalho]
+    for linha in leitor:
+        if any(valor.strip() for valor in linha):
+            yield dict(zip(cabecalho, linha))
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErroImportacao('Para importar planilhas .xlsx instale o pacote openpyxl.')
+
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+        linhas = planilha.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        cabecalho = [str(c or '').strip().lower() for c in cabecalho]
+        for linha in linhas:
+            valores = ['' if v is None else str(v) for v in linha]
+            if any(v.strip() for v in valores):
+                yield dict(zip(cabecalho, valores))
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError):
+        # KeyError: um .zip qualquer, sem as partes de uma planilha
+        raise ErroImportacao('O arquivo não é uma planilha .xlsx válida ou está corrompido.')
+
+
+def ler_planilha(arquivo, nome_arquivo):
+    """Lê o arquivo linha a linha. Gera (número da linha na planilha, dicionário)."""
+    if nome_arquivo.lower().endswith('.xlsx'):
+        linhas = _linhas_xlsx(arquivo)
+    else:
+        linhas = _linhas_csv(arquivo)
+    try:
+        for numero, linha in enumerate(linhas, start=2):
+            yield numero, linha
+    except UnicodeDecodeError:
+        raise ErroImportacao('Não foi possível ler o CSV: salve o arquivo em UTF-8.')
+
+
+def _validar(linha, turmas, emails):
+    dados = {c: (linha.get(c) or '').strip() for c in COLUNAS}
+    faltando = [c for c in COLUNAS if not dados[c]]
+    if faltando:
+        raise ValidationError(f'Campos obrigatórios vazios: {", ".join(faltando)}.')
+    try:
+        dados['idade'] = int(float(dados['idade']))
+    except ValueError:
+        raise ValidationError('Idade inválida.')
+    validate_email(dados['email'])
+    if dados['email'].lower() in emails:
+        raise ValidationError('Já existe um usuário com este e-mail.')
+    turma_id = turmas.get(dados['turma'].lower())
+    if turma_id is None:
+        raise ValidationError(f'Turma "{dados["turma"]}" não encontrada.')
+    dados['turma_id'] = turma_id
+    return dados
+
+
+def _gravar_lote(validos, hashes):
+    usuarios = []
+    for dados, senha in zip(validos, hashes):
+        nome = dados['nome_completo'].split(' ', 1)
+        usuarios.append(User(
+            username=dados['email'], email=dados['email'], password=senha,
+            first_name=nome[0][:150], last_name=nome[1][:150] if len(nome) > 1 else '',
+        ))
+
+    with transaction.atomic():
+        User.objects.bulk_create(usuarios)
+        if any(u.pk is None for u in usuarios):
+            # Bancos que não devolvem os ids no bulk_create
+            ids = dict(User.objects.filter(username__in=[u.username for u in usuarios]).values_list('username', 'id'))
+            for u in usuarios:
+                u.pk = ids[u.username]
+        alunos = Aluno.objects.bulk_create([
+            Aluno(user_id=u.pk, nome_completo=d['nome_completo'], idade=d['idade'], turma_id=d['turma_id'])
+            for u, d in zip(usuarios, validos)
+        ])
+        search.indexar_em_lote('aluno', [(a.pk, a.nome_completo) for a in alunos if a.pk is not None])
+    return len(alunos)
+
+
+def importar_alunos(arquivo, nome_arquivo, tamanho_lote=TAMANHO_LOTE, processos=None, progresso=None):
+    """
+    Importa alunos de um CSV/XLSX com as colunas nome_completo, idade, email, senha e turma
+    (nome da turma). As linhas são validadas e gravadas em lotes: as turmas são resolvidas
+    com uma consulta só, os e-mails conferidos contra um conjunto carregado uma vez, os
+    hashes de senha provisórios (ou, com SENHA_PROVISORIA desligado, os definitivos gerados
+    em processos paralelos) e User/Aluno gravados com bulk_create.
+
+    progresso: função chamada após cada lote com o ResultadoImportacao parcial.
+    """
+    resultado = ResultadoImportacao()
+    turmas = {nome.strip().lower(): id for id, nome in Turma.objects.values_list('id', 'nome')}
+    emails = {e.lower() for e in User.objects.values_list('email', flat=True)}
+    emails |= {u.lower() for u in User.objects.values_list('username', flat=True)}
+
+    pool = None
+    turmas_alteradas = set()
+    linhas = ler_planilha(arquivo, nome_arquivo)
+    try:
+        while True:
+            bloco = list(islice(linhas, tamanho_lote))
+            if not bloco:
+                break
+
+            validos = []
+            for numero, linha in bloco:
+                resultado.processadas += 1
+                try:
+                    dados = _validar(linha, turmas, emails)
+                except ValidationError as e:
+                    resultado.erros.append((numero, ' '.join(e.messages)))
+                    continue
+                emails.add(dados['email'].lower())
+                validos.append(dados)
+
+            if validos:
+                senhas = [d['senha'] for d in validos]
+                if getattr(settings, 'SENHA_PROVISORIA', True):
+                    # Hash barato, refeito no primeiro login (core/hashers.py)
+                    hashes = [hash_provisorio(s) for s in senhas]
+                elif len(senhas) >= MINIMO_PARA_PROCESSOS and processos != 1:
+                    if pool is None:
+                        pool = pool_de_processos(processos)
+                    hashes = list(pool.map(make_password, senhas, chunksize=max(1, len(senhas) // 16)))
+                else:
+                    hashes = [make_password(s) for s in senhas]
+                resultado.criados += _gravar_lote(validos, hashes)
+                turmas_alteradas.update(d['turma_id'] for d in validos)
+
+            if progresso:
+                progresso(resultado)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if resultado.criados:
+            # bulk_create não dispara os sinais que mantêm contadores e fragmentos em cache
+            invalidar_contadores()
+            invalidar('alunos', *[f'turma:{i}' for i in sorted(turmas_alteradas)])
+
+    return resultado
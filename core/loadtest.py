@@ -0,0 +1,215 @@
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from http.cookiejar import CookieJar
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from .middleware import percentil
+from .models import Aluno, Disciplina
+from .synthetic import SOBRENOMES
+
+PAPEIS = ('super', 'gestor', 'professor', 'aluno')
+
+# Ações de cada papel: (nome, método, rota, peso). As buscas usam um sobrenome sorteado.
+ACOES = {
+    'super': [
+        ('painel_super', 'GET', 'painel_super', 2),
+        ('buscar_alunos', 'GET', 'listar_alunos', 3),
+        ('buscar_professores', 'GET', 'listar_professores', 2),
+        ('listar_turmas', 'GET', 'listar_turmas', 1),
+    ],
+    'gestor': [
+        ('painel_gestor', 'GET', 'painel_gestor', 2),
+        ('buscar_alunos', 'GET', 'listar_alunos', 3),
+        ('listar_disciplinas', 'GET', 'listar_disciplinas', 2),
+    ],
+    'professor': [
+        ('painel_professor', 'GET', 'painel_professor', 2),
+        ('abrir_lancar_nota', 'GET', 'lancar_nota', 3),
+        ('salvar_notas', 'POST', 'lancar_nota', 3),
+    ],
+    'aluno': [
+        ('painel_aluno', 'GET', 'painel_aluno', 1),
+    ],
+}
+
+Resultado = namedtuple('Resultado', ['acao', 'status', 'tempo', 'erro'])
+Perfil = namedtuple('Perfil', ['papel', 'email', 'disciplinas'])  # disciplinas: {id: [aluno_id, ...]}
+
+
+class _SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    # Cada medição é uma requisição só: o 302 é a resposta, não o que vem depois
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Sessao:
+    """Um navegador simples: cookies de sessão e CSRF, sem seguir redirecionamentos."""
+
+    def __init__(self, base, timeout=30):
+        self.base = base.rstrip('/')
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.abridor = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _SemRedirecionar,
+        )
+
+    def csrf(self):
+        return next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+
+    def requisitar(self, metodo, caminho, dados=None):
+        """Retorna (status, corpo). Erros HTTP (4xx/5xx, 3xx) voltam como status."""
+        url = self.base + caminho
+        corpo = None
+        cabecalhos = {}
+        if metodo == 'POST':
+            corpo = urllib.parse.urlencode({**(dados or {}), 'csrfmiddlewaretoken': self.csrf()}).encode()
+            cabecalhos = {'Content-Type': 'application/x-www-form-urlencoded', 'Referer': url}
+        requisicao = urllib.request.Request(url, data=corpo, headers=cabecalhos, method=metodo)
+        try:
+            with self.abridor.open(requisicao, timeout=self.timeout) as resposta:
+                return resposta.status, resposta.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def entrar(self, email, senha):
+        self.requisitar('GET', reverse('login'))
+        status, _ = self.requisitar('POST', reverse('login'), {'email': email, 'password': senha})
+        if status != 302:
+            raise RuntimeError(f'login de {email} falhou (HTTP {status})')
+
+
+def carregar_perfis(papeis, quantidade):
+    """
+    Monta quantidade usuários virtuais, alternando os papéis, a partir dos usuários do
+    banco (o mesmo que o servidor usa); com menos usuários que o pedido, repete. Os
+    professores vêm com as disciplinas e os alunos de cada uma, para montar os POSTs
+    de lançamento de notas.
+    """
+    consultas = {
+        'super': User.objects.filter(is_superuser=True),
+        'gestor': User.objects.filter(gestor__isnull=False),
+        'professor': User.objects.filter(professor__disciplina__isnull=False).distinct(),
+        'aluno': User.objects.filter(aluno__isnull=False),
+    }
+    por_papel = -(-quantidade // len(papeis))
+    disponiveis = {}
+    for papel in papeis:
+        usuarios = list(consultas[papel].order_by('id').values_list('id', 'email')[:por_papel])
+        if not usuarios:
+            raise ValueError(f'Nenhum usuário com o papel "{papel}" no banco.')
+        disponiveis[papel] = usuarios
+
+    perfis = []
+    for i in range(quantidade):
+        papel = papeis[i % len(papeis)]
+        usuarios = disponiveis[papel]
+        user_id, email = usuarios[i // len(papeis) % len(usuarios)]
+        disciplinas = {}
+        if papel == 'professor':
+            for disciplina_id, turma_id in Disciplina.objects.filter(professor__user_id=user_id).values_list('id', 'turma_id'):
+                disciplinas[disciplina_id] = list(Aluno.objects.filter(turma_id=turma_id).values_list('id', flat=True))
+        perfis.append(Perfil(papel, email, disciplinas))
+    return perfis
+
+
+def _requisicao_da_acao(acao, perfil, rnd):
+    nome, metodo, rota, _ = acao
+    if rota == 'lancar_nota':
+        if not perfil.disciplinas:
+            return None
+        disciplina_id = rnd.choice(list(perfil.disciplinas))
+        caminho = reverse(rota, args=[disciplina_id])
+        dados = None
+        if metodo == 'POST':
+            dados = {
+                f'nota{rnd.randint(1, 4)}_{aluno_id}': f'{rnd.uniform(0, 10):.1f}'
+                for aluno_id in perfil.disciplinas[disciplina_id]
+            }
+        return metodo, caminho, dados
+    caminho = reverse(rota)
+    if nome.startswith('buscar_'):
+        caminho += '?' + urllib.parse.urlencode({'q': rnd.choice(SOBRENOMES)})
+    return metodo, caminho, None
+
+
+def _usuario_virtual(base, perfil, senha, fim, pausa, semente, resultados):
+    rnd = random.Random(semente)
+    sessao = Sessao(base)
+    inicio = time.perf_counter()
+    try:
+        sessao.entrar(perfil.email, senha)
+        resultados.append(Resultado('login', 302, time.perf_counter() - inicio, ''))
+    except Exception as e:
+        resultados.append(Resultado('login', 0, time.perf_counter() - inicio, str(e)))
+        return
+
+    acoes = ACOES[perfil.papel]
+    pesos = [a[3] for a in acoes]
+    while time.monotonic() < fim:
+        acao = rnd.choices(acoes, pesos)[0]
+        requisicao = _requisicao_da_acao(acao, perfil, rnd)
+        if requisicao is None:
+            continue
+        inicio = time.perf_counter()
+        try:
+            status, _ = sessao.requisitar(*requisicao)
+            erro = '' if status < 400 else f'HTTP {status}'
+        except Exception as e:
+            status, erro = 0, str(e)
+        resultados.append(Resultado(acao[0], status, time.perf_counter() - inicio, erro))
+        if pausa:
+            time.sleep(rnd.uniform(0, 2 * pausa))
+
+
+def executar_carga(base, perfis, senha, duracao=30, pausa=0.0, semente=42):
+    """
+    Um usuário virtual (thread) por perfil: faz login e repete ações sorteadas do seu
+    papel até acabar a duração (segundos). pausa: espera média entre ações.
+    Retorna (resultados, segundos decorridos).
+    """
+    resultados = []  # list.append é atômico: as threads gravam direto aqui
+    fim = time.monotonic() + duracao
+    threads = [
+        threading.Thread(
+            target=_usuario_virtual, args=(base, perfil, senha, fim, pausa, semente + i, resultados), daemon=True,
+        )
+        for i, perfil in enumerate(perfis)
+    ]
+    inicio = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados, time.monotonic() - inicio
+
+
+def formatar_relatorio(resultados, decorrido):
+    por_acao = {}
+    for r in resultados:
+        por_acao.setdefault(r.acao, []).append(r)
+
+    linhas = [
+        f'{"ação":<20} {"req":>6} {"erros":>6} {"req/s":>7} {"p50 (ms)":>9} {"p95 (ms)":>9} {"p99 (ms)":>9} {"máx (ms)":>9}'
+    ]
+    for acao, lista in sorted(por_acao.items()) + [('TOTAL', resultados)]:
+        if not lista:
+            continue
+        tempos = sorted(r.tempo * 1000 for r in lista)
+        erros = sum(1 for r in lista if r.erro)
+        linhas.append(
+            f'{acao:<20} {len(lista):>6} {erros:>6} {len(lista) / decorrido:>7.1f} '
+            f'{percentil(tempos, 50):>9.1f} {percentil(tempos, 95):>9.1f} '
+            f'{percentil(tempos, 99):>9.1f} {tempos[-1]:>9.1f}'
+        )
+    mensagens = sorted({r.erro for r in resultados if r.erro})
+    if mensagens:
+        linhas.append('')
+        linhas.extend(f'erro: {m}' for m in mensagens[:10])
+    return '\n'.join(linhas)
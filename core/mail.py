@@ -0,0 +1,131 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import EmailPendente
+
+logger = logging.getLogger('core.mail')
+
+SMTP = 'django.core.mail.backends.smtp.EmailBackend'
+
+TAMANHO_LOTE = 50
+MAX_TENTATIVAS = 6
+# Espera antes da tentativa N: ESPERA_INICIAL * 2^(N-1), limitada a ESPERA_MAXIMA
+ESPERA_INICIAL = timedelta(minutes=1)
+ESPERA_MAXIMA = timedelta(hours=1)
+# Tempo que um lote fica reservado para um enviador; se ele morrer, outro assume depois
+RESERVA = timedelta(minutes=10)
+
+
+class FilaEmailBackend(BaseEmailBackend):
+    """
+    Backend de e-mail que só grava as mensagens na tabela EmailPendente, sem abrir
+    conexão SMTP: a requisição (ex.: recuperação de senha) responde na hora e o
+    comando enviar_emails faz o envio. Anexos não são suportados.
+    """
+
+    def send_messages(self, email_messages):
+        pendentes = []
+        for mensagem in email_messages:
+            if not mensagem.recipients():
+                continue
+            if mensagem.attachments:
+                raise ValueError('A fila de e-mails não aceita anexos.')
+            pendentes.append(EmailPendente(
+                assunto=mensagem.subject,
+                corpo=mensagem.body,
+                remetente=mensagem.from_email,
+                destinatarios={
+                    'to': list(mensagem.to), 'cc': list(mensagem.cc),
+                    'bcc': list(mensagem.bcc), 'reply_to': list(mensagem.reply_to),
+                },
+                alternativas=[list(a) for a in getattr(mensagem, 'alternatives', [])],
+                cabecalhos=dict(mensagem.extra_headers),
+            ))
+        EmailPendente.objects.bulk_create(pendentes)
+        return len(pendentes)
+
+
+def _mensagem(pendente, conexao):
+    destinatarios = pendente.destinatarios
+    mensagem = EmailMultiAlternatives(
+        subject=pendente.assunto, body=pendente.corpo, from_email=pendente.remetente,
+        to=destinatarios.get('to'), cc=destinatarios.get('cc'), bcc=destinatarios.get('bcc'),
+        reply_to=destinatarios.get('reply_to'), headers=pendente.cabecalhos, connection=conexao,
+    )
+    for conteudo, tipo in pendente.alternativas:
+        mensagem.attach_alternative(conteudo, tipo)
+    return mensagem
+
+
+def espera(tentativas):
+    return min(ESPERA_INICIAL * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+
+
+def _reservar(lote):
+    """
+    Separa até lote e-mails vencidos e adia a próxima tentativa deles por RESERVA, para
+    dois enviadores rodando juntos não mandarem o mesmo e-mail. No PostgreSQL as linhas
+    já reservadas por outro são puladas (SKIP LOCKED); no SQLite a transação IMMEDIATE
+    já serializa as reservas.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        fila = EmailPendente.objects.filter(status='pendente', proxima_tentativa__lte=agora).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            fila = fila.select_for_update(skip_locked=True)
+        pendentes = list(fila[:lote])
+        EmailPendente.objects.filter(id__in=[p.id for p in pendentes]).update(proxima_tentativa=agora + RESERVA)
+    return pendentes
+
+
+def enviar_pendentes(lote=TAMANHO_LOTE, max_tentativas=MAX_TENTATIVAS):
+    """
+    Envia um lote da fila por uma única conexão do backend de EMAIL_BACKEND_ENVIO.
+    Cada falha adia o e-mail com espera exponencial; depois de max_tentativas ele fica
+    como 'falhou'. Retorna (enviados, falhas).
+    """
+    pendentes = _reservar(lote)
+    if not pendentes:
+        return 0, 0
+
+    enviados, falhas = [], []
+    conexao = get_connection(getattr(settings, 'EMAIL_BACKEND_ENVIO', SMTP), fail_silently=False)
+    try:
+        conexao.open()
+        for pendente in pendentes:
+            try:
+                conexao.send_messages([_mensagem(pendente, conexao)])
+            except Exception as e:
+                logger.warning('Falha ao enviar o e-mail %s: %s', pendente.id, e)
+                falhas.append((pendente, str(e)))
+                # A conexão pode ter caído no meio: a próxima mensagem abre outra
+                conexao.close()
+            else:
+                enviados.append(pendente.id)
+    except Exception as e:
+        # Nem a conexão abriu: todo o lote volta para a fila
+        logger.warning('Falha ao conectar para enviar e-mails: %s', e)
+        falhas = [(p, str(e)) for p in pendentes if p.id not in enviados]
+    finally:
+        conexao.close()
+
+    agora = timezone.now()
+    with transaction.atomic():
+        EmailPendente.objects.filter(id__in=enviados).update(status='enviado', enviado_em=agora, erro='')
+        for pendente, erro in falhas:
+            pendente.tentativas += 1
+            pendente.erro = erro
+            if pendente.tentativas >= max_tentativas:
+                pendente.status = 'falhou'
+            else:
+                pendente.proxima_tentativa = agora + espera(pendente.tentativas)
+        EmailPendente.objects.bulk_update(
+            [p for p, _ in falhas], ['tentativas', 'erro', 'status', 'proxima_tentativa'],
+        )
+    return len(enviados), len(falhas)
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics import ErroAnalise, analise_notas, calcular_analise
+
+
+def _formatar(valor, casas=2):
+    return '-' if valor is None else f'{valor:.{casas}f}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Estatísticas das notas da escola inteira (core/analytics.py): resumo por bimestre, '
+        'correlação entre bimestres, distribuição das médias, turmas e médias atípicas. Requer numpy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sem-cache', action='store_true', help='Recalcula mesmo com o resultado no cache.')
+        parser.add_argument('--json', action='store_true', help='Escreve o resultado em JSON.')
+
+    def handle(self, *args, **options):
+        try:
+            analise = calcular_analise() if options['sem_cache'] else analise_notas()
+        except ErroAnalise as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(analise, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f'{analise["notas"]} lançamentos. Aprovação: {analise["media_aprovacao"]:g}.\n')
+        self.stdout.write(
+            f'{"":<10} {"notas":>6} {"média":>6} {"desvio":>6} {"mín":>5} {"p25":>5} '
+            f'{"mediana":>7} {"p75":>5} {"máx":>5} {"aprov.%":>7}'
+        )
+        for rotulo, r in analise['bimestres'] + [('média', analise['geral'])]:
+            self.stdout.write(
+                f'{rotulo:<10} {r["quantidade"]:>6} {_formatar(r["media"]):>6} {_formatar(r["desvio"]):>6} '
+                f'{_formatar(r["minimo"], 1):>5} {_formatar(r["p25"], 1):>5} {_formatar(r["mediana"], 1):>7} '
+                f'{_formatar(r["p75"], 1):>5} {_formatar(r["maximo"], 1):>5} {_formatar(r["aprovados"], 1):>7}'
+            )
+
+        self.stdout.write('\nCorrelação entre bimestres:')
+        for rotulo, linha in analise['correlacoes']:
+            self.stdout.write(f'{rotulo:<4} ' + ' '.join(f'{_formatar(v):>6}' for v in linha))
+
+        self.stdout.write('\nDistribuição das médias:')
+        for inicio, quantidade, percentual in analise['distribuicao']:
+            self.stdout.write(f'{inicio:>2} a {inicio + 1:<2} {quantidade:>6} {percentual:>6.1f}%')
+
+        self.stdout.write('\nTurmas:')
+        for turma in analise['turmas']:
+            self.stdout.write(
+                f'{turma["nome"]:<20} {turma["quantidade"]:>6} {_formatar(turma["media"]):>6} {_formatar(turma["desvio"]):>6}'
+            )
+
+        self.stdout.write(f'\nMédias atípicas (|z| >= {analise["limite_z"]:g}):')
+        for a in analise['atipicos']:
+            self.stdout.write(
+                f'{a["aluno"]:<30} {a["turma"]:<12} {a["disciplina"]:<15} '
+                f'{a["media"]:>5.2f} (disciplina {a["media_disciplina"]:.2f}, z {a["z"]:+.1f})'
+            )
+        if not analise['atipicos']:
+            self.stdout.write('nenhuma')
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.middleware import percentil
+from core.reports import relatorio_turma
+from core.synthetic import gerar_dados
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o relatório da turma (core/reports.py) com turmas de tamanhos crescentes: '
+        'consultas e tempos p50/máx. Os dados são gerados numa transação desfeita no final, '
+        'então o banco não muda.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanhos', default='25,50,100,200,400',
+            help='Alunos por turma, separados por vírgula.',
+        )
+        parser.add_argument('--disciplinas', type=int, default=10, help='Disciplinas da turma.')
+        parser.add_argument('--repeticoes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        tamanhos = [int(t) for t in options['tamanhos'].split(',') if t.strip()]
+        disciplinas = options['disciplinas']
+
+        self.stdout.write(f'{"alunos":>7} {"notas":>7} {"consultas":>10} {"p50 (ms)":>9} {"máx (ms)":>9}')
+        for alunos in tamanhos:
+            with transaction.atomic():
+                dados = gerar_dados(
+                    turmas=1, alunos=alunos, disciplinas=disciplinas, notas=alunos * disciplinas,
+                    gestores=0, prefixo=f'benchmark{alunos}',
+                )
+                turma_id = dados.turmas[0].id
+                with CaptureQueriesContext(connection) as consultas:
+                    relatorio_turma(turma_id)
+                tempos = []
+                for _ in range(options['repeticoes']):
+                    inicio = time.perf_counter()
+                    relatorio_turma(turma_id)
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                transaction.set_rollback(True)
+            tempos.sort()
+            self.stdout.write(
+                f'{alunos:>7} {dados.notas:>7} {len(consultas):>10} '
+                f'{percentil(tempos, 50):>9.1f} {tempos[-1]:>9.1f}'
+            )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.mail import MAX_TENTATIVAS, TAMANHO_LOTE, enviar_pendentes
+
+
+class Command(BaseCommand):
+    help = (
+        'Envia os e-mails da fila (EmailPendente) em lotes, por uma conexão SMTP reaproveitada '
+        'em cada lote. Falhas são tentadas de novo com espera exponencial.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='E-mails por conexão.')
+        parser.add_argument('--max-tentativas', type=int, default=MAX_TENTATIVAS)
+        parser.add_argument(
+            '--continuo', action='store_true',
+            help='Não termina: verifica a fila a cada --intervalo segundos.',
+        )
+        parser.add_argument('--intervalo', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            total_enviados = total_falhas = 0
+            # Esvazia o que já venceu, lote a lote
+            while True:
+                enviados, falhas = enviar_pendentes(options['lote'], options['max_tentativas'])
+                total_enviados += enviados
+                total_falhas += falhas
+                if enviados + falhas < options['lote']:
+                    break
+            if total_enviados or total_falhas or not options['continuo']:
+                self.stdout.write(f'{total_enviados} e-mails enviados, {total_falhas} falhas.')
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
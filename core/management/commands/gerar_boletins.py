@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import ErroExportacao, gerar_boletins
+from core.models import Aluno
+
+
+class Command(BaseCommand):
+    help = 'Gera o boletim de cada aluno em uma pasta, usando processos paralelos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pasta', help='Pasta onde os boletins serão gravados.')
+        parser.add_argument('--formato', choices=['csv', 'xlsx', 'pdf'], default='csv')
+        parser.add_argument('--turma', type=int, help='Gera só os boletins desta turma (id).')
+        parser.add_argument('--processos', type=int, default=None, help='Padrão: um por CPU.')
+        parser.add_argument('--lote', type=int, default=200, help='Alunos por tarefa enviada a um processo.')
+
+    def handle(self, *args, **options):
+        alunos = Aluno.objects.order_by('id')
+        if options['turma']:
+            alunos = alunos.filter(turma_id=options['turma'])
+        alunos = alunos.values_list('id', 'nome_completo')
+        total = alunos.count()
+
+        def progresso(gerados):
+            self.stdout.write(f'{gerados}/{total} boletins gerados')
+
+        try:
+            gerados = gerar_boletins(
+                alunos.iterator(), options['pasta'], formato=options['formato'],
+                processos=options['processos'], tamanho_lote=options['lote'], progresso=progresso,
+            )
+        except ErroExportacao as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(f'{gerados} boletins gravados em {options["pasta"]}.'))
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import SENHA_PADRAO, gerar_dados
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera uma escola fictícia (turmas, professores, disciplinas, alunos, notas e gestores) '
+        'com bulk_create. A mesma semente gera sempre os mesmos dados. O hash da senha é '
+        'calculado uma vez e usado por todos os usuários.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turmas', type=int, default=50)
+        parser.add_argument('--alunos', type=int, default=2000)
+        parser.add_argument('--disciplinas', type=int, default=300)
+        parser.add_argument('--notas', type=int, default=8000)
+        parser.add_argument('--professores', type=int, default=None, help='Padrão: disciplinas / 5.')
+        parser.add_argument('--gestores', type=int, default=3)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--senha', default=SENHA_PADRAO, help='Senha de todos os usuários gerados.')
+        parser.add_argument(
+            '--prefixo', default='',
+            help='Acrescentado a e-mails e nomes de turma, para gerar mais de um conjunto no mesmo banco.',
+        )
+
+    def handle(self, *args, **options):
+        sufixo = f'.{options["prefixo"]}' if options['prefixo'] else ''
+        if User.objects.filter(username=f'admin{sufixo}').exists():
+            raise CommandError('Já existem dados gerados com este prefixo. Use --prefixo para gerar outro conjunto.')
+
+        dados = gerar_dados(
+            turmas=options['turmas'], alunos=options['alunos'], disciplinas=options['disciplinas'],
+            notas=options['notas'], professores=options['professores'], gestores=options['gestores'],
+            semente=options['semente'], senha=options['senha'], prefixo=options['prefixo'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(dados.turmas)} turmas, {len(dados.professores)} professores, {len(dados.disciplinas)} disciplinas, '
+            f'{len(dados.alunos)} alunos, {len(dados.gestores)} gestores e {dados.notas} notas gerados.'
+        ))
+        self.stdout.write('Usuários de exemplo (senha "%s"):' % options['senha'])
+        for papel, usuario in dados.usuarios.items():
+            if usuario is not None:
+                self.stdout.write(f'  {papel:<10} {usuario.email}')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import TAMANHO_LOTE, ErroImportacao, importar_alunos
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa alunos de um arquivo CSV ou XLSX com as colunas '
+        'nome_completo, idade, email, senha e turma.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas por lote.')
+        parser.add_argument('--processos', type=int, default=None,
+                            help='Processos para gerar os hashes de senha (padrão: um por CPU).')
+
+    def handle(self, *args, **options):
+        def progresso(resultado):
+            self.stdout.write(
+                f'{resultado.processadas} linhas processadas, {resultado.criados} alunos criados, '
+                f'{len(resultado.erros)} erros'
+            )
+
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_alunos(
+                    arquivo, options['arquivo'], tamanho_lote=options['lote'],
+                    processos=options['processos'], progresso=progresso,
+                )
+        except (OSError, ErroImportacao) as e:
+            raise CommandError(e)
+
+        for numero, mensagem in resultado.erros:
+            self.stderr.write(f'Linha {numero}: {mensagem}')
+        self.stdout.write(self.style.SUCCESS(f'{resultado.criados} alunos importados.'))
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.assets import LARGURAS, QUALIDADE, ErroOtimizacao, gerar_variantes
+
+# Imagens exibidas como ícones nos painéis
+IMAGENS = (
+    'core/img/aluno.png',
+    'core/img/disciplina.png',
+    'core/img/professor.png',
+    'core/img/turma.png',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera variantes AVIF/WebP redimensionadas das imagens dos painéis e o manifesto '
+        'usado por {% imagem_responsiva %}. Com --collectstatic roda o collectstatic em seguida.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--larguras', type=int, nargs='+', default=list(LARGURAS))
+        parser.add_argument('--qualidade', type=int, default=QUALIDADE)
+        parser.add_argument('--collectstatic', action='store_true',
+                            help='Copia, minifica e versiona os estáticos logo depois.')
+
+    def handle(self, *args, **options):
+        pasta = settings.STATICFILES_DIRS[0]
+        try:
+            manifesto = gerar_variantes(pasta, IMAGENS, options['larguras'], options['qualidade'])
+        except ErroOtimizacao as e:
+            raise CommandError(str(e))
+
+        for caminho, entrada in manifesto.items():
+            formatos = ', '.join(sorted(entrada['variantes']))
+            self.stdout.write(f'{caminho}: {formatos}')
+        self.stdout.write(self.style.SUCCESS(f'{len(manifesto)} imagens otimizadas.'))
+
+        if options['collectstatic']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
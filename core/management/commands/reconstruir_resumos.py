@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.summary import conferir_resumos, reconstruir_resumos
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói as tabelas de resumo de notas e confere com um recálculo completo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apenas-conferir', action='store_true',
+            help='Não reconstrói; só compara os resumos atuais com o recálculo completo.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['apenas_conferir']:
+            reconstruir_resumos()
+            self.stdout.write('Resumos reconstruídos.')
+
+        divergencias = conferir_resumos()
+        for escopo, chave, esperado, atual in divergencias[:20]:
+            self.stderr.write(f'{escopo} {chave}: esperado {esperado}, encontrado {atual}')
+        if divergencias:
+            raise CommandError(f'{len(divergencias)} divergência(s) entre os resumos e o recálculo.')
+        self.stdout.write(self.style.SUCCESS('Resumos conferem com o recálculo completo.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.search import fts_disponivel, reindexar_tudo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca por nome de alunos, professores e turmas.'
+
+    def handle(self, *args, **options):
+        reindexar_tudo()
+        modo = 'FTS5' if fts_disponivel() else 'índice por prefixo'
+        self.stdout.write(self.style.SUCCESS(f'Índice de busca reconstruído ({modo}).'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import PAPEIS, carregar_perfis, executar_carga, formatar_relatorio
+from core.synthetic import SENHA_PADRAO
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga contra um servidor já rodando (runserver, gunicorn...): usuários '
+        'virtuais de cada papel fazem login e acessam painéis, buscas e o lançamento de '
+        'notas. Mostra vazão e percentis de latência por ação. Os usuários são lidos do '
+        'banco configurado aqui, que deve ser o mesmo do servidor (ver gerar_dados).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Endereço do servidor.')
+        parser.add_argument('--usuarios', type=int, default=8, help='Usuários virtuais simultâneos.')
+        parser.add_argument('--duracao', type=float, default=30, help='Segundos de teste.')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Espera média entre ações, em segundos.')
+        parser.add_argument('--papeis', default=','.join(PAPEIS), help='Papéis usados, separados por vírgula.')
+        parser.add_argument('--senha', default=SENHA_PADRAO)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        papeis = [p.strip() for p in options['papeis'].split(',') if p.strip()]
+        invalidos = set(papeis) - set(PAPEIS)
+        if invalidos or not papeis:
+            raise CommandError(f'Papéis válidos: {", ".join(PAPEIS)}.')
+        try:
+            perfis = carregar_perfis(papeis, options['usuarios'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        self.stdout.write(f'{len(perfis)} usuários virtuais por {options["duracao"]:g}s contra {options["url"]}...')
+        resultados, decorrido = executar_carga(
+            options['url'], perfis, options['senha'], duracao=options['duracao'],
+            pausa=options['pausa'], semente=options['semente'],
+        )
+        if not resultados:
+            raise CommandError('Nenhuma requisição foi feita.')
+        self.stdout.write(formatar_relatorio(resultados, decorrido))
@@ -0,0 +1,191 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('core.desempenho')
+logger_sql = logging.getLogger('core.desempenho.sql')
+
+SEM_ROTA = '-'
+
+# Medição da requisição em andamento (uma por thread/contexto)
+_medicao_atual = ContextVar('medicao_desempenho', default=None)
+
+
+class Medicao:
+    def __init__(self, request):
+        self.request = request
+        self.rota = SEM_ROTA
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_templates = 0.0
+        self.renderizando = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Usado como connection.execute_wrapper: mede cada consulta
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tempo_sql += duracao
+            limite = getattr(settings, 'DESEMPENHO_SQL_LENTO_MS', 100)
+            if limite is not None and duracao * 1000 >= limite:
+                logger_sql.warning(json.dumps({
+                    'evento': 'sql_lento',
+                    'rota': self.rota,
+                    'caminho': self.request.path,
+                    'banco': context['connection'].alias,
+                    'tempo_ms': round(duracao * 1000, 1),
+                    'sql': sql,
+                }, ensure_ascii=False))
+
+
+def _instrumentar_templates():
+    """
+    Mede o tempo de renderização dos templates. Só o template mais externo conta
+    ({% include %} e {% extends %} renderizam outros dentro dele). Consultas feitas
+    durante a renderização (querysets preguiçosos) entram nos dois tempos.
+    """
+    original = Template.render
+    if getattr(original, 'instrumentado', False):
+        return
+
+    def render(self, context):
+        medicao = _medicao_atual.get()
+        if medicao is None or medicao.renderizando:
+            return original(self, context)
+        medicao.renderizando = True
+        inicio = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            medicao.tempo_templates += time.perf_counter() - inicio
+            medicao.renderizando = False
+
+    render.instrumentado = True
+    Template.render = render
+
+
+class EstatisticasRotas:
+    """
+    Últimas N requisições de cada rota (deque com maxlen), para calcular p50/p95/p99.
+    Memória limitada: no máximo max_rotas rotas, descartando a usada há mais tempo.
+    Os números são do processo atual.
+    """
+
+    def __init__(self, amostras=500, max_rotas=200):
+        self.amostras = amostras
+        self.max_rotas = max_rotas
+        self._rotas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def registrar(self, rota, tempo, consultas, tempo_sql, tempo_templates):
+        with self._trava:
+            amostras = self._rotas.get(rota)
+            if amostras is None:
+                amostras = self._rotas[rota] = deque(maxlen=self.amostras)
+                if len(self._rotas) > self.max_rotas:
+                    self._rotas.popitem(last=False)
+            else:
+                self._rotas.move_to_end(rota)
+            amostras.append((tempo, consultas, tempo_sql, tempo_templates))
+
+    def limpar(self):
+        with self._trava:
+            self._rotas.clear()
+
+    def resumo(self):
+        """Uma linha por rota, da mais lenta (p95) para a mais rápida. Tempos em ms."""
+        with self._trava:
+            copia = {rota: list(amostras) for rota, amostras in self._rotas.items()}
+        linhas = []
+        for rota, amostras in copia.items():
+            tempos = sorted(a[0] for a in amostras)
+            n = len(amostras)
+            linhas.append({
+                'rota': rota,
+                'requisicoes': n,
+                'p50': percentil(tempos, 50) * 1000,
+                'p95': percentil(tempos, 95) * 1000,
+                'p99': percentil(tempos, 99) * 1000,
+                'maximo': tempos[-1] * 1000,
+                'consultas': sum(a[1] for a in amostras) / n,
+                'sql': sum(a[2] for a in amostras) / n * 1000,
+                'templates': sum(a[3] for a in amostras) / n * 1000,
+            })
+        return sorted(linhas, key=lambda linha: linha['p95'], reverse=True)
+
+
+def percentil(ordenados, p):
+    # Nearest-rank: o menor valor com pelo menos p% das amostras até ele
+    indice = max(0, -(-len(ordenados) * p // 100) - 1)
+    return ordenados[int(indice)]
+
+
+estatisticas = EstatisticasRotas(
+    amostras=getattr(settings, 'DESEMPENHO_AMOSTRAS', 500),
+    max_rotas=getattr(settings, 'DESEMPENHO_MAX_ROTAS', 200),
+)
+
+
+class DesempenhoMiddleware:
+    """
+    Mede cada requisição: tempo total, número e tempo das consultas SQL e tempo de
+    renderização dos templates. Devolve os valores no cabeçalho Server-Timing (aparece
+    na aba Rede do navegador), grava uma linha JSON no logger core.desempenho e
+    acumula percentis por rota (nome da URL) em core.middleware.estatisticas.
+    Consultas acima de DESEMPENHO_SQL_LENTO_MS vão para core.desempenho.sql.
+
+    Em respostas em streaming só entra o que rodou até o início do envio.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _instrumentar_templates()
+
+    def __call__(self, request):
+        medicao = Medicao(request)
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(medicao))
+                resposta = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        total = time.perf_counter() - inicio
+
+        resposta['Server-Timing'] = (
+            f'total;dur={total * 1000:.1f}, '
+            f'sql;dur={medicao.tempo_sql * 1000:.1f};desc="{medicao.consultas} consultas", '
+            f'tpl;dur={medicao.tempo_templates * 1000:.1f}'
+        )
+        if medicao.rota != SEM_ROTA:
+            estatisticas.registrar(medicao.rota, total, medicao.consultas, medicao.tempo_sql, medicao.tempo_templates)
+        logger.info(json.dumps({
+            'evento': 'requisicao',
+            'rota': medicao.rota,
+            'metodo': request.method,
+            'caminho': request.path,
+            'status': resposta.status_code,
+            'tempo_ms': round(total * 1000, 1),
+            'consultas': medicao.consultas,
+            'sql_ms': round(medicao.tempo_sql * 1000, 1),
+            'templates_ms': round(medicao.tempo_templates * 1000, 1),
+        }, ensure_ascii=False))
+        return resposta
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicao = _medicao_atual.get()
+        if medicao is not None and request.resolver_match:
+            medicao.rota = request.resolver_match.view_name
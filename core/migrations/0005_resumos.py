@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_gestor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoAluno',
+            fields=[
+                ('media', models.FloatField(blank=True, null=True)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('aluno', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo', serialize=False, to='core.aluno')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoDisciplina',
+            fields=[
+                ('media', models.FloatField(blank=True, null=True)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('disciplina', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo', serialize=False, to='core.disciplina')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoTurma',
+            fields=[
+                ('media', models.FloatField(blank=True, null=True)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('turma', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo', serialize=False, to='core.turma')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoNota',
+            fields=[
+                ('media', models.FloatField(blank=True, null=True)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('nota', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo', serialize=False, to='core.nota')),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.aluno')),
+                ('disciplina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.disciplina')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.turma')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
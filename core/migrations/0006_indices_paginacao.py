@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_resumos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(fields=['nome_completo', 'id'], name='aluno_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gestor',
+            index=models.Index(fields=['nome_completo', 'id'], name='gestor_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='professor',
+            index=models.Index(fields=['nome_completo', 'id'], name='professor_nome_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turma',
+            index=models.Index(fields=['nome', 'id'], name='turma_nome_id_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:27
+
+import re
+import unicodedata
+
+from django.db import OperationalError, migrations, models
+
+# Cópia congelada de core/search.py na época desta migração: mudanças posteriores na
+# normalização ou no rowid não podem alterar o que ela faz num banco novo.
+TABELA_FTS = 'core_busca_fts'
+CODIGOS_TIPO = {'aluno': 1, 'professor': 2, 'turma': 3}
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return ' '.join(re.findall(r'[a-z0-9]+', texto.lower()))
+
+
+def termos(texto):
+    vistos = []
+    for termo in normalizar(texto).split():
+        termo = termo[:100]
+        if termo not in vistos:
+            vistos.append(termo)
+    return vistos
+
+
+def criar_tabela_fts(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+        "texto, tipo UNINDEXED, objeto_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def criar_indice_busca(apps, schema_editor):
+    conexao = schema_editor.connection
+    fts = False
+    if conexao.vendor == 'sqlite':
+        try:
+            with conexao.cursor() as cursor:
+                criar_tabela_fts(cursor)
+            fts = True
+        except OperationalError:
+            # SQLite compilado sem FTS5: fica o índice por prefixo em TermoBusca
+            pass
+
+    TermoBusca = apps.get_model('core', 'TermoBusca')
+    nomes = [
+        ('aluno', apps.get_model('core', 'Aluno').objects.values_list('id', 'nome_completo')),
+        ('professor', apps.get_model('core', 'Professor').objects.values_list('id', 'nome_completo')),
+        ('turma', apps.get_model('core', 'Turma').objects.values_list('id', 'nome')),
+    ]
+    for tipo, qs in nomes:
+        if fts:
+            with conexao.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {TABELA_FTS} (rowid, texto, tipo, objeto_id) VALUES (%s, %s, %s, %s)',
+                    [(i * 4 + CODIGOS_TIPO[tipo], normalizar(texto), tipo, i) for i, texto in qs],
+                )
+        else:
+            TermoBusca.objects.bulk_create(
+                [TermoBusca(tipo=tipo, objeto_id=i, termo=termo) for i, texto in qs for termo in termos(texto)],
+                batch_size=1000,
+            )
+
+
+def remover_indice_busca(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {TABELA_FTS}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermoBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('aluno', 'Aluno'), ('professor', 'Professor'), ('turma', 'Turma')], max_length=10)),
+                ('objeto_id', models.BigIntegerField()),
+                ('termo', models.CharField(max_length=100)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'termo'], name='termo_busca_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']), models.Index(fields=['tipo', 'objeto_id'], name='termo_busca_objeto_idx')],
+            },
+        ),
+        migrations.RunPython(criar_indice_busca, remover_indice_busca),
+    ]
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    O login busca o usuário pelo e-mail, que no auth_user do Django não tem índice.
+    O índice é criado aqui porque o model User pertence ao contrib.auth.
+    """
+
+    dependencies = [
+        ('core', '0007_busca'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS core_auth_user_email_idx ON auth_user (email);',
+            reverse_sql='DROP INDEX IF EXISTS core_auth_user_email_idx;',
+        ),
+    ]
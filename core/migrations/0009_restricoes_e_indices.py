@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:39
+
+import logging
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+logger = logging.getLogger('core.migrations')
+
+
+def _renomear_repetidos(objetos, maximo):
+    # Mantém o primeiro (menor id) e acrescenta " (2)", " (3)"... aos demais
+    for posicao, obj in enumerate(objetos[1:], start=2):
+        sufixo = f' ({posicao})'
+        anterior = obj.nome
+        obj.nome = obj.nome[:maximo - len(sufixo)] + sufixo
+        obj.save(update_fields=['nome'])
+        logger.warning('%s %s renomeada de %r para %r (nome repetido).', obj._meta.model_name, obj.pk, anterior, obj.nome)
+
+
+def renomear_duplicados(apps, schema_editor):
+    """Bancos antigos podem ter turmas/disciplinas repetidas, que impediriam as restrições."""
+    Turma = apps.get_model('core', 'Turma')
+    Disciplina = apps.get_model('core', 'Disciplina')
+
+    repetidos = Turma.objects.values('nome').annotate(n=Count('id')).filter(n__gt=1)
+    for grupo in repetidos:
+        _renomear_repetidos(list(Turma.objects.filter(nome=grupo['nome']).order_by('id')), 100)
+
+    campos = ('turma', 'nome', 'professor')
+    repetidos = Disciplina.objects.values(*campos).annotate(n=Count('id')).filter(n__gt=1)
+    for grupo in repetidos:
+        filtro = {campo: grupo[campo] for campo in campos}
+        _renomear_repetidos(list(Disciplina.objects.filter(**filtro).order_by('id')), 100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_indice_email_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(renomear_duplicados, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='aluno',
+            index=models.Index(fields=['turma', 'nome_completo', 'id'], name='aluno_turma_nome_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='disciplina',
+            constraint=models.UniqueConstraint(fields=('turma', 'nome', 'professor'), name='disciplina_turma_nome_professor_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='turma',
+            constraint=models.UniqueConstraint(fields=('nome',), name='turma_nome_unico'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_restricoes_e_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assunto', models.CharField(max_length=255)),
+                ('corpo', models.TextField()),
+                ('remetente', models.CharField(max_length=254)),
+                ('destinatarios', models.JSONField()),
+                ('alternativas', models.JSONField(blank=True, default=list)),
+                ('cabecalhos', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('enviado', 'Enviado'), ('falhou', 'Falhou')], default='pendente', max_length=10)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa', 'id'], name='email_fila_idx')],
+            },
+        ),
+    ]
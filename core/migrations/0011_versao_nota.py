@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_fila_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nota',
+            name='versao',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    O login compara LOWER(email), para aceitar o e-mail com qualquer combinação de
+    maiúsculas; o índice de 0008 (email) não serve para essa comparação.
+    """
+
+    dependencies = [
+        ('core', '0011_versao_nota'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS core_auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            reverse_sql='DROP INDEX IF EXISTS core_auth_user_email_lower_idx;',
+        ),
+    ]
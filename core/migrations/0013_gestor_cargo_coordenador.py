@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """O cargo "coordenador" já estava no model, mas faltava na migração 0004."""
+
+    dependencies = [
+        ('core', '0012_indice_email_minusculo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gestor',
+            name='cargo',
+            field=models.CharField(choices=[('diretor', 'Diretor'), ('vice_diretor', 'Vice-Diretor'), ('secretario', 'Secretário'), ('coordenador', 'Coordenador')], max_length=20),
+        ),
+    ]
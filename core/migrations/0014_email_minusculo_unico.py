@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def conferir_emails_repetidos(apps, schema_editor):
+    """O índice único falharia com e-mails repetidos: lista quais são para serem corrigidos."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    repetidos = list(
+        User.objects.values(email_minusculo=Lower('email')).annotate(n=Count('id')).filter(n__gt=1)
+        .order_by('email_minusculo').values_list('email_minusculo', flat=True)
+    )
+    if repetidos:
+        raise RuntimeError(
+            'Há usuários com o mesmo e-mail (sem diferenciar maiúsculas): '
+            f'{", ".join(repr(e) for e in repetidos)}. Corrija-os e rode o migrate de novo.'
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Um e-mail identifica um usuário só no login (EmailBackend compara LOWER(email)):
+    o índice de 0012 passa a ser único.
+    """
+
+    dependencies = [
+        ('core', '0013_gestor_cargo_coordenador'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(conferir_emails_repetidos, migrations.RunPython.noop),
+        migrations.RunSQL(
+            [
+                'DROP INDEX IF EXISTS core_auth_user_email_lower_idx;',
+                'CREATE UNIQUE INDEX core_auth_user_email_lower_unico ON auth_user (LOWER(email));',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS core_auth_user_email_lower_unico;',
+                'CREATE INDEX IF NOT EXISTS core_auth_user_email_lower_idx ON auth_user (LOWER(email));',
+            ],
+        ),
+    ]
@@ -1,9 +1,17 @@
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.functions import Coalesce, NullIf
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Turma(models.Model):
     nome = models.CharField(max_length=100)
 
+    class Meta:
+        # Índices na ordem da paginação por cursor (core/pagination.py)
+        indexes = [models.Index(fields=['nome', 'id'], name='turma_nome_id_idx')]
+        constraints = [models.UniqueConstraint(fields=['nome'], name='turma_nome_unico')]
+
     def __str__(self):
         return self.nome
 
@@ -11,6 +19,9 @@ class Professor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     nome_completo = models.CharField(max_length=255)  # <-- adiciona isso
 
+    class Meta:
+        indexes = [models.Index(fields=['nome_completo', 'id'], name='professor_nome_id_idx')]
+
     def __str__(self):
         return self.nome_completo
 
@@ -21,6 +32,13 @@ class Aluno(models.Model):
     idade = models.IntegerField()
     turma = models.ForeignKey(Turma, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['nome_completo', 'id'], name='aluno_nome_id_idx'),
+            # Alunos de uma turma já em ordem alfabética (lancar_nota, salvar_notas)
+            models.Index(fields=['turma', 'nome_completo', 'id'], name='aluno_turma_nome_idx'),
+        ]
+
     def __str__(self):
         return self.nome_completo
 
@@ -30,9 +48,36 @@ class Disciplina(models.Model):
     professor = models.ForeignKey(Professor, on_delete=models.CASCADE)
     turma = models.ForeignKey(Turma, on_delete=models.CASCADE)
 
+    class Meta:
+        # Também atende "disciplinas da turma" (o índice começa pela turma)
+        constraints = [
+            models.UniqueConstraint(fields=['turma', 'nome', 'professor'], name='disciplina_turma_nome_professor_unico'),
+        ]
+
     def __str__(self):
         return f"{self.nome} ({self.turma})"
 
+def expressao_media(prefixo=''):
+    """
+    Média das notas preenchidas (nota1..nota4) como expressão SQL, ignorando as nulas.
+    Use prefixo para partir de outro model, ex.: expressao_media('nota__').
+    """
+    campos = [f'{prefixo}nota{i}' for i in range(1, 5)]
+    soma = Coalesce(F(campos[0]), Value(0.0))
+    quantidade = Case(When(**{f'{campos[0]}__isnull': False}, then=Value(1)), default=Value(0))
+    for campo in campos[1:]:
+        soma = soma + Coalesce(F(campo), Value(0.0))
+        quantidade = quantidade + Case(When(**{f'{campo}__isnull': False}, then=Value(1)), default=Value(0))
+    # NULLIF evita divisão por zero: sem nenhuma nota a média fica nula, como em Nota.media()
+    return ExpressionWrapper(soma / NullIf(quantidade, Value(0)), output_field=FloatField())
+
+
+class NotaQuerySet(models.QuerySet):
+    def with_media(self, nome='valor_media'):
+        """Anota a média calculada no banco, para filtrar, ordenar e agregar em SQL."""
+        return self.annotate(**{nome: expressao_media()})
+
+
 class Nota(models.Model):
     aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE)
     disciplina = models.ForeignKey(Disciplina, on_delete=models.CASCADE)
@@ -40,6 +85,12 @@ class Nota(models.Model):
     nota2 = models.FloatField(null=True, blank=True)
     nota3 = models.FloatField(null=True, blank=True)
     nota4 = models.FloatField(null=True, blank=True)
+    # Começa em 1 e é incrementada a cada gravação; o salvamento por célula só grava se
+    # o cliente tiver lido a versão atual (0 = nota ainda não existe). Ver
+    # core/services.py: salvar_nota_celula
+    versao = models.PositiveIntegerField(default=1)
+
+    objects = NotaQuerySet.as_manager()
 
     class Meta:
         unique_together = ('aluno', 'disciplina')
@@ -65,5 +116,93 @@ class Gestor(models.Model):
     nome_completo = models.CharField(max_length=150)
     cargo = models.CharField(max_length=20, choices=CARGO_CHOICES)
 
+    class Meta:
+        indexes = [models.Index(fields=['nome_completo', 'id'], name='gestor_nome_id_idx')]
+
+    def __str__(self):
+        return f"{self.nome_completo} ({self.get_cargo_display()})"
+
+# -------------------- RESUMOS DE NOTAS (tabelas desnormalizadas) --------------------
+# Mantidos por core/summary.py; reconstruir com: python manage.py reconstruir_resumos
+class Resumo(models.Model):
+    media = models.FloatField(null=True, blank=True)
+    quantidade = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ResumoNota(Resumo):
+    # quantidade = bimestres preenchidos
+    nota = models.OneToOneField(Nota, on_delete=models.CASCADE, primary_key=True, related_name='resumo')
+    aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name='+')
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.CASCADE, related_name='+')
+    turma = models.ForeignKey(Turma, on_delete=models.CASCADE, related_name='+')
+
+
+class ResumoAluno(Resumo):
+    # quantidade = disciplinas com média
+    aluno = models.OneToOneField(Aluno, on_delete=models.CASCADE, primary_key=True, related_name='resumo')
+
+
+class ResumoDisciplina(Resumo):
+    # quantidade = alunos com média na disciplina
+    disciplina = models.OneToOneField(Disciplina, on_delete=models.CASCADE, primary_key=True, related_name='resumo')
+
+
+class ResumoTurma(Resumo):
+    # quantidade = notas com média nas disciplinas da turma
+    turma = models.OneToOneField(Turma, on_delete=models.CASCADE, primary_key=True, related_name='resumo')
+
+
+# -------------------- BUSCA POR NOME --------------------
+# Índice de termos normalizados (sem acento, minúsculos) mantido por core/search.py.
+# No SQLite com FTS5 a busca usa a tabela virtual core_busca_fts; esta tabela é o
+# índice por prefixo usado quando o FTS5 não está disponível (ou fora do SQLite).
+class TermoBusca(models.Model):
+    TIPO_CHOICES = [
+        ('aluno', 'Aluno'),
+        ('professor', 'Professor'),
+        ('turma', 'Turma'),
+    ]
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    objeto_id = models.BigIntegerField()
+    termo = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            # varchar_pattern_ops só vale no PostgreSQL (LIKE 'termo%' usando o índice)
+            models.Index(fields=['tipo', 'termo'], name='termo_busca_idx',
+                         opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']),
+            models.Index(fields=['tipo', 'objeto_id'], name='termo_busca_objeto_idx'),
+        ]
+
+
+# -------------------- FILA DE E-MAILS --------------------
+# Preenchida por core.mail.FilaEmailBackend (EMAIL_BACKEND) e esvaziada pelo comando
+# enviar_emails, que manda os e-mails pelo backend de EMAIL_BACKEND_ENVIO.
+class EmailPendente(models.Model):
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('enviado', 'Enviado'),
+        ('falhou', 'Falhou'),
+    ]
+    assunto = models.CharField(max_length=255)
+    corpo = models.TextField()
+    remetente = models.CharField(max_length=254)
+    # {'to': [...], 'cc': [...], 'bcc': [...], 'reply_to': [...]}
+    destinatarios = models.JSONField()
+    alternativas = models.JSONField(default=list, blank=True)  # [[conteúdo, mimetype], ...]
+    cabecalhos = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+    erro = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'proxima_tentativa', 'id'], name='email_fila_idx')]
+
     def __str__(self):
-        return f"{self.nome_completo} ({self.get_cargo_display()})"
\ No newline at end of file
+        return f"{self.assunto} ({self.get_status_display()})"
@@ -0,0 +1,113 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def tamanho_pagina(request):
+    """Itens por página: ?por_pagina=N, limitado a PAGINACAO_MAXIMO."""
+    padrao = getattr(settings, 'PAGINACAO_TAMANHO', 25)
+    maximo = getattr(settings, 'PAGINACAO_MAXIMO', 100)
+    try:
+        tamanho = int(request.GET.get('por_pagina', padrao))
+    except ValueError:
+        tamanho = padrao
+    return max(1, min(tamanho, maximo))
+
+
+def codificar_cursor(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, campos):
+    """
+    Valores do cursor convertidos pelos campos de ordenação (model fields), ou None se
+    ele for inválido: base64/JSON quebrado, quantidade ou tipos errados (cursor
+    adulterado ou de outra listagem). Cursor inválido volta para a primeira página.
+    """
+    if not cursor:
+        return None
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(campos):
+        return None
+    if not all(isinstance(v, (str, int, float)) for v in valores):
+        return None
+    try:
+        return [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except ValidationError:
+        return None
+
+
+def _apos(ordenacao, valores, lookup):
+    # (a, b, id) > (va, vb, vid)  =>  a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND id > vid)
+    condicao = Q()
+    for i, campo in enumerate(ordenacao):
+        iguais = {ordenacao[j]: valores[j] for j in range(i)}
+        condicao |= Q(**iguais, **{f'{campo}__{lookup}': valores[i]})
+    return condicao
+
+
+class Pagina:
+    def __init__(self, itens, cursor_anterior=None, cursor_proximo=None):
+        self.itens = itens
+        self.cursor_anterior = cursor_anterior
+        self.cursor_proximo = cursor_proximo
+
+    @property
+    def tem_anterior(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def tem_proxima(self):
+        return self.cursor_proximo is not None
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def paginar(queryset, request, ordenacao):
+    """
+    Paginação por cursor (keyset): em vez de OFFSET, cada página começa depois
+    (?depois=) ou termina antes (?antes=) dos valores de ordenação de um item,
+    então páginas profundas custam o mesmo que a primeira.
+
+    ordenacao: campos do próprio model em ordem crescente; o último deve ser
+    único (normalmente 'id') para a ordem ser total.
+    """
+    tamanho = tamanho_pagina(request)
+    campos = [queryset.model._meta.get_field(campo) for campo in ordenacao]
+    antes = decodificar_cursor(request.GET.get('antes', ''), campos)
+    depois = decodificar_cursor(request.GET.get('depois', ''), campos)
+
+    if antes is not None:
+        qs = queryset.filter(_apos(ordenacao, antes, 'lt')).order_by(*[f'-{c}' for c in ordenacao])
+        itens = list(qs[:tamanho + 1])
+        ha_mais = len(itens) > tamanho
+        itens = itens[:tamanho][::-1]
+        tem_anterior, tem_proxima = ha_mais, True
+    else:
+        qs = queryset.order_by(*ordenacao)
+        if depois is not None:
+            qs = qs.filter(_apos(ordenacao, depois, 'gt'))
+        itens = list(qs[:tamanho + 1])
+        ha_mais = len(itens) > tamanho
+        itens = itens[:tamanho]
+        tem_anterior, tem_proxima = depois is not None, ha_mais
+
+    def cursor(item):
+        return codificar_cursor([getattr(item, campo) for campo in ordenacao])
+
+    return Pagina(
+        itens,
+        cursor_anterior=cursor(itens[0]) if itens and tem_anterior else None,
+        cursor_proximo=cursor(itens[-1]) if itens and tem_proxima else None,
+    )
@@ -0,0 +1,82 @@
+from django.db.models import Avg, Count, F, IntegerField, Q, Value, Window
+from django.db.models.functions import Cast, Floor, Least, PercentRank, Rank
+from django.db.models.lookups import GreaterThanOrEqual
+
+from .models import Aluno, Disciplina, Nota, expressao_media
+from .services import media_aprovacao
+
+# Faixas da distribuição de médias: [0, 1), [1, 2), ... [9, 10]
+FAIXAS = range(10)
+
+
+def ranking_turma(turma_id):
+    """
+    Alunos da turma com a média geral (média das médias nas disciplinas da turma), a
+    posição (RANK, empates na mesma posição) e o percentil (PERCENT_RANK: fração da turma
+    com média menor). Tudo calculado no banco; retorna dicionários, não objetos Aluno.
+    """
+    media = Avg(expressao_media('nota__'), filter=Q(nota__disciplina__turma_id=turma_id))
+    return (
+        Aluno.objects.filter(turma_id=turma_id)
+        .annotate(media=media)
+        .annotate(
+            posicao=Window(Rank(), order_by=F('media').desc(nulls_last=True)),
+            percentil=Window(PercentRank(), order_by=F('media').asc(nulls_first=True)),
+        )
+        .order_by('posicao', 'nome_completo', 'id')
+        .values('id', 'nome_completo', 'media', 'posicao', 'percentil')
+    )
+
+
+def aprovacao_por_disciplina(turma_id, media=None):
+    """
+    Para cada disciplina da turma, por bimestre: notas lançadas e quantas estão acima da
+    média de aprovação; e o mesmo para a média do aluno na disciplina. Agregação
+    condicional (COUNT ... FILTER) numa consulta agrupada só.
+    """
+    media = media_aprovacao() if media is None else media
+    na_turma = Q(nota__aluno__turma_id=F('turma_id'))
+    media_nota = expressao_media('nota__')
+    colunas = {}
+    for i in range(1, 5):
+        colunas[f'lancadas{i}'] = Count(f'nota__nota{i}', filter=na_turma)
+        colunas[f'aprovados{i}'] = Count('nota', filter=na_turma & Q(**{f'nota__nota{i}__gte': media}))
+    return (
+        Disciplina.objects.filter(turma_id=turma_id)
+        .annotate(
+            **colunas,
+            com_media=Count(media_nota, filter=na_turma),
+            aprovados=Count('nota', filter=na_turma & GreaterThanOrEqual(media_nota, media)),
+        )
+        .order_by('nome', 'id')
+        .values('id', 'nome', 'com_media', 'aprovados', *colunas)
+    )
+
+
+def distribuicao_medias(turma_id):
+    """
+    Quantas médias (aluno x disciplina) caem em cada faixa de 1 ponto, agrupadas no
+    banco. Retorna [(início da faixa, quantidade, percentual)] com as 10 faixas.
+    """
+    faixa = Least(Cast(Floor('valor_media'), IntegerField()), Value(9))
+    contagens = dict(
+        Nota.objects.filter(disciplina__turma_id=turma_id, aluno__turma_id=turma_id)
+        .with_media()
+        .filter(valor_media__isnull=False)
+        .annotate(faixa=faixa)
+        .order_by()
+        .values_list('faixa')
+        .annotate(n=Count('id'))
+        .values_list('faixa', 'n')
+    )
+    total = sum(contagens.values())
+    return [(f, contagens.get(f, 0), 100 * contagens.get(f, 0) / total if total else 0) for f in FAIXAS]
+
+
+def relatorio_turma(turma_id, media=None):
+    """Os três relatórios da turma, em três consultas independentes do tamanho da turma."""
+    return {
+        'ranking': list(ranking_turma(turma_id)),
+        'disciplinas': list(aprovacao_por_disciplina(turma_id, media)),
+        'distribuicao': distribuicao_medias(turma_id),
+    }
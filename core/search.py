@@ -0,0 +1,168 @@
+import re
+import threading
+import unicodedata
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Aluno, Professor, TermoBusca, Turma
+
+TABELA_FTS = 'core_busca_fts'
+
+# Código de cada tipo no rowid da tabela FTS (rowid = objeto_id * 4 + código),
+# para atualizar e remover uma entrada sem varrer a tabela
+CODIGOS_TIPO = {'aluno': 1, 'professor': 2, 'turma': 3}
+
+# Primeiro caractere depois de 'z' na ordem binária: termo >= 'jo' AND termo < 'jo{'
+FIM_PREFIXO = '{'
+
+_fts_por_banco = {}
+
+# Remoções acumuladas até o commit (exclusões em cascata removem muitos objetos de uma vez)
+_remocoes = threading.local()
+
+
+def normalizar(texto):
+    """'João  Conceição' -> 'joao conceicao'"""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return ' '.join(re.findall(r'[a-z0-9]+', texto.lower()))
+
+
+def termos(texto):
+    vistos = []
+    for termo in normalizar(texto).split():
+        termo = termo[:100]
+        if termo not in vistos:
+            vistos.append(termo)
+    return vistos
+
+
+def fts_disponivel():
+    """True se a tabela FTS5 existe neste banco (criada na migração quando o SQLite tem FTS5)."""
+    if connection.vendor != 'sqlite':
+        return False
+    chave = (connection.alias, str(connection.settings_dict['NAME']))
+    if chave not in _fts_por_banco:
+        _fts_por_banco[chave] = TABELA_FTS in connection.introspection.table_names(include_views=False)
+    return _fts_por_banco[chave]
+
+
+def criar_tabela_fts(cursor):
+    """Cria a tabela FTS5. Levanta OperationalError se o SQLite não tiver FTS5."""
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+        "texto, tipo UNINDEXED, objeto_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def indexar_em_lote(tipo, itens):
+    """itens: pares (objeto_id, texto). Substitui as entradas existentes desses objetos."""
+    itens = list(itens)
+    if not itens:
+        return
+    ids = [objeto_id for objeto_id, _ in itens]
+    if fts_disponivel():
+        codigo = CODIGOS_TIPO[tipo]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABELA_FTS} WHERE rowid = %s', [(i * 4 + codigo,) for i in ids])
+            cursor.executemany(
+                f'INSERT INTO {TABELA_FTS} (rowid, texto, tipo, objeto_id) VALUES (%s, %s, %s, %s)',
+                [(i * 4 + codigo, normalizar(texto), tipo, i) for i, texto in itens],
+            )
+    else:
+        TermoBusca.objects.filter(tipo=tipo, objeto_id__in=ids).delete()
+        TermoBusca.objects.bulk_create(
+            [TermoBusca(tipo=tipo, objeto_id=i, termo=termo) for i, texto in itens for termo in termos(texto)],
+            batch_size=1000,
+        )
+
+
+def indexar(tipo, objeto_id, texto):
+    indexar_em_lote(tipo, [(objeto_id, texto)])
+
+
+def remover_em_lote(tipo, ids):
+    ids = list(ids)
+    if not ids:
+        return
+    if fts_disponivel():
+        codigo = CODIGOS_TIPO[tipo]
+        with connection.cursor() as cursor:
+            for inicio in range(0, len(ids), 500):
+                lote = [i * 4 + codigo for i in ids[inicio:inicio + 500]]
+                cursor.execute(f'DELETE FROM {TABELA_FTS} WHERE rowid IN ({", ".join(["%s"] * len(lote))})', lote)
+    else:
+        TermoBusca.objects.filter(tipo=tipo, objeto_id__in=ids).delete()
+
+
+def remover(tipo, objeto_id):
+    """
+    Remove do índice quando a transação confirmar, junto com as demais remoções dela.
+    Se a transação for desfeita o callback sai da fila de on_commit e o lote é descartado.
+    """
+    processar = getattr(_remocoes, 'processar', None)
+    pendente = processar is not None and any(
+        callback is processar for _, callback, _ in transaction.get_connection().run_on_commit
+    )
+    if not pendente:
+        _remocoes.ids = {}
+        processar = _remocoes.processar = partial(_remover_pendentes, _remocoes.ids)
+    _remocoes.ids.setdefault(tipo, set()).add(objeto_id)
+    if not pendente:
+        transaction.on_commit(processar)
+
+
+def _remover_pendentes(pendentes):
+    if getattr(_remocoes, 'ids', None) is pendentes:
+        _remocoes.ids = _remocoes.processar = None
+    for tipo, ids in pendentes.items():
+        remover_em_lote(tipo, sorted(ids))
+
+
+def _prefixo(termo):
+    if connection.vendor == 'postgresql':
+        # LIKE 'termo%' servido pelo índice varchar_pattern_ops
+        return Q(termo__startswith=termo)
+    return Q(termo__gte=termo, termo__lt=termo + FIM_PREFIXO)
+
+
+def buscar(queryset, tipo, texto):
+    """
+    Filtra o queryset pelos objetos cujo nome tem palavras começando com cada termo
+    buscado, sem diferenciar acentos e maiúsculas ('joao sil' encontra 'João da Silva').
+    """
+    busca = termos(texto)
+    if not busca:
+        return queryset
+    if fts_disponivel():
+        consulta = ' '.join(f'"{termo}"*' for termo in busca)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT objeto_id FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s AND tipo = %s', (consulta, tipo),
+        ))
+    for termo in busca:
+        ids = TermoBusca.objects.filter(_prefixo(termo), tipo=tipo).values('objeto_id')
+        queryset = queryset.filter(pk__in=ids)
+    return queryset
+
+
+def reindexar_tudo():
+    if fts_disponivel():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABELA_FTS}')
+    else:
+        TermoBusca.objects.all().delete()
+    for tipo, qs in (
+        ('aluno', Aluno.objects.values_list('id', 'nome_completo')),
+        ('professor', Professor.objects.values_list('id', 'nome_completo')),
+        ('turma', Turma.objects.values_list('id', 'nome')),
+    ):
+        lote = []
+        for item in qs.iterator(chunk_size=2000):
+            lote.append(item)
+            if len(lote) >= 2000:
+                indexar_em_lote(tipo, lote)
+                lote = []
+        indexar_em_lote(tipo, lote)
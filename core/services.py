@@ -0,0 +1,215 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThan
+
+from .models import Aluno, Nota, expressao_media
+from .signals import notas_salvas
+
+CAMPOS_NOTA = ('nota1', 'nota2', 'nota3', 'nota4')
+
+# conflitos: ids dos alunos cuja nota outra pessoa alterou depois da leitura (não gravados)
+ResultadoLancamento = namedtuple(
+    'ResultadoLancamento', ['criadas', 'atualizadas', 'inalteradas', 'conflitos'], defaults=[()],
+)
+
+
+def parse_nota(valor_str):
+    """Converte o valor digitado em nota. Retorna None se vazio ou fora de 0 a 10."""
+    if valor_str is None or valor_str.strip() == '':
+        return None
+    try:
+        valor = float(valor_str)
+    except ValueError:
+        return None
+    if 0 <= valor <= 10:
+        return valor
+    return None
+
+
+def _versao_lida(dados, aluno_id):
+    """Versão da linha que o formulário leu (versao_<aluno_id>); None se não veio."""
+    texto = dados.get(f'versao_{aluno_id}')
+    if texto is None:
+        return None
+    try:
+        return int(texto)
+    except ValueError:
+        return 0
+
+
+def salvar_notas(disciplina, dados):
+    """
+    Grava as notas enviadas pelo formulário de lançamento (campos notaN_<aluno_id>).
+
+    Busca todas as notas da disciplina numa consulta só, compara com o que veio
+    no POST e grava apenas as linhas que mudaram, dentro de uma única transação.
+    Campos vazios ou inválidos mantêm a nota antiga.
+
+    Concorrência otimista, como em salvar_nota_celula: o formulário devolve em
+    versao_<aluno_id> a versão lida de cada linha, e cada linha alterada é um UPDATE
+    condicionado a ela. Se outra pessoa gravou antes (ou criou a nota enquanto isso),
+    a linha não é sobrescrita e o aluno volta em conflitos. Sem versao_<aluno_id>
+    (chamadas que não vêm do formulário), grava sem conferir a versão.
+    """
+    aluno_ids = Aluno.objects.filter(turma_id=disciplina.turma_id).order_by('id').values_list('id', flat=True)
+
+    with transaction.atomic():
+        existentes = {n.aluno_id: n for n in Nota.objects.filter(disciplina=disciplina)}
+
+        novas, alteradas = [], []
+        inalteradas = 0
+        for aluno_id in aluno_ids:
+            valores = {}
+            for i, campo in enumerate(CAMPOS_NOTA, start=1):
+                valor = parse_nota(dados.get(f'nota{i}_{aluno_id}'))
+                if valor is not None:
+                    valores[campo] = valor
+
+            nota_obj = existentes.get(aluno_id)
+            if nota_obj is None:
+                if valores:
+                    novas.append(Nota(aluno_id=aluno_id, disciplina=disciplina, **valores))
+                continue
+
+            mudancas = {campo: valor for campo, valor in valores.items() if getattr(nota_obj, campo) != valor}
+            if not mudancas:
+                inalteradas += 1
+                continue
+            versao = _versao_lida(dados, aluno_id)
+            alteradas.append((nota_obj, nota_obj.versao if versao is None else versao, mudancas))
+
+        gravados, conflitos = [], []
+        if novas:
+            try:
+                with transaction.atomic():
+                    Nota.objects.bulk_create(novas)
+                gravados += [n.aluno_id for n in novas]
+            except IntegrityError:
+                # Outra pessoa criou a nota de algum destes alunos enquanto isso:
+                # grava uma a uma e devolve as que já existiam como conflito
+                for nota_obj in novas:
+                    try:
+                        with transaction.atomic():
+                            Nota.objects.bulk_create([nota_obj])
+                        gravados.append(nota_obj.aluno_id)
+                    except IntegrityError:
+                        conflitos.append(nota_obj.aluno_id)
+        criadas = len(gravados)
+
+        for nota_obj, versao, mudancas in alteradas:
+            if Nota.objects.filter(pk=nota_obj.pk, versao=versao).update(**mudancas, versao=F('versao') + 1):
+                gravados.append(nota_obj.aluno_id)
+            else:
+                conflitos.append(nota_obj.aluno_id)
+        atualizadas = len(gravados) - criadas
+
+        if gravados:
+            notas_salvas.send(sender=Nota, disciplina=disciplina, aluno_ids=gravados)
+
+    return ResultadoLancamento(criadas, atualizadas, inalteradas, tuple(conflitos))
+
+
+class ConflitoNota(Exception):
+    """A nota foi alterada por outra pessoa depois de lida. nota_atual: o que está no banco (ou None)."""
+
+    def __init__(self, nota_atual):
+        super().__init__('A nota foi alterada por outra pessoa.')
+        self.nota_atual = nota_atual
+
+
+def salvar_nota_celula(disciplina, aluno_id, bimestre, valor, versao):
+    """
+    Grava uma célula (bimestre 1 a 4) da nota de um aluno, com concorrência otimista:
+    versao é a versão que o cliente leu (0 se a nota ainda não existia). A gravação é um
+    UPDATE de uma linha condicionado à versão, ou um INSERT; se outra pessoa gravou
+    antes, levanta ConflitoNota. valor None apaga a nota do bimestre.
+
+    Retorna a nota atualizada.
+    """
+    campo = CAMPOS_NOTA[bimestre - 1]
+    notas = Nota.objects.filter(aluno_id=aluno_id, disciplina=disciplina)
+    with transaction.atomic():
+        if versao:
+            if not notas.filter(versao=versao).update(**{campo: valor}, versao=F('versao') + 1):
+                raise ConflitoNota(notas.first())
+        else:
+            if not Aluno.objects.filter(id=aluno_id, turma_id=disciplina.turma_id).exists():
+                raise Aluno.DoesNotExist('Aluno não pertence à turma da disciplina.')
+            try:
+                with transaction.atomic():
+                    Nota.objects.bulk_create([Nota(aluno_id=aluno_id, disciplina=disciplina, **{campo: valor})])
+            except IntegrityError:
+                # Outra pessoa criou a nota deste aluno enquanto isso
+                raise ConflitoNota(notas.first())
+        notas_salvas.send(sender=Nota, disciplina=disciplina, aluno_ids=[aluno_id])
+        return notas.get()
+
+
+def media_aprovacao():
+    return getattr(settings, 'MEDIA_APROVACAO', 6)
+
+
+def disciplinas_com_estatisticas(disciplinas):
+    """
+    Anota em cada disciplina, numa única consulta agrupada (Nota juntada ao aluno):
+    alunos (da turma), preenchidas1..preenchidas4 (notas lançadas por bimestre),
+    media (média das médias dos alunos) e abaixo_da_media (alunos com média abaixo de
+    MEDIA_APROVACAO). Só contam as notas de alunos que ainda estão na turma da disciplina.
+    """
+    na_turma = Q(nota__aluno__turma_id=F('turma_id'))
+    media_nota = expressao_media('nota__')
+    alunos_da_turma = (
+        Aluno.objects.filter(turma_id=OuterRef('turma_id')).order_by()
+        .values('turma_id').annotate(total=Count('id')).values('total')
+    )
+    return disciplinas.select_related('turma').annotate(
+        alunos=Coalesce(Subquery(alunos_da_turma), 0),
+        **{f'preenchidas{i}': Count(f'nota__nota{i}', filter=na_turma) for i in range(1, 5)},
+        media=Avg(media_nota, filter=na_turma),
+        abaixo_da_media=Count('nota', filter=na_turma & Q(LessThan(media_nota, media_aprovacao()))),
+    )
+
+
+class MatrizNotas:
+    """Alunos x disciplinas x notas, com as notas indexadas por (aluno_id, disciplina_id)."""
+
+    def __init__(self, alunos, disciplinas, notas):
+        self.alunos = alunos
+        self.disciplinas = disciplinas
+        self.notas = {(n.aluno_id, n.disciplina_id): n for n in notas}
+
+    def get(self, aluno_id, disciplina_id):
+        return self.notas.get((aluno_id, disciplina_id))
+
+    def notas_da_disciplina(self, disciplina_id):
+        # aluno_id -> Nota ou None, no formato que os templates já usam em notas_dict
+        return {a.id: self.get(a.id, disciplina_id) for a in self.alunos}
+
+    def notas_do_aluno(self, aluno_id):
+        # disciplina_id -> Nota ou None
+        return {d.id: self.get(aluno_id, d.id) for d in self.disciplinas}
+
+
+def carregar_matriz_notas(alunos, disciplinas):
+    """
+    Carrega a matriz de notas em no máximo três consultas (alunos, disciplinas e notas),
+    independente do tamanho da turma. Aceita querysets ou listas já carregadas.
+    """
+    if hasattr(alunos, 'select_related'):
+        alunos = alunos.select_related('user')
+    if hasattr(disciplinas, 'select_related'):
+        disciplinas = disciplinas.select_related('turma')
+    alunos = list(alunos)
+    disciplinas = list(disciplinas)
+
+    notas = []
+    if alunos and disciplinas:
+        notas = Nota.objects.filter(
+            aluno_id__in=[a.id for a in alunos],
+            disciplina_id__in=[d.id for d in disciplinas],
+        )
+    return MatrizNotas(alunos, disciplinas, notas)
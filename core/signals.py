@@ -0,0 +1,164 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import search
+from .counters import MODELOS_CONTADOS, ajustar_contador
+from .fragments import invalidar_ao_confirmar
+from .models import Aluno, Disciplina, Nota, Professor, Turma
+from .summary import agendar_atualizacao, atualizar_resumos, disciplina_movida
+
+# Enviado por services.salvar_notas depois de gravar as notas em lote, já que
+# bulk_create/bulk_update não disparam post_save. Argumentos: disciplina, aluno_ids.
+notas_salvas = Signal()
+
+
+# -------------------- RESUMOS DE NOTAS --------------------
+@receiver(notas_salvas)
+def atualizar_resumos_do_lancamento(sender, disciplina, aluno_ids, **kwargs):
+    atualizar_resumos(notas=Nota.objects.filter(disciplina=disciplina, aluno_id__in=aluno_ids))
+
+
+@receiver(post_save, sender=Nota)
+def atualizar_resumo_da_nota(sender, instance, **kwargs):
+    atualizar_resumos(notas=Nota.objects.filter(pk=instance.pk))
+
+
+# Exclusões chegam em cascata (excluir_aluno, excluir_disciplina, excluir_turma);
+# os ids são acumulados e os resumos recalculados uma vez só, ao confirmar a transação.
+@receiver(post_delete, sender=Nota)
+def nota_excluida(sender, instance, **kwargs):
+    agendar_atualizacao(aluno_ids=[instance.aluno_id], disciplina_ids=[instance.disciplina_id])
+
+
+@receiver(post_save, sender=Disciplina)
+def disciplina_salva(sender, instance, created, **kwargs):
+    # _anterior vem de lembrar_disciplina_anterior (pre_save)
+    anterior = getattr(instance, '_anterior', None)
+    if not created and anterior and anterior[1] != instance.turma_id:
+        disciplina_movida(instance.pk, instance.turma_id, anterior[1])
+
+
+@receiver(post_delete, sender=Disciplina)
+def disciplina_excluida(sender, instance, **kwargs):
+    agendar_atualizacao(turma_ids=[instance.turma_id])
+
+
+# -------------------- CONTADORES DOS PAINÉIS --------------------
+def contar_criado(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: ajustar_contador(sender, 1))
+
+
+def contar_excluido(sender, instance, **kwargs):
+    transaction.on_commit(lambda: ajustar_contador(sender, -1))
+
+
+for _modelo in MODELOS_CONTADOS.values():
+    post_save.connect(contar_criado, sender=_modelo, dispatch_uid=f'contador_criado_{_modelo.__name__}')
+    post_delete.connect(contar_excluido, sender=_modelo, dispatch_uid=f'contador_excluido_{_modelo.__name__}')
+
+
+# -------------------- ÍNDICE DE BUSCA --------------------
+@receiver(post_save, sender=Aluno)
+def indexar_aluno(sender, instance, **kwargs):
+    search.indexar('aluno', instance.pk, instance.nome_completo)
+
+
+@receiver(post_save, sender=Professor)
+def indexar_professor(sender, instance, **kwargs):
+    search.indexar('professor', instance.pk, instance.nome_completo)
+
+
+@receiver(post_save, sender=Turma)
+def indexar_turma(sender, instance, **kwargs):
+    search.indexar('turma', instance.pk, instance.nome)
+
+
+@receiver(post_delete, sender=Aluno)
+def desindexar_aluno(sender, instance, **kwargs):
+    search.remover('aluno', instance.pk)
+
+
+@receiver(post_delete, sender=Professor)
+def desindexar_professor(sender, instance, **kwargs):
+    search.remover('professor', instance.pk)
+
+
+@receiver(post_delete, sender=Turma)
+def desindexar_turma(sender, instance, **kwargs):
+    search.remover('turma', instance.pk)
+
+
+# -------------------- FRAGMENTOS EM CACHE --------------------
+# Escopos por objeto (aluno:<id>, turma:<id>, ...) e globais (turmas, disciplinas, ...);
+# ver core/fragments.py e os fragmentos usados nas views. Uma nota invalida só a sua
+# disciplina e o seu aluno; o escopo global 'notas' serve apenas à análise da escola
+# inteira (core/analytics.py).
+@receiver(notas_salvas)
+def invalidar_notas_do_lancamento(sender, disciplina, aluno_ids, **kwargs):
+    invalidar_ao_confirmar('notas', f'disciplina:{disciplina.pk}', *[f'aluno:{i}' for i in aluno_ids])
+
+
+@receiver(post_save, sender=Nota)
+@receiver(post_delete, sender=Nota)
+def invalidar_nota(sender, instance, **kwargs):
+    invalidar_ao_confirmar('notas', f'disciplina:{instance.disciplina_id}', f'aluno:{instance.aluno_id}')
+
+
+@receiver(pre_save, sender=Aluno)
+def lembrar_turma_anterior(sender, instance, **kwargs):
+    # Um aluno trocado de turma muda a lista das duas turmas
+    instance._turma_anterior = None
+    if instance.pk:
+        instance._turma_anterior = Aluno.objects.filter(pk=instance.pk).values_list('turma_id', flat=True).first()
+
+
+@receiver(post_save, sender=Aluno)
+@receiver(post_delete, sender=Aluno)
+def invalidar_aluno(sender, instance, **kwargs):
+    turmas = {instance.turma_id, getattr(instance, '_turma_anterior', None)} - {None}
+    invalidar_ao_confirmar('alunos', f'aluno:{instance.pk}', *[f'turma:{i}' for i in turmas])
+
+
+@receiver(post_save, sender=Turma)
+@receiver(post_delete, sender=Turma)
+def invalidar_turma(sender, instance, **kwargs):
+    invalidar_ao_confirmar('turmas', f'turma:{instance.pk}')
+
+
+@receiver(post_save, sender=Professor)
+@receiver(post_delete, sender=Professor)
+def invalidar_professor(sender, instance, **kwargs):
+    invalidar_ao_confirmar('professores', f'professor:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def invalidar_nome_do_usuario(sender, instance, update_fields=None, **kwargs):
+    # O nome do professor vem do User; o login só atualiza last_login
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        invalidar_ao_confirmar('professores')
+
+
+@receiver(pre_save, sender=Disciplina)
+def lembrar_disciplina_anterior(sender, instance, **kwargs):
+    # Uma disciplina trocada de professor ou turma precisa invalidar também os anteriores
+    # e, se mudou de turma, mover os resumos (disciplina_salva)
+    instance._anterior = None
+    if instance.pk:
+        instance._anterior = Disciplina.objects.filter(pk=instance.pk).values_list('professor_id', 'turma_id').first()
+
+
+@receiver(post_save, sender=Disciplina)
+@receiver(post_delete, sender=Disciplina)
+def invalidar_disciplina(sender, instance, **kwargs):
+    professores, turmas = {instance.professor_id}, {instance.turma_id}
+    anterior = getattr(instance, '_anterior', None)
+    if anterior:
+        professores.add(anterior[0])
+        turmas.add(anterior[1])
+    invalidar_ao_confirmar(
+        'disciplinas', f'disciplina:{instance.pk}',
+        *[f'professor:{i}' for i in professores], *[f'turma:{i}' for i in turmas],
+    )
@@ -0,0 +1,78 @@
+// Salvamento automático das notas em lancar_nota: cada célula é gravada ao perder o
+// foco (PATCH em views.salvar_nota) e a média da linha é atualizada sem recarregar.
+// O botão Salvar continua funcionando para quem estiver sem JavaScript.
+(function () {
+  const csrf = document.querySelector('input[name=csrfmiddlewaretoken]').value;
+
+  function formatar(valor) {
+    return valor === null ? '' : String(valor);
+  }
+
+  function preencherLinha(linha, nota) {
+    // A versão fica num campo oculto para o botão Salvar também enviá-la (services.salvar_notas)
+    linha.querySelector('input.versao').value = nota.versao;
+    linha.querySelectorAll('.nota-input').forEach(function (campo) {
+      if (campo !== document.activeElement) {
+        campo.value = formatar(nota['nota' + campo.dataset.bimestre]);
+      }
+    });
+    linha.querySelector('.media').textContent =
+      nota.media === null ? '-' : nota.media.toFixed(2).replace('.', ',');
+  }
+
+  function marcar(campo, estado, mensagem) {
+    campo.classList.remove('salvando', 'salva', 'erro');
+    if (estado) campo.classList.add(estado);
+    campo.title = mensagem || '';
+  }
+
+  async function salvar(campo) {
+    const linha = campo.closest('tr');
+    marcar(campo, 'salvando');
+    let resposta;
+    try {
+      resposta = await fetch(linha.dataset.url, {
+        method: 'PATCH',
+        headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrf},
+        body: JSON.stringify({
+          bimestre: Number(campo.dataset.bimestre),
+          valor: campo.value.trim().replace(',', '.'),
+          versao: Number(linha.querySelector('input.versao').value),
+        }),
+      });
+    } catch (e) {
+      marcar(campo, 'erro', 'Sem conexão: a nota não foi salva.');
+      return;
+    }
+    // Sessão expirada: o fetch segue o redirecionamento e recebe a página de login em HTML
+    let dados = null;
+    const tipo = resposta.headers.get('Content-Type') || '';
+    if (!resposta.redirected && tipo.indexOf('application/json') !== -1) {
+      try {
+        dados = await resposta.json();
+      } catch (e) {
+        dados = null;
+      }
+    }
+    if (dados === null) {
+      marcar(campo, 'erro', 'Sessão expirada ou resposta inesperada: a nota não foi salva. Recarregue a página.');
+      return;
+    }
+    if (resposta.ok) {
+      preencherLinha(linha, dados.nota);
+      marcar(campo, 'salva');
+    } else if (resposta.status === 409) {
+      // Outra pessoa alterou esta nota: mostra o valor atual em vez de sobrescrever
+      campo.blur();
+      preencherLinha(linha, dados.nota);
+      marcar(campo, 'erro', dados.erro + ' O valor atual foi carregado; digite de novo se quiser alterar.');
+    } else {
+      marcar(campo, 'erro', dados.erro);
+    }
+  }
+
+  // "change" só dispara ao sair da célula se o valor mudou
+  document.querySelectorAll('tr[data-url] .nota-input').forEach(function (campo) {
+    campo.addEventListener('change', function () { salvar(campo); });
+  });
+})();
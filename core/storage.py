@@ -0,0 +1,31 @@
+from django.core.files.base import ContentFile
+
+from .assets import minificar_css
+
+try:
+    # Com o WhiteNoise instalado os arquivos também são gravados em .gz/.br
+    from whitenoise.storage import CompressedManifestStaticFilesStorage as _Base
+except ImportError:
+    from django.contrib.staticfiles.storage import ManifestStaticFilesStorage as _Base
+
+
+class EstaticosOtimizados(_Base):
+    """
+    Storage do collectstatic em produção: minifica o CSS e grava cada arquivo com
+    o hash do conteúdo no nome (painel_super.3f2a9c.css), que pode então ser servido
+    com cache "immutable" de um ano.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = dict(paths)
+            for caminho in paths:
+                if not caminho.endswith('.css'):
+                    continue
+                with self.open(caminho) as arquivo:
+                    css = arquivo.read().decode('utf-8')
+                self.delete(caminho)
+                self.save(caminho, ContentFile(minificar_css(css).encode('utf-8')))
+                # O hash passa a ser calculado sobre a cópia minificada
+                paths[caminho] = (self, caminho)
+        yield from super().post_process(paths, dry_run, **options)
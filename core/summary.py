@@ -0,0 +1,197 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Avg, Case, Count, Value, When
+
+from .models import (
+    Aluno, Disciplina, Nota, ResumoAluno, ResumoDisciplina, ResumoNota, ResumoTurma, Turma,
+)
+
+TAMANHO_LOTE = 2000
+
+# Lote de ids afetados (exclusões em cascata, disciplina trocada de turma), processado
+# quando a transação confirmar
+_pendentes = threading.local()
+
+
+def _bimestres_preenchidos():
+    soma = None
+    for i in range(1, 5):
+        termo = Case(When(**{f'nota{i}__isnull': False}, then=Value(1)), default=Value(0))
+        soma = termo if soma is None else soma + termo
+    return soma
+
+
+def _linhas_resumo_nota(notas):
+    """Gera ResumoNota a partir de um queryset de Nota, sem carregar os objetos Nota."""
+    linhas = (
+        notas.with_media()
+        .annotate(preenchidas=_bimestres_preenchidos())
+        .values_list('id', 'aluno_id', 'disciplina_id', 'disciplina__turma_id', 'valor_media', 'preenchidas')
+    )
+    for nota_id, aluno_id, disciplina_id, turma_id, media, preenchidas in linhas.iterator(chunk_size=TAMANHO_LOTE):
+        yield ResumoNota(
+            nota_id=nota_id, aluno_id=aluno_id, disciplina_id=disciplina_id,
+            turma_id=turma_id, media=media, quantidade=preenchidas,
+        )
+
+
+def _agregados(campo, ids=None):
+    """Média e contagem das médias de ResumoNota agrupadas por aluno, disciplina ou turma."""
+    qs = ResumoNota.objects.all()
+    if ids is not None:
+        qs = qs.filter(**{f'{campo}_id__in': ids})
+    return qs.values(f'{campo}_id').annotate(m=Avg('media'), n=Count('media')).values_list(f'{campo}_id', 'm', 'n')
+
+
+def _gravar_agregados(modelo, campo, ids):
+    # Um grupo só tem linha de resumo enquanto existir alguma ResumoNota para ele
+    linhas = [modelo(**{f'{campo}_id': chave, 'media': m, 'quantidade': n}) for chave, m, n in _agregados(campo, ids)]
+    if linhas:
+        modelo.objects.bulk_create(
+            linhas, update_conflicts=True, unique_fields=[campo], update_fields=['media', 'quantidade'],
+        )
+    vazios = set(ids) - {getattr(linha, f'{campo}_id') for linha in linhas}
+    if vazios:
+        modelo.objects.filter(**{f'{campo}_id__in': vazios}).delete()
+
+
+@transaction.atomic
+def atualizar_resumos(disciplina_ids=(), aluno_ids=(), turma_ids=(), notas=None):
+    """
+    Atualização incremental: recalcula só as linhas de resumo afetadas.
+
+    notas: queryset de Nota cujo ResumoNota deve ser recalculado (ex.: as notas
+    gravadas em lancar_nota). Os resumos de aluno, disciplina e turma são
+    recalculados para os ids informados e para os ids dessas notas.
+    """
+    aluno_ids, disciplina_ids, turma_ids = set(aluno_ids), set(disciplina_ids), set(turma_ids)
+
+    if notas is not None:
+        novas = list(_linhas_resumo_nota(notas))
+        if novas:
+            ResumoNota.objects.bulk_create(
+                novas, update_conflicts=True, unique_fields=['nota'],
+                update_fields=['aluno', 'disciplina', 'turma', 'media', 'quantidade'],
+            )
+        for r in novas:
+            aluno_ids.add(r.aluno_id)
+            disciplina_ids.add(r.disciplina_id)
+            turma_ids.add(r.turma_id)
+
+    # Descarta ids de objetos que já foram excluídos (o resumo deles saiu em cascata)
+    aluno_ids = set(Aluno.objects.filter(id__in=aluno_ids).values_list('id', flat=True))
+    disciplinas = dict(Disciplina.objects.filter(id__in=disciplina_ids).values_list('id', 'turma_id'))
+    turma_ids = set(Turma.objects.filter(id__in=turma_ids | set(disciplinas.values())).values_list('id', flat=True))
+
+    _gravar_agregados(ResumoAluno, 'aluno', aluno_ids)
+    _gravar_agregados(ResumoDisciplina, 'disciplina', set(disciplinas))
+    _gravar_agregados(ResumoTurma, 'turma', turma_ids)
+
+
+def agendar_atualizacao(disciplina_ids=(), aluno_ids=(), turma_ids=()):
+    """
+    Acumula ids afetados e atualiza os resumos uma única vez, quando a transação confirmar.
+
+    O lote pendente vale enquanto o callback dele estiver na fila de on_commit da
+    conexão; se a transação for desfeita o callback sai da fila e o próximo
+    agendamento começa um lote novo, sem os ids da transação desfeita.
+    """
+    conexao = transaction.get_connection()
+    processar = getattr(_pendentes, 'processar', None)
+    pendente = processar is not None and any(callback is processar for _, callback, _ in conexao.run_on_commit)
+    if not pendente:
+        _pendentes.ids = {'disciplina_ids': set(), 'aluno_ids': set(), 'turma_ids': set()}
+        processar = _pendentes.processar = partial(_processar_pendentes, _pendentes.ids)
+    _pendentes.ids['disciplina_ids'].update(disciplina_ids)
+    _pendentes.ids['aluno_ids'].update(aluno_ids)
+    _pendentes.ids['turma_ids'].update(turma_ids)
+    if not pendente:
+        transaction.on_commit(processar)
+
+
+def _processar_pendentes(ids):
+    if getattr(_pendentes, 'ids', None) is ids:
+        _pendentes.ids = _pendentes.processar = None
+    atualizar_resumos(**ids)
+
+
+def disciplina_movida(disciplina_id, turma_id, turma_anterior_id):
+    """ResumoNota guarda a turma da disciplina: corrige as linhas e recalcula as duas turmas."""
+    ResumoNota.objects.filter(disciplina_id=disciplina_id).update(turma_id=turma_id)
+    agendar_atualizacao(turma_ids=[turma_anterior_id, turma_id])
+
+
+@transaction.atomic
+def reconstruir_resumos():
+    """Apaga e recalcula todos os resumos a partir das notas."""
+    ResumoNota.objects.all().delete()
+    ResumoAluno.objects.all().delete()
+    ResumoDisciplina.objects.all().delete()
+    ResumoTurma.objects.all().delete()
+
+    lote = []
+    for resumo in _linhas_resumo_nota(Nota.objects.all()):
+        lote.append(resumo)
+        if len(lote) >= TAMANHO_LOTE:
+            ResumoNota.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        ResumoNota.objects.bulk_create(lote)
+
+    for modelo, campo in ((ResumoAluno, 'aluno'), (ResumoDisciplina, 'disciplina'), (ResumoTurma, 'turma')):
+        modelo.objects.bulk_create(
+            [modelo(**{f'{campo}_id': chave, 'media': m, 'quantidade': n}) for chave, m, n in _agregados(campo)],
+            batch_size=TAMANHO_LOTE,
+        )
+
+
+def recalcular_em_memoria():
+    """
+    Recalcula todos os resumos em Python, a partir de Nota.media(), sem usar as
+    expressões SQL. Serve de referência para conferir as tabelas de resumo.
+    """
+    por_nota, grupos = {}, {'aluno': {}, 'disciplina': {}, 'turma': {}}
+    for nota in Nota.objects.select_related('disciplina').iterator(chunk_size=TAMANHO_LOTE):
+        media = nota.media()
+        preenchidas = sum(1 for n in (nota.nota1, nota.nota2, nota.nota3, nota.nota4) if n is not None)
+        por_nota[nota.id] = (media, preenchidas)
+        chaves = {'aluno': nota.aluno_id, 'disciplina': nota.disciplina_id, 'turma': nota.disciplina.turma_id}
+        for campo, chave in chaves.items():
+            medias = grupos[campo].setdefault(chave, [])
+            if media is not None:
+                medias.append(media)
+
+    esperado = {'nota': por_nota}
+    for campo, medias_por_chave in grupos.items():
+        esperado[campo] = {
+            chave: ((sum(medias) / len(medias)) if medias else None, len(medias))
+            for chave, medias in medias_por_chave.items()
+        }
+    return esperado
+
+
+def conferir_resumos(tolerancia=1e-9):
+    """Compara as tabelas de resumo com o recálculo completo. Retorna a lista de divergências."""
+    esperado = recalcular_em_memoria()
+    atual = {
+        'nota': {r.nota_id: (r.media, r.quantidade) for r in ResumoNota.objects.all()},
+        'aluno': {r.aluno_id: (r.media, r.quantidade) for r in ResumoAluno.objects.all()},
+        'disciplina': {r.disciplina_id: (r.media, r.quantidade) for r in ResumoDisciplina.objects.all()},
+        'turma': {r.turma_id: (r.media, r.quantidade) for r in ResumoTurma.objects.all()},
+    }
+
+    divergencias = []
+    for escopo in ('nota', 'aluno', 'disciplina', 'turma'):
+        for chave in esperado[escopo].keys() | atual[escopo].keys():
+            e, a = esperado[escopo].get(chave), atual[escopo].get(chave)
+            if e is None or a is None or e[1] != a[1] or not _mesma_media(e[0], a[0], tolerancia):
+                divergencias.append((escopo, chave, e, a))
+    return divergencias
+
+
+def _mesma_media(a, b, tolerancia):
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) <= tolerancia
@@ -0,0 +1,150 @@
+import random
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import search
+from .counters import invalidar_contadores
+from .fragments import invalidar
+from .hashers import hash_provisorio
+from .models import Aluno, Disciplina, Gestor, Nota, Professor, Turma
+from .summary import atualizar_resumos
+
+NOMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João',
+    'Larissa', 'Lucas', 'Mariana', 'Mateus', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago',
+)
+SOBRENOMES = (
+    'Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Oliveira', 'Pereira',
+    'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza', 'Teixeira',
+)
+MATERIAS = (
+    'Matemática', 'Português', 'História', 'Geografia', 'Ciências', 'Inglês', 'Artes',
+    'Educação Física', 'Física', 'Química', 'Biologia', 'Filosofia', 'Sociologia',
+)
+
+SENHA_PADRAO = 'sige1234'
+TAMANHO_LOTE = 1000
+
+
+class DadosSinteticos:
+    """Ids gerados e um usuário de exemplo de cada papel (usuarios['aluno'], ...)."""
+
+    def __init__(self):
+        self.turmas = []
+        self.professores = []
+        self.disciplinas = []
+        self.alunos = []
+        self.gestores = []
+        self.notas = 0
+        self.usuarios = {}
+
+
+def _nome(rnd):
+    return f'{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}'
+
+
+def _nome_turma(i, prefixo):
+    # 1º Ano A ... 9º Ano A, 1º Ano B ...; depois de Z: A2, B2 ...
+    letra = chr(65 + i // 9 % 26) + (str(i // 234 + 1) if i >= 234 else '')
+    return f'{1 + i % 9}º Ano {letra}' + (f' ({prefixo})' if prefixo else '')
+
+
+def _usuarios(quantidade, papel, prefixo, hash_senha, rnd):
+    nomes = [_nome(rnd) for _ in range(quantidade)]
+    usuarios = []
+    for i, nome in enumerate(nomes):
+        email = f'{papel}{i + 1}{prefixo}@sige.local'
+        primeiro, resto = nome.split(' ', 1)
+        usuarios.append(User(username=email, email=email, password=hash_senha, first_name=primeiro, last_name=resto))
+    User.objects.bulk_create(usuarios, batch_size=TAMANHO_LOTE)
+    return usuarios, nomes
+
+
+@transaction.atomic
+def gerar_dados(turmas=50, alunos=2000, disciplinas=300, notas=8000, professores=None, gestores=3,
+                semente=42, senha=SENHA_PADRAO, prefixo=''):
+    """
+    Gera uma escola fictícia, sempre igual para a mesma semente: turmas, professores,
+    disciplinas (distribuídas entre as turmas), alunos e notas de alunos nas
+    disciplinas da própria turma. Todos os usuários usam a mesma senha, com um hash
+    provisório calculado uma vez só, e tudo é gravado com bulk_create.
+
+    prefixo: acrescentado a e-mails e nomes de turma, para gerar mais de um conjunto
+    no mesmo banco.
+    """
+    rnd = random.Random(semente)
+    hash_senha = hash_provisorio(senha)
+    sufixo = f'.{prefixo}' if prefixo else ''
+    professores = professores or max(1, disciplinas // 5)
+    dados = DadosSinteticos()
+
+    dados.turmas = Turma.objects.bulk_create([Turma(nome=_nome_turma(i, prefixo)) for i in range(turmas)])
+
+    usuarios, nomes = _usuarios(professores, 'professor', sufixo, hash_senha, rnd)
+    dados.professores = Professor.objects.bulk_create(
+        [Professor(user=u, nome_completo=n) for u, n in zip(usuarios, nomes)], batch_size=TAMANHO_LOTE,
+    )
+
+    # Disciplina j vai para a turma j % turmas: cada turma recebe matérias diferentes
+    lista = []
+    for j in range(disciplinas):
+        rodada = j // turmas
+        nome = MATERIAS[rodada % len(MATERIAS)]
+        if rodada >= len(MATERIAS):
+            nome = f'{nome} {rodada // len(MATERIAS) + 1}'
+        lista.append(Disciplina(nome=nome, turma=dados.turmas[j % turmas], professor=rnd.choice(dados.professores)))
+    dados.disciplinas = Disciplina.objects.bulk_create(lista, batch_size=TAMANHO_LOTE)
+
+    usuarios, nomes = _usuarios(alunos, 'aluno', sufixo, hash_senha, rnd)
+    dados.alunos = Aluno.objects.bulk_create(
+        [Aluno(user=u, nome_completo=n, idade=rnd.randint(10, 18), turma=rnd.choice(dados.turmas))
+         for u, n in zip(usuarios, nomes)],
+        batch_size=TAMANHO_LOTE,
+    )
+
+    usuarios, nomes = _usuarios(gestores, 'gestor', sufixo, hash_senha, rnd)
+    cargos = [c for c, _ in Gestor.CARGO_CHOICES]
+    dados.gestores = Gestor.objects.bulk_create(
+        [Gestor(user=u, nome_completo=n, cargo=cargos[i % len(cargos)]) for i, (u, n) in enumerate(zip(usuarios, nomes))],
+    )
+
+    # Notas: pares (aluno, disciplina da turma do aluno) sorteados sem repetição
+    por_turma = {}
+    for d in dados.disciplinas:
+        por_turma.setdefault(d.turma_id, []).append(d.id)
+    pares = [(a.id, d) for a in dados.alunos for d in por_turma.get(a.turma_id, [])]
+    escolhidos = rnd.sample(pares, min(notas, len(pares)))
+
+    def valor():
+        return None if rnd.random() < 0.1 else round(rnd.uniform(0, 10), 1)
+
+    Nota.objects.bulk_create(
+        [Nota(aluno_id=a, disciplina_id=d, nota1=valor(), nota2=valor(), nota3=valor(), nota4=valor())
+         for a, d in sorted(escolhidos)],
+        batch_size=TAMANHO_LOTE,
+    )
+    dados.notas = len(escolhidos)
+
+    superusuario = User.objects.create(
+        username=f'admin{sufixo}', email=f'admin{sufixo}@sige.local', password=hash_senha,
+        is_superuser=True, is_staff=True, first_name='Administrador',
+    )
+
+    # Usuários de exemplo: o professor e um aluno da primeira disciplina
+    primeira = dados.disciplinas[0]
+    dados.usuarios = {
+        'super': superusuario,
+        'gestor': dados.gestores[0].user if dados.gestores else None,
+        'professor': primeira.professor.user,
+        'aluno': next((a.user for a in dados.alunos if a.turma_id == primeira.turma_id), None),
+    }
+
+    # bulk_create não dispara os sinais: índice de busca, resumos e caches são atualizados aqui
+    search.indexar_em_lote('turma', [(t.pk, t.nome) for t in dados.turmas])
+    search.indexar_em_lote('professor', [(p.pk, p.nome_completo) for p in dados.professores])
+    search.indexar_em_lote('aluno', [(a.pk, a.nome_completo) for a in dados.alunos])
+    atualizar_resumos(notas=Nota.objects.filter(disciplina__in=dados.disciplinas))
+    invalidar_contadores()
+    transaction.on_commit(lambda: invalidar('turmas', 'disciplinas', 'professores', 'alunos', 'notas'))
+    return dados
@@ -0,0 +1,35 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.assets import carregar_variantes
+
+register = template.Library()
+
+TIPOS = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+
+@register.simple_tag
+def imagem_responsiva(caminho, alt='', tamanho='160px'):
+    """
+    <picture> com as variantes AVIF/WebP geradas por otimizar_estaticos e srcset por
+    largura. Sem o manifesto de variantes, cai para um <img> com a imagem original.
+    """
+    entrada = carregar_variantes().get(caminho)
+    if not entrada:
+        return format_html('<img src="{}" alt="{}" decoding="async" />', static(caminho), alt)
+
+    variantes = entrada['variantes']
+    fontes = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}" />',
+        (
+            (TIPOS[formato], ', '.join(f'{static(arquivo)} {largura}w' for largura, arquivo in variantes[formato]), tamanho)
+            for formato in ('avif', 'webp') if variantes.get(formato)
+        ),
+    )
+    largura, arquivo = variantes['png'][0]
+    altura = round(entrada['altura'] * largura / entrada['largura'])
+    return format_html(
+        '<picture>{}<img src="{}" width="{}" height="{}" alt="{}" decoding="async" /></picture>',
+        fontes, static(arquivo), largura, altura, alt,
+    )
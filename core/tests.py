@@ -1,3 +1,1374 @@
-from django.test import TestCase
+import importlib.util
+import io
+import json
+import os
+import re
+import statistics
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from notas.db import banco_pelo_url, postgres_disponivel
+
+from . import search
+from .analytics import analise_notas, calcular_analise
+from .assets import carregar_variantes, gerar_variantes, minificar_css
+from .backends import EmailBackend
+from .benchmark import formatar_relatorio, medir_rotas, rotas
+from .counters import totais_painel
+from .exports import CABECALHO, gerar_boletins, linhas_notas, tabela_pdf
+from .fragments import estatisticas as estatisticas_fragmentos, versoes
+from .importers import ErroImportacao, importar_alunos
+from .mail import enviar_pendentes
+from .pagination import codificar_cursor
+from .middleware import estatisticas
+from .reports import relatorio_turma
+from .search import TABELA_FTS, buscar, fts_disponivel
+from .models import (
+    Aluno, Disciplina, EmailPendente, Gestor, Nota, Professor, TermoBusca, Turma, expressao_media,
+)
+from .services import ResultadoLancamento, carregar_matriz_notas, disciplinas_com_estatisticas, salvar_notas
+from .summary import agendar_atualizacao, conferir_resumos
+from .synthetic import gerar_dados
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Configuração específica do SQLite')
+class ConcorrenciaSQLiteTests(TransactionTestCase):
+    """Vários professores lançando notas ao mesmo tempo (notas/db.py)."""
+
+    PROFESSORES = 8
+    RODADAS = 5
+    ALUNOS = 30
+
+    def setUp(self):
+        turma = Turma.objects.create(nome='1º A')
+        self.alunos = [
+            Aluno.objects.create(
+                user=User.objects.create(username=f'aluno{i}', email=f'aluno{i}@escola.com'),
+                nome_completo=f'Aluno {i}', idade=15, turma=turma,
+            )
+            for i in range(self.ALUNOS)
+        ]
+        self.disciplinas = [
+            Disciplina.objects.create(
+                nome=f'Disciplina {i}', turma=turma,
+                professor=Professor.objects.create(
+                    user=User.objects.create(username=f'prof{i}', email=f'prof{i}@escola.com'),
+                    nome_completo=f'Professor {i}',
+                ),
+            )
+            for i in range(self.PROFESSORES)
+        ]
+
+    def test_pragmas_aplicados(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+    def test_lancamentos_simultaneos_nao_falham(self):
+        erros = []
+        largada = threading.Barrier(self.PROFESSORES)
+
+        def lancar(disciplina):
+            try:
+                largada.wait()
+                for rodada in range(self.RODADAS):
+                    dados = {f'nota1_{a.id}': str((rodada + a.id) % 11) for a in self.alunos}
+                    dados.update({f'nota2_{a.id}': '7' for a in self.alunos})
+                    salvar_notas(disciplina, dados)
+                    # Edição de uma nota só: o post_save atualiza os resumos numa
+                    # transação que lê antes de escrever
+                    nota = Nota.objects.get(disciplina=disciplina, aluno=self.alunos[rodada])
+                    nota.nota3 = 5
+                    nota.save()
+            except Exception as e:  # noqa: BLE001 - qualquer falha de escrita reprova o teste
+                erros.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=lancar, args=(d,)) for d in self.disciplinas]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(erros, [])
+        self.assertEqual(Nota.objects.count(), self.PROFESSORES * self.ALUNOS)
+        ultima = self.RODADAS - 1
+        for nota in Nota.objects.all():
+            self.assertEqual(nota.nota1, (ultima + nota.aluno_id) % 11)
+
+
+class BancoPeloUrlTests(SimpleTestCase):
+    """DATABASE_URL na convenção do dj-database-url."""
+
+    def test_sqlite_relativo_e_absoluto(self):
+        base = Path('/srv/sige')
+        self.assertEqual(banco_pelo_url('sqlite:///db.sqlite3', base=base)['NAME'], base / 'db.sqlite3')
+        self.assertEqual(banco_pelo_url('sqlite:///dados/sige.db', base=base)['NAME'], base / 'dados' / 'sige.db')
+        self.assertEqual(banco_pelo_url('sqlite:////var/lib/sige.db', base=base)['NAME'], '/var/lib/sige.db')
+
+    def test_postgres(self):
+        config = banco_pelo_url('postgres://sige:s%40nha@db:5432/sige?sslmode=require', pool=10)
+        self.assertEqual(
+            (config['NAME'], config['USER'], config['PASSWORD'], config['HOST'], config['PORT']),
+            ('sige', 'sige', 's@nha', 'db', '5432'),
+        )
+        self.assertEqual(config['OPTIONS']['sslmode'], 'require')
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 10)
+
+    def test_postgres_local_para_os_testes(self):
+        url = 'postgres://sige@localhost:5432/sige'
+        with mock.patch.dict('sys.modules', {'psycopg': None}):
+            self.assertFalse(postgres_disponivel(url))
+
+        psycopg = mock.Mock(Error=OSError)
+        with mock.patch.dict('sys.modules', {'psycopg': psycopg}):
+            self.assertTrue(postgres_disponivel(url))
+            psycopg.connect.assert_called_once_with(
+                dbname='postgres', user='sige', password=None, host='localhost', port='5432', connect_timeout=1,
+            )
+            psycopg.connect.side_effect = OSError('conexão recusada')
+            self.assertFalse(postgres_disponivel(url))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN é do SQLite')
+class PlanoConsultasTests(TestCase):
+    """As consultas mais frequentes precisam usar índice, não varrer a tabela."""
+
+    CONSULTAS = {
+        'login (EmailBackend)': lambda: EmailBackend.por_email(EmailBackend()._usuarios(), 'Aluno@Escola.com'),
+        'e-mail já cadastrado': lambda: EmailBackend.por_email(User.objects.all(), 'aluno@escola.com'),
+        'disciplina repetida': lambda: Disciplina.objects.filter(nome='Matemática', professor_id=1, turma_id=1),
+        'turma repetida': lambda: Turma.objects.filter(nome='1º A'),
+        'notas da disciplina': lambda: Nota.objects.filter(disciplina_id=1),
+        'disciplinas do professor': lambda: Disciplina.objects.filter(professor_id=1).select_related('turma'),
+        'disciplinas da turma': lambda: Disciplina.objects.filter(turma_id=1),
+        'matriz de notas': lambda: Nota.objects.filter(aluno_id__in=[1, 2], disciplina_id__in=[1]),
+    }
+
+    # Além de filtrar pelo índice, não podem ordenar numa B-tree temporária
+    CONSULTAS_ORDENADAS = {
+        'alunos da turma (lancar_nota)': lambda: Aluno.objects.filter(turma_id=1).order_by('nome_completo', 'id'),
+    }
+
+    def assertSemVarredura(self, nome, queryset):
+        plano = queryset.explain()
+        self.assertIsNone(re.search(r'\bSCAN\b', plano), f'{nome} varre a tabela:\n{plano}')
+        return plano
+
+    def test_consultas_usam_indice(self):
+        for nome, consulta in self.CONSULTAS.items():
+            with self.subTest(nome):
+                self.assertSemVarredura(nome, consulta())
+
+    def test_consultas_ordenadas_usam_indice(self):
+        for nome, consulta in self.CONSULTAS_ORDENADAS.items():
+            with self.subTest(nome):
+                plano = self.assertSemVarredura(nome, consulta())
+                self.assertNotIn('TEMP B-TREE', plano, f'{nome} ordena fora do índice:\n{plano}')
+
+
+class OrcamentoConsultasTests(TestCase):
+    """
+    Acessa todas as rotas de core/urls.py como cada papel, com uma escola pequena e
+    outra grande, e confere o número de consultas. Para ver o relatório com tempos:
+    RELATORIO_CONSULTAS=1 python manage.py test core.tests.OrcamentoConsultasTests
+    """
+
+    PEQUENA = {'turmas': 5, 'alunos': 100, 'disciplinas': 30, 'notas': 400}
+    GRANDE = {'turmas': 50, 'alunos': 2000, 'disciplinas': 300, 'notas': 8000}
+
+    # Máximo de consultas por rota, no pior papel e com o cache vazio
+    ORCAMENTO = {
+        'login': 5,
+        'logout': 4,
+        'painel_super': 6,
+        'editar_perfil_super': 2,
+        'listar_professores': 3,
+        'cadastrar_professor': 2,
+        'editar_perfil_professor': 2,
+        'editar_professor': 4,
+        'excluir_professor': 21,
+        'painel_professor': 4,
+        'lancar_nota': 5,
+        'salvar_nota': 2,
+        'listar_alunos': 3,
+        'editar_perfil_aluno': 2,
+        'cadastrar_aluno': 3,
+        'importar_alunos': 2,
+        'editar_aluno': 6,
+        'excluir_aluno': 21,
+        'listar_disciplinas': 6,
+        'cadastrar_disciplina': 4,
+        'editar_disciplina': 7,
+        'excluir_disciplina': 9,
+        'listar_turmas': 3,
+        'cadastrar_turma': 2,
+        'editar_turma': 3,
+        'excluir_turma': 19,
+        'painel_gestor': 6,
+        'listar_gestores': 3,
+        'cadastrar_gestor': 2,
+        'excluir_gestor': 12,
+        'editar_gestor': 4,
+        'password_reset': 0,
+        'password_reset_done': 0,
+        'password_reset_confirm': 5,
+        'password_reset_complete': 0,
+        'painel_aluno': 5,
+        'exportar_notas_turma': 4,
+        'exportar_notas_disciplina': 4,
+        'exportar_boletim': 4,
+        'relatorio_turma': 7,
+        'analise_notas': 6,
+        'monitorar_cache': 2,
+        'monitorar_desempenho': 2,
+        'api_turmas': 3,
+        'api_alunos_da_turma': 5,
+        'api_disciplinas': 3,
+        'api_notas_da_disciplina': 4,
+        'api_notas_do_aluno': 4,
+        'turma': 2,
+        'turma_add1': 0,
+        'turma_add2': 0,
+        'disciplina': 0,
+        'disciplina_add1': 0,
+        'disciplina_add2': 0,
+    }
+
+    # O Django exclui em cascata com DELETE ... IN de 100 em 100 linhas
+    CRESCIMENTO_PERMITIDO = {'excluir_turma': 2}
+
+    def medir(self, tamanho):
+        with transaction.atomic():
+            dados = gerar_dados(**tamanho)
+            medicoes = medir_rotas(dados)
+            transaction.set_rollback(True)
+        cache.clear()
+        return {(m.rota, m.papel): m for m in medicoes}
+
+    def test_todas_as_rotas_tem_orcamento(self):
+        self.assertEqual(set(rotas()), set(self.ORCAMENTO))
+
+    def test_consultas_dentro_do_orcamento_e_constantes(self):
+        pequena = self.medir(self.PEQUENA)
+        grande = self.medir(self.GRANDE)
+        if os.environ.get('RELATORIO_CONSULTAS'):
+            print('\n' + formatar_relatorio(grande.values()))
+
+        for (rota, papel), medicao in grande.items():
+            with self.subTest(rota=rota, papel=papel):
+                self.assertLess(medicao.status, 500)
+                self.assertLessEqual(medicao.consultas, self.ORCAMENTO.get(rota, 0), 'acima do orçamento')
+                self.assertLessEqual(
+                    medicao.consultas - pequena[rota, papel].consultas,
+                    self.CRESCIMENTO_PERMITIDO.get(rota, 0),
+                    'o número de consultas cresce com o tamanho da escola',
+                )
+
+
+class ResumosIncrementaisTests(TestCase):
+    """As tabelas de resumo continuam iguais ao recálculo completo depois de cada escrita."""
+
+    def setUp(self):
+        self.dados = gerar_dados(turmas=2, alunos=20, disciplinas=4, notas=40, gestores=0)
+
+    def test_salvar_e_excluir_nota(self):
+        self.assertEqual(conferir_resumos(), [])
+        nota = Nota.objects.first()
+        nota.nota1, nota.nota2 = 3, None
+        nota.save()
+        self.assertEqual(conferir_resumos(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.delete()
+        self.assertEqual(conferir_resumos(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Aluno.objects.filter(nota__isnull=False).first().delete()
+        self.assertEqual(conferir_resumos(), [])
+
+    def test_disciplina_trocada_de_turma(self):
+        disciplina = Disciplina.objects.filter(nota__isnull=False).first()
+        disciplina.turma = Turma.objects.exclude(pk=disciplina.turma_id).first()
+        disciplina.nome += ' (remanejada)'
+        with self.captureOnCommitCallbacks(execute=True):
+            disciplina.save()
+        self.assertEqual(conferir_resumos(), [])
+
+    def test_lote_desfeito_nao_vaza_para_o_proximo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ZeroDivisionError), transaction.atomic():
+                agendar_atualizacao(aluno_ids=[-1])
+                1 / 0
+        with mock.patch('core.summary.atualizar_resumos') as atualizar:
+            with self.captureOnCommitCallbacks(execute=True):
+                agendar_atualizacao(aluno_ids=[1])
+                agendar_atualizacao(turma_ids=[2])
+        atualizar.assert_called_once_with(disciplina_ids=set(), aluno_ids={1}, turma_ids={2})
+
+
+class EscoposFragmentosTests(TestCase):
+    """Cada escrita invalida só os escopos dos objetos que ela muda."""
+
+    def setUp(self):
+        cache.clear()
+        self.dados = gerar_dados(turmas=2, alunos=20, disciplinas=4, notas=40, professores=2, gestores=1)
+        self.turma, self.outra_turma = self.dados.turmas
+
+    def test_aluno_trocado_de_turma_invalida_as_duas(self):
+        escopos = [f'turma:{self.turma.id}', f'turma:{self.outra_turma.id}', 'disciplinas']
+        antes = versoes(*escopos)
+        aluno = Aluno.objects.filter(turma=self.turma).first()
+        aluno.turma = self.outra_turma
+        with self.captureOnCommitCallbacks(execute=True):
+            aluno.save()
+        depois = versoes(*escopos)
+        self.assertNotEqual(antes[0], depois[0])
+        self.assertNotEqual(antes[1], depois[1])
+        self.assertEqual(antes[2], depois[2])
+
+    def test_nota_invalida_so_a_sua_disciplina(self):
+        nota = Nota.objects.first()
+        outra = Disciplina.objects.exclude(pk=nota.disciplina_id).first()
+        escopos = [f'disciplina:{nota.disciplina_id}', f'disciplina:{outra.id}', f'turma:{self.turma.id}']
+        antes = versoes(*escopos)
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.save()
+        depois = versoes(*escopos)
+        self.assertNotEqual(antes[0], depois[0])
+        self.assertEqual(antes[1:], depois[1:])
+
+    def salvar_nota(self, disciplina):
+        nota = Nota.objects.filter(disciplina=disciplina).first()
+        nota.nota1 = 9.5 if nota.nota1 != 9.5 else 8.5
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.save()
+
+    def assertFragmento(self, nome, acertos, falhas):
+        contagem = estatisticas_fragmentos()['fragmentos'][nome]
+        self.assertEqual((contagem['acertos'], contagem['falhas']), (acertos, falhas))
+
+    def test_painel_professor_ignora_notas_de_outros_professores(self):
+        professor = self.dados.disciplinas[0].professor
+        outra = Disciplina.objects.exclude(professor=professor).filter(nota__isnull=False).first()
+        self.client.force_login(professor.user)
+        self.client.get(reverse('painel_professor'))
+        self.salvar_nota(outra)
+        self.client.get(reverse('painel_professor'))
+        self.assertFragmento('disciplinas_professor', 1, 1)
+        self.salvar_nota(self.dados.disciplinas[0])
+        self.client.get(reverse('painel_professor'))
+        self.assertFragmento('disciplinas_professor', 1, 2)
+
+    def test_relatorio_turma_ignora_outras_turmas(self):
+        self.client.force_login(self.dados.usuarios['gestor'])
+        url = reverse('relatorio_turma')
+        self.client.get(url, {'turma': self.turma.id})
+        self.salvar_nota(Disciplina.objects.filter(turma=self.outra_turma, nota__isnull=False).first())
+        with self.captureOnCommitCallbacks(execute=True):
+            Aluno.objects.filter(turma=self.outra_turma).first().save()
+        self.client.get(url, {'turma': self.turma.id})
+        self.assertFragmento('relatorio_turma', 1, 1)
+
+        self.salvar_nota(Disciplina.objects.filter(turma=self.turma, nota__isnull=False).first())
+        self.client.get(url, {'turma': self.turma.id})
+        self.assertFragmento('relatorio_turma', 1, 2)
+
+
+class PaginacaoTests(TestCase):
+    """Paginação por cursor nas listas: ida e volta entre páginas e cursores adulterados."""
+
+    def setUp(self):
+        Turma.objects.bulk_create([Turma(nome=f'Turma {i:02d}') for i in range(7)])
+        self.client.force_login(User.objects.create_superuser('admin@sige.local', 'admin@sige.local', 'x'))
+
+    def pagina(self, **params):
+        resposta = self.client.get(reverse('listar_turmas'), {'por_pagina': 3, **params})
+        self.assertEqual(resposta.status_code, 200)
+        pagina = resposta.context['pagina']
+        return [t.nome for t in pagina], pagina
+
+    def test_percorre_as_paginas_e_volta(self):
+        vistos, pagina = self.pagina()
+        self.assertFalse(pagina.tem_anterior)
+        while pagina.tem_proxima:
+            nomes, pagina = self.pagina(depois=pagina.cursor_proximo)
+            vistos += nomes
+        self.assertEqual(vistos, [f'Turma {i:02d}' for i in range(7)])
+        self.assertEqual(len(pagina), 1)
+
+        nomes, pagina = self.pagina(antes=pagina.cursor_anterior)
+        self.assertEqual(nomes, ['Turma 03', 'Turma 04', 'Turma 05'])
+        self.assertTrue(pagina.tem_anterior)
+
+    def test_cursor_adulterado_volta_para_a_primeira_pagina(self):
+        primeira, _ = self.pagina()
+        adulterados = [
+            'nao-e-base64!', 'ãé', codificar_cursor([]), codificar_cursor({'x': 1}), codificar_cursor('Turma 01'),
+            codificar_cursor(['Turma 01']), codificar_cursor(['Turma 01', 'x']),
+            codificar_cursor([['Turma 01'], 1]), codificar_cursor([None, 1]), codificar_cursor([{'x': 1}, 1]),
+        ]
+        for cursor in adulterados:
+            for parametro in ('depois', 'antes'):
+                with self.subTest(cursor=cursor, parametro=parametro):
+                    self.assertEqual(self.pagina(**{parametro: cursor})[0], primeira)
+
+
+class BuscaTests(TestCase):
+    """Busca por nome no índice (FTS5 ou TermoBusca), sem acentos nem maiúsculas."""
+
+    def setUp(self):
+        turma = Turma.objects.create(nome='1º Ano A')
+        self.joao, self.maria = [
+            Aluno.objects.create(
+                user=User.objects.create(username=email, email=email), nome_completo=nome, idade=12, turma=turma,
+            )
+            for nome, email in (('João da Silva', 'joao@sige.local'), ('MARIA CONCEIÇÃO', 'maria@sige.local'))
+        ]
+
+    def assertEncontra(self, texto, esperados):
+        self.assertEqual(set(buscar(Aluno.objects.all(), 'aluno', texto)), set(esperados))
+
+    def verificar_busca(self):
+        self.assertEncontra('joao', [self.joao])
+        self.assertEncontra('JOÃO sil', [self.joao])
+        self.assertEncontra('conceicao', [self.maria])
+        self.assertEncontra('ma', [self.maria])
+        self.assertEncontra('silva maria', [])
+        self.assertEncontra('  ', [self.joao, self.maria])
+        self.assertFalse(buscar(Turma.objects.all(), 'turma', 'joao').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.joao.user.delete()
+        self.assertEncontra('joao', [])
+
+        # Uma exclusão desfeita não remove a entrada do índice depois
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ZeroDivisionError), transaction.atomic():
+                Aluno.objects.get(pk=self.maria.pk).delete()
+                1 / 0
+        with self.captureOnCommitCallbacks(execute=True):
+            Turma.objects.create(nome='2º Ano A').delete()
+        self.assertEncontra('maria', [self.maria])
+
+    def test_busca_fts(self):
+        if not fts_disponivel():
+            self.skipTest('SQLite sem FTS5')
+        self.verificar_busca()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT objeto_id FROM {TABELA_FTS} WHERE tipo = %s', ['aluno'])
+            self.assertEqual([linha[0] for linha in cursor.fetchall()], [self.maria.id])
+
+    def test_busca_por_prefixo_em_termo_busca(self):
+        with mock.patch('core.search.fts_disponivel', return_value=False):
+            search.reindexar_tudo()
+            self.assertEqual(
+                set(TermoBusca.objects.filter(objeto_id=self.joao.id, tipo='aluno').values_list('termo', flat=True)),
+                {'joao', 'da', 'silva'},
+            )
+            self.verificar_busca()
+            self.assertFalse(TermoBusca.objects.filter(tipo='aluno', objeto_id=self.joao.id).exists())
+
+
+class ContadoresPainelTests(TestCase):
+    """Os contadores em cache acompanham as exclusões feitas pelas views."""
+
+    def setUp(self):
+        cache.clear()
+        self.dados = gerar_dados(turmas=2, alunos=3, disciplinas=2, notas=4, professores=1, gestores=1)
+        self.client.force_login(self.dados.usuarios['super'])
+
+    def assertTotaisConferem(self):
+        totais = totais_painel()
+        self.assertEqual(totais['total_alunos'], Aluno.objects.count())
+        self.assertEqual(totais['total_professores'], Professor.objects.count())
+        self.assertEqual(totais['total_disciplinas'], Disciplina.objects.count())
+        self.assertEqual(totais['total_turmas'], Turma.objects.count())
+
+    def test_exclusoes_pelas_views(self):
+        self.assertTotaisConferem()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('excluir_aluno', args=[self.dados.alunos[0].id]))
+        self.assertEqual(Aluno.objects.count(), 2)
+        self.assertTotaisConferem()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('excluir_professor', args=[self.dados.professores[0].id]))
+        self.assertFalse(Professor.objects.exists())
+        self.assertTotaisConferem()
+
+
+class DesempenhoMiddlewareTests(TestCase):
+    """Server-Timing, percentis por rota e log de consultas lentas."""
+
+    def setUp(self):
+        estatisticas.limpar()
+        self.dados = gerar_dados(turmas=2, alunos=10, disciplinas=4, notas=20, gestores=1)
+
+    def test_cabecalho_e_percentis_por_rota(self):
+        self.client.force_login(self.dados.usuarios['aluno'])
+        for _ in range(3):
+            resposta = self.client.get(reverse('painel_aluno'))
+        self.assertRegex(
+            resposta['Server-Timing'],
+            r'^total;dur=[\d.]+, sql;dur=[\d.]+;desc="\d+ consultas", tpl;dur=[\d.]+$',
+        )
+        linha = next(r for r in estatisticas.resumo() if r['rota'] == 'painel_aluno')
+        self.assertEqual(linha['requisicoes'], 3)
+        self.assertGreater(linha['consultas'], 0)
+        self.assertGreater(linha['templates'], 0)
+        self.assertLessEqual(linha['p50'], linha['p95'])
+        self.assertLessEqual(linha['p95'], linha['p99'])
+
+    @override_settings(DESEMPENHO_SQL_LENTO_MS=0)
+    def test_consulta_lenta_registra_a_rota(self):
+        self.client.force_login(self.dados.usuarios['aluno'])
+        with self.assertLogs('core.desempenho.sql', 'WARNING') as logs:
+            self.client.get(reverse('painel_aluno'))
+        self.assertTrue(any('"rota": "painel_aluno"' in linha for linha in logs.output))
+
+    def test_pagina_so_para_superusuario(self):
+        self.client.force_login(self.dados.usuarios['gestor'])
+        self.assertEqual(self.client.get(reverse('monitorar_desempenho')).status_code, 302)
+        self.client.force_login(self.dados.usuarios['super'])
+        self.client.get(reverse('painel_super'))
+        resposta = self.client.get(reverse('monitorar_desempenho'))
+        self.assertContains(resposta, 'painel_super')
+
+
+TEM_OPENPYXL = importlib.util.find_spec('openpyxl') is not None
+
+
+class ImportacaoAlunosTests(TestCase):
+    """Importação de alunos por CSV/XLSX: linhas válidas, duplicadas e arquivos ilegíveis."""
+
+    CABECALHO = 'nome_completo;idade;email;senha;turma\n'
+
+    def setUp(self):
+        self.turma = Turma.objects.create(nome='1º Ano A')
+        User.objects.create_user('ja@sige.local', 'ja@sige.local', 'segredo123')
+
+    def csv(self, linhas, codificacao='utf-8'):
+        return io.BytesIO((self.CABECALHO + linhas).encode(codificacao))
+
+    def test_csv_valido_e_emails_repetidos(self):
+        arquivo = self.csv(
+            'Ana Lima;12;ana@sige.local;segredo123;1º ano a\n'
+            'Bia Souza;13;JA@sige.local;segredo123;1º Ano A\n'
+            'Ana Repetida;12;ana@sige.local;segredo123;1º Ano A\n'
+            'Caio Dias;x;caio@sige.local;segredo123;1º Ano A\n'
+        )
+        resultado = importar_alunos(arquivo, 'alunos.csv')
+        self.assertEqual((resultado.processadas, resultado.criados), (4, 1))
+        self.assertEqual([n for n, _ in resultado.erros], [3, 4, 5])
+        self.assertIn('e-mail', resultado.erros[0][1])
+        self.assertIn('e-mail', resultado.erros[1][1])
+        aluno = Aluno.objects.get()
+        self.assertEqual(
+            (aluno.nome_completo, aluno.turma_id, aluno.user.email), ('Ana Lima', self.turma.id, 'ana@sige.local'),
+        )
+
+    def test_csv_do_excel_em_cp1252(self):
+        arquivo = self.csv('João Araújo;12;joao@sige.local;segredo123;1º Ano A\n', 'cp1252')
+        resultado = importar_alunos(arquivo, 'alunos.csv')
+        self.assertEqual((resultado.criados, resultado.erros), (1, []))
+        self.assertEqual(Aluno.objects.get().nome_completo, 'João Araújo')
+
+    def test_codificacao_ilegivel(self):
+        arquivo = io.BytesIO(self.CABECALHO.encode() + b'Ana \x81;12;ana@sige.local;segredo123;1\xba Ano A\n')
+        with self.assertRaises(ErroImportacao):
+            importar_alunos(arquivo, 'alunos.csv')
+        self.assertFalse(Aluno.objects.exists())
+
+    @skipUnless(TEM_OPENPYXL, 'openpyxl não instalado')
+    def test_xlsx_valido(self):
+        from openpyxl import Workbook
+
+        planilha = Workbook()
+        planilha.active.append(['Nome_Completo', 'Idade', 'Email', 'Senha', 'Turma'])
+        planilha.active.append(['Ana Lima', 12, 'ana@sige.local', 'segredo123', '1º Ano A'])
+        planilha.active.append([None, None, None, None, None])
+        planilha.active.append(['Bia Souza', 13.0, 'bia@sige.local', 'segredo123', '1º Ano A'])
+        arquivo = io.BytesIO()
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        resultado = importar_alunos(arquivo, 'alunos.XLSX')
+        self.assertEqual((resultado.criados, resultado.erros), (2, []))
+        self.assertEqual(sorted(Aluno.objects.values_list('idade', flat=True)), [12, 13])
+
+    @skipUnless(TEM_OPENPYXL, 'openpyxl não instalado')
+    def test_arquivo_que_nao_e_planilha(self):
+        self.client.force_login(User.objects.create_superuser('admin@sige.local', 'admin@sige.local', 'x'))
+        for conteudo in (self.CABECALHO.encode(), b'PK\x03\x04corrompido'):
+            with self.subTest(conteudo=conteudo[:10]):
+                arquivo = io.BytesIO(conteudo)
+                arquivo.name = 'alunos.xlsx'
+                resposta = self.client.post(reverse('importar_alunos'), {'arquivo': arquivo})
+                self.assertEqual(resposta.status_code, 200)
+                self.assertIn('xlsx', resposta.context['erro'])
+        self.assertFalse(Aluno.objects.exists())
+
+
+TEM_REPORTLAB = importlib.util.find_spec('reportlab') is not None
+
+
+class ExecutorNoMesmoProcesso:
+    """Substitui o pool de processos: os boletins são gerados na transação do teste."""
+
+    def __init__(self, processos=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, funcao, *args):
+        futuro = Future()
+        futuro.set_result(funcao(*args))
+        return futuro
+
+
+class ExportacaoTests(TestCase):
+    """Cabeçalho e número de linhas de cada formato de exportação."""
+
+    def setUp(self):
+        self.dados = gerar_dados(turmas=2, alunos=20, disciplinas=4, notas=40, gestores=1)
+        self.turma = self.dados.turmas[0]
+        self.notas = Nota.objects.filter(disciplina__turma=self.turma)
+        self.client.force_login(self.dados.usuarios['gestor'])
+
+    def baixar(self, formato):
+        resposta = self.client.get(reverse('exportar_notas_turma', args=[self.turma.id, formato]))
+        self.assertEqual(resposta.status_code, 200)
+        return b''.join(resposta.streaming_content)
+
+    def test_csv(self):
+        linhas = self.baixar('csv').decode('utf-8-sig').splitlines()
+        self.assertEqual(linhas[0], ';'.join(CABECALHO))
+        self.assertEqual(len(linhas) - 1, self.notas.count())
+        self.assertTrue(all(linha.split(';')[1] == self.turma.nome for linha in linhas[1:]))
+
+    @skipUnless(TEM_OPENPYXL, 'openpyxl não instalado')
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        linhas = list(load_workbook(io.BytesIO(self.baixar('xlsx'))).active.iter_rows(values_only=True))
+        self.assertEqual(list(linhas[0]), CABECALHO)
+        self.assertEqual(len(linhas) - 1, self.notas.count())
+
+    @skipUnless(TEM_REPORTLAB, 'reportlab não instalado')
+    def test_pdf(self):
+        self.assertTrue(self.baixar('pdf').startswith(b'%PDF'))
+        tabela = list(tabela_pdf(linhas_notas(disciplina__turma=self.turma)))
+        self.assertEqual(tabela[0][:2], ['Aluno', 'Disciplina'])
+        self.assertEqual(len(tabela) - 1, self.notas.count())
+        nomes = set(self.notas.values_list('aluno__nome_completo', flat=True))
+        self.assertEqual({linha[0] for linha in tabela[1:]}, nomes)
+
+        aluno = self.notas.first().aluno
+        boletim = list(tabela_pdf(linhas_notas(aluno=aluno), com_aluno=False))
+        self.assertEqual(boletim[0][0], 'Disciplina')
+        self.assertEqual(len(boletim) - 1, Nota.objects.filter(aluno=aluno).count())
+
+    @skipUnless(TEM_REPORTLAB, 'reportlab não instalado')
+    def test_pdf_com_marcacao_no_nome(self):
+        # O título vai para um Paragraph do reportlab, que interpreta < e & como marcação
+        Turma.objects.filter(pk=self.turma.pk).update(nome='6º Ano <A> & B')
+        self.assertTrue(self.baixar('pdf').startswith(b'%PDF'))
+
+    def test_gerar_boletins(self):
+        alunos = list(Aluno.objects.filter(turma=self.turma).values_list('id', 'nome_completo'))
+        with tempfile.TemporaryDirectory() as pasta, \
+                mock.patch('core.exports.pool_de_processos', ExecutorNoMesmoProcesso):
+            self.assertEqual(gerar_boletins(alunos, pasta, tamanho_lote=3), len(alunos))
+            self.assertEqual(len(os.listdir(pasta)), len(alunos))
+            aluno_id, _ = alunos[0]
+            with open(os.path.join(pasta, f'boletim_{aluno_id}.csv'), encoding='utf-8-sig') as arquivo:
+                linhas = arquivo.read().splitlines()
+        self.assertEqual(linhas[0], ';'.join(CABECALHO))
+        self.assertEqual(len(linhas) - 1, Nota.objects.filter(aluno_id=aluno_id).count())
+
+
+class LoginTests(TestCase):
+    """Login por e-mail (EmailBackend) e papel guardado na sessão."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('Ana.Lima@Sige.local', 'Ana.Lima@Sige.local', 'segredo123')
+        self.professor = Professor.objects.create(user=self.user, nome_completo='Ana Lima')
+
+    def entrar(self, email, senha='segredo123'):
+        return self.client.post(reverse('login'), {'email': email, 'password': senha})
+
+    def test_email_sem_diferenciar_maiusculas(self):
+        with self.assertNumQueries(1):
+            user = EmailBackend().authenticate(None, email='ana.lima@sige.LOCAL', password='segredo123')
+        self.assertEqual(user, self.user)
+        with self.assertNumQueries(0):
+            self.assertTrue(hasattr(user, 'professor'))
+        resposta = self.entrar('ANA.LIMA@SIGE.LOCAL')
+        self.assertRedirects(resposta, reverse('painel_professor'), fetch_redirect_response=False)
+
+    def erros(self, resposta):
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.context['form'].non_field_errors()
+
+    def test_mensagens_de_erro(self):
+        self.assertEqual(self.erros(self.entrar('ANA.lima@sige.local', 'errada')), ['Senha incorreta.'])
+        self.assertEqual(self.erros(self.entrar('outra@sige.local')), ['E-mail não encontrado.'])
+
+    def test_email_unico_sem_diferenciar_maiusculas(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(username='outra', email='ANA.LIMA@sige.local')
+
+        admin = User.objects.create_superuser('admin@sige.local', 'admin@sige.local', 'x')
+        self.client.force_login(admin)
+        resposta = self.client.post(reverse('cadastrar_professor'), {
+            'nome_completo': 'Outra Ana', 'email': 'ana.lima@SIGE.local', 'senha': 'segredo123',
+        })
+        self.assertEqual(resposta.context['erro'], 'Já existe um usuário com este e-mail.')
+
+    def test_email_invalido_ou_vazio(self):
+        for email in ('nao-e-email', ''):
+            with self.subTest(email=email):
+                resposta = self.entrar(email)
+                self.assertEqual(resposta.status_code, 200)
+                self.assertIn('email', resposta.context['form'].errors)
+                self.assertEqual(resposta.context['form'].non_field_errors(), [])
+        self.assertFalse(EmailBackend.por_email(User.objects.all(), None).exists())
+
+    def test_usuario_inativo_nao_entra(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(EmailBackend().authenticate(None, email='ana.lima@sige.local', password='segredo123'))
+        self.assertEqual(self.erros(self.entrar('ana.lima@sige.local')), ['Senha incorreta.'])
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_papel_da_sessao_acompanha_o_perfil(self):
+        self.entrar('ana.lima@sige.local')
+        self.assertEqual(self.client.session['papel'], 'professor')
+
+        # Deixa de ser professora e passa a ser gestora depois do login
+        self.professor.delete()
+        Gestor.objects.create(user=self.user, nome_completo='Ana Lima', cargo='diretor')
+        resposta = self.client.get(reverse('login'))
+        self.assertRedirects(resposta, reverse('painel_gestor'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['papel'], 'gestor')
+
+
+class HashProvisorioTests(TestCase):
+    """Senhas definidas por outra pessoa recebem hash barato, refeito no primeiro login."""
+
+    def test_importacao_e_login_trocam_o_hash(self):
+        turma = Turma.objects.create(nome='1º Ano A')
+        arquivo = io.BytesIO(
+            f'nome_completo,idade,email,senha,turma\nAna Lima,12,ana@sige.local,segredo123,{turma.nome}\n'.encode()
+        )
+        importar_alunos(arquivo, 'alunos.csv')
+        user = User.objects.get(email='ana@sige.local')
+        self.assertTrue(user.password.startswith('pbkdf2_provisorio$'))
+
+        resposta = self.client.post(reverse('login'), {'email': 'ana@sige.local', 'password': 'segredo123'})
+        self.assertRedirects(resposta, reverse('painel_aluno'), fetch_redirect_response=False)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password('segredo123'))
+
+    @override_settings(SENHA_ITERACOES=1000)
+    def test_iteracoes_configuraveis_refeitas_no_login(self):
+        user = User.objects.create_user('prof@sige.local', 'prof@sige.local', 'segredo123')
+        self.assertIn('$1000$', user.password)
+        with self.settings(SENHA_ITERACOES=2000):
+            self.assertTrue(user.check_password('segredo123'))
+            self.assertIn('$2000$', user.password)
+
+
+class BackendQueFalha(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('servidor SMTP fora do ar')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.FilaEmailBackend',
+    EMAIL_BACKEND_ENVIO='django.core.mail.backends.locmem.EmailBackend',
+)
+class FilaEmailsTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('ana@sige.local', 'ana@sige.local', 'segredo123')
+
+    def test_recuperacao_de_senha_so_grava_na_fila(self):
+        resposta = self.client.post(reverse('password_reset'), {'email': 'ana@sige.local'})
+        self.assertRedirects(resposta, reverse('password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        pendente = EmailPendente.objects.get()
+        self.assertEqual(pendente.destinatarios['to'], ['ana@sige.local'])
+
+        self.assertEqual(enviar_pendentes(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ana@sige.local'])
+        self.assertIn('/senha/resetar/', mail.outbox[0].body)
+        pendente.refresh_from_db()
+        self.assertEqual(pendente.status, 'enviado')
+        self.assertEqual(enviar_pendentes(), (0, 0))
+
+    def test_falha_espera_e_desiste(self):
+        self.client.post(reverse('password_reset'), {'email': 'ana@sige.local'})
+        with self.settings(EMAIL_BACKEND_ENVIO='core.tests.BackendQueFalha'), self.assertLogs('core.mail', 'WARNING'):
+            self.assertEqual(enviar_pendentes(max_tentativas=2), (0, 1))
+            pendente = EmailPendente.objects.get()
+            self.assertEqual((pendente.status, pendente.tentativas), ('pendente', 1))
+            self.assertIn('fora do ar', pendente.erro)
+            # Ainda não venceu a espera
+            self.assertEqual(enviar_pendentes(max_tentativas=2), (0, 0))
+
+            EmailPendente.objects.update(proxima_tentativa=timezone.now())
+            self.assertEqual(enviar_pendentes(max_tentativas=2), (0, 1))
+            pendente.refresh_from_db()
+            self.assertEqual((pendente.status, pendente.tentativas), ('falhou', 2))
+        self.assertEqual(enviar_pendentes(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+
+class ApiTests(TestCase):
+    """API JSON: permissões, ?campos e GET condicional pela ETag."""
+
+    def setUp(self):
+        cache.clear()
+        self.dados = gerar_dados(turmas=2, alunos=10, disciplinas=4, notas=20, gestores=1)
+        self.disciplina = self.dados.disciplinas[0]
+        self.url = reverse('api_notas_da_disciplina', args=[self.disciplina.id])
+
+    def test_etag_devolve_304_ate_a_nota_mudar(self):
+        self.client.force_login(self.dados.usuarios['professor'])
+        resposta = self.client.get(self.url, {'campos': 'aluno_id,nota1,media'})
+        self.assertEqual(resposta.status_code, 200)
+        linhas = resposta.json()
+        self.assertTrue(linhas)
+        self.assertEqual(set(linhas[0]), {'aluno_id', 'nota1', 'media'})
+        etag = resposta['ETag']
+
+        with self.assertNumQueries(4):  # sessão, usuário, a disciplina (permissão) e as notas, sem montar JSON
+            resposta = self.client.get(self.url, {'campos': 'aluno_id,nota1,media'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nota = Nota.objects.filter(disciplina=self.disciplina).first()
+            nota.nota1 = 9.5 if nota.nota1 != 9.5 else 8.5
+            nota.save()
+        resposta = self.client.get(self.url, {'campos': 'aluno_id,nota1,media'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+        self.assertIn(nota.nota1, [linha['nota1'] for linha in resposta.json()])
+
+    def test_etag_muda_com_alteracao_fora_dos_sinais(self):
+        # QuerySet.update() não dispara sinais nem invalida o cache; a ETag vem do banco
+        self.client.force_login(self.dados.usuarios['professor'])
+        etag = self.client.get(self.url)['ETag']
+        Nota.objects.filter(disciplina=self.disciplina).update(nota2=F('nota2') + 1, nota3=None)
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+        self.assertTrue(all(linha['nota3'] is None for linha in resposta.json()))
+
+        # Renomear o aluno também aparece na resposta das notas
+        etag = resposta['ETag']
+        Aluno.objects.filter(turma_id=self.disciplina.turma_id).update(nome_completo='Outro Nome')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_permissoes_e_campos_invalidos(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.client.force_login(self.dados.usuarios['aluno'])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        aluno = self.dados.usuarios['aluno'].aluno
+        self.assertEqual(self.client.get(reverse('api_notas_do_aluno', args=[aluno.id])).status_code, 200)
+        turmas = self.client.get(reverse('api_turmas')).json()
+        self.assertEqual([t['id'] for t in turmas], [aluno.turma_id])
+
+        self.client.force_login(self.dados.usuarios['gestor'])
+        resposta = self.client.get(reverse('api_turmas'), {'campos': 'nome,senha'})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('senha', resposta.json()['erro'])
+        self.assertEqual(self.client.get(reverse('api_alunos_da_turma', args=[0])).status_code, 404)
+
+
+class SalvarNotasTests(TestCase):
+    """Lançamento da grade inteira: só as linhas que mudaram são gravadas, numa transação."""
+
+    def setUp(self):
+        turma = Turma.objects.create(nome='1º Ano A')
+        outra = Turma.objects.create(nome='1º Ano B')
+        professor = Professor.objects.create(
+            user=User.objects.create(username='prof@sige.local', email='prof@sige.local'), nome_completo='Prof',
+        )
+        self.disciplina = Disciplina.objects.create(nome='Matemática', turma=turma, professor=professor)
+
+        def aluno(nome, turma=turma):
+            email = f'{nome.lower()}@sige.local'
+            return Aluno.objects.create(
+                user=User.objects.create(username=email, email=email), nome_completo=nome, idade=12, turma=turma,
+            )
+
+        self.nova, self.alterada, self.igual, self.limpa, self.vazia = [
+            aluno(n) for n in ('Ana', 'Bia', 'Caio', 'Davi', 'Eva')
+        ]
+        self.de_outra_turma = aluno('Fabio', outra)
+        Nota.objects.create(aluno=self.alterada, disciplina=self.disciplina, nota1=7, nota2=5)
+        Nota.objects.create(aluno=self.igual, disciplina=self.disciplina, nota1=5, nota2=6)
+        Nota.objects.create(aluno=self.limpa, disciplina=self.disciplina, nota1=9)
+
+    def test_grade_mista(self):
+        dados = {
+            f'nota1_{self.nova.id}': '8', f'nota2_{self.nova.id}': '6,5', f'nota3_{self.nova.id}': '7.5',
+            f'nota1_{self.alterada.id}': '8', f'nota2_{self.alterada.id}': '11',
+            f'nota1_{self.igual.id}': '5.0', f'nota2_{self.igual.id}': '6',
+            f'nota1_{self.limpa.id}': '', f'nota2_{self.limpa.id}': ' ',
+            f'nota1_{self.vazia.id}': '',
+            f'nota1_{self.de_outra_turma.id}': '10',
+        }
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as consultas:
+            resultado = salvar_notas(self.disciplina, dados)
+        self.assertEqual(resultado, ResultadoLancamento(criadas=1, atualizadas=1, inalteradas=2))
+        # Um INSERT em lote e um UPDATE por linha alterada
+        gravacoes = [c['sql'].split()[0] for c in consultas if re.match(r'(INSERT INTO|UPDATE) "core_nota"', c['sql'])]
+        self.assertEqual(gravacoes, ['INSERT', 'UPDATE'])
+
+        notas = {n.aluno_id: n for n in Nota.objects.filter(disciplina=self.disciplina)}
+        self.assertEqual(set(notas), {self.nova.id, self.alterada.id, self.igual.id, self.limpa.id})
+        valores = {aluno_id: (n.nota1, n.nota2, n.nota3, n.nota4, n.versao) for aluno_id, n in notas.items()}
+        # '6,5' não é número válido e célula vazia ou fora de 0 a 10 mantém a nota anterior
+        self.assertEqual(valores[self.nova.id], (8, None, 7.5, None, 1))
+        self.assertEqual(valores[self.alterada.id], (8, 5, None, None, 2))
+        self.assertEqual(valores[self.igual.id], (5, 6, None, None, 1))
+        self.assertEqual(valores[self.limpa.id], (9, None, None, None, 1))
+        self.assertEqual(conferir_resumos(), [])
+
+        # Reenviar a mesma grade não grava nada
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = salvar_notas(self.disciplina, dados)
+        self.assertEqual(resultado, ResultadoLancamento(criadas=0, atualizadas=0, inalteradas=4))
+        self.assertEqual([c['sql'] for c in consultas if c['sql'].startswith(('INSERT', 'UPDATE'))], [])
+
+    def test_erro_desfaz_o_lancamento_inteiro(self):
+        dados = {f'nota1_{self.nova.id}': '8', f'nota1_{self.alterada.id}': '3'}
+        with mock.patch('core.services.notas_salvas.send', side_effect=RuntimeError('falha')):
+            with self.assertRaises(RuntimeError):
+                salvar_notas(self.disciplina, dados)
+        self.assertFalse(Nota.objects.filter(aluno=self.nova).exists())
+        self.assertEqual(Nota.objects.get(aluno=self.alterada).nota1, 7)
+
+    def test_versao_desatualizada_nao_sobrescreve(self):
+        # A tela foi aberta com a versão 1; enquanto isso outra pessoa gravou a linha
+        Nota.objects.filter(aluno=self.alterada).update(nota1=9, versao=F('versao') + 1)
+        Nota.objects.create(aluno=self.nova, disciplina=self.disciplina, nota1=4)
+        dados = {
+            f'nota1_{self.alterada.id}': '3', f'versao_{self.alterada.id}': '1',
+            f'nota1_{self.igual.id}': '8', f'versao_{self.igual.id}': '1',
+            f'nota1_{self.nova.id}': '10', f'versao_{self.nova.id}': '0',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = salvar_notas(self.disciplina, dados)
+        self.assertEqual(resultado, ResultadoLancamento(0, 1, 1, (self.nova.id, self.alterada.id)))
+        self.assertEqual(Nota.objects.get(aluno=self.alterada).nota1, 9)
+        self.assertEqual(Nota.objects.get(aluno=self.nova).nota1, 4)
+        self.assertEqual(Nota.objects.get(aluno=self.igual).nota1, 8)
+
+    def test_nota_criada_por_outra_pessoa_durante_o_insert(self):
+        # O INSERT em lote esbarra na restrição única (aluno, disciplina): as linhas são
+        # gravadas uma a uma e a que já existia volta como conflito
+        bulk_create = Nota.objects.bulk_create
+
+        def concorrente(notas, *args, **kwargs):
+            if any(n.aluno_id == self.nova.id for n in notas):
+                raise IntegrityError('UNIQUE constraint failed: core_nota.aluno_id, core_nota.disciplina_id')
+            return bulk_create(notas, *args, **kwargs)
+
+        dados = {f'nota1_{self.nova.id}': '8', f'nota1_{self.vazia.id}': '6'}
+        with mock.patch.object(Nota.objects, 'bulk_create', side_effect=concorrente), \
+                mock.patch('core.services.notas_salvas.send') as enviado:
+            resultado = salvar_notas(self.disciplina, dados)
+        self.assertEqual(resultado, ResultadoLancamento(1, 0, 3, (self.nova.id,)))
+        self.assertEqual(Nota.objects.get(aluno=self.vazia).nota1, 6)
+        self.assertEqual(enviado.call_args.kwargs['aluno_ids'], [self.vazia.id])
+
+    def test_formulario_avisa_os_conflitos(self):
+        self.client.force_login(self.disciplina.professor.user)
+        Nota.objects.filter(aluno=self.alterada).update(nota1=9, versao=F('versao') + 1)
+        url = reverse('lancar_nota', args=[self.disciplina.id])
+        resposta = self.client.post(url, {f'nota1_{self.alterada.id}': '3', f'versao_{self.alterada.id}': '1'}, follow=True)
+        self.assertContains(resposta, 'alteradas por outra pessoa')
+        self.assertContains(resposta, 'Bia')
+        self.assertContains(resposta, f'name="versao_{self.alterada.id}" value="2"')
+
+
+class MatrizNotasTests(TestCase):
+    """Alunos x disciplinas carregados em consultas fixas, com buracos na matriz."""
+
+    def test_matriz_com_aluno_sem_nota_e_disciplina_de_outra_turma(self):
+        dados = gerar_dados(turmas=2, alunos=10, disciplinas=4, notas=0, gestores=0)
+        turma, outra_turma = dados.turmas
+        alunos = Aluno.objects.filter(turma=turma).order_by('id')
+        com_nota, sem_nota = alunos[0], alunos[1]
+        da_turma = Disciplina.objects.filter(turma=turma).order_by('id').first()
+        de_outra = Disciplina.objects.filter(turma=outra_turma).order_by('id').first()
+        nota = Nota.objects.create(aluno=com_nota, disciplina=da_turma, nota1=7)
+        estranha = Nota.objects.create(aluno=com_nota, disciplina=de_outra, nota2=4)
+        # Nota de aluno de fora da lista não entra na matriz
+        Nota.objects.create(aluno=Aluno.objects.filter(turma=outra_turma).first(), disciplina=de_outra, nota1=1)
+
+        with self.assertNumQueries(3):
+            matriz = carregar_matriz_notas(alunos, Disciplina.objects.filter(id__in=[da_turma.id, de_outra.id]))
+            [a.user.email for a in matriz.alunos]
+            [d.turma.nome for d in matriz.disciplinas]
+
+        self.assertEqual(len(matriz.notas), 2)
+        self.assertEqual(matriz.get(com_nota.id, da_turma.id), nota)
+        self.assertEqual(matriz.get(com_nota.id, de_outra.id), estranha)
+        self.assertIsNone(matriz.get(sem_nota.id, da_turma.id))
+        self.assertEqual(matriz.notas_do_aluno(com_nota.id), {da_turma.id: nota, de_outra.id: estranha})
+        self.assertEqual(matriz.notas_do_aluno(sem_nota.id), {da_turma.id: None, de_outra.id: None})
+        por_aluno = matriz.notas_da_disciplina(da_turma.id)
+        self.assertEqual(list(por_aluno), [a.id for a in alunos])
+        self.assertEqual(por_aluno[com_nota.id], nota)
+        self.assertIsNone(por_aluno[sem_nota.id])
+
+        with self.assertNumQueries(0):
+            vazia = carregar_matriz_notas([], [da_turma])
+        self.assertEqual((vazia.notas, vazia.notas_da_disciplina(da_turma.id)), ({}, {}))
+
+
+class MediaNoBancoTests(TestCase):
+    """expressao_media() tem que bater com Nota.media() para qualquer combinação de notas nulas."""
+
+    def test_confere_com_nota_media(self):
+        dados = gerar_dados(turmas=1, alunos=16, disciplinas=1, notas=0, gestores=0)
+        disciplina = dados.disciplinas[0]
+        # Os 16 padrões de bimestres preenchidos/nulos, um por aluno
+        for padrao, aluno in enumerate(dados.alunos):
+            valores = {f'nota{i}': (i * 2.5 - 0.5 if padrao & (1 << (i - 1)) else None) for i in range(1, 5)}
+            Nota.objects.create(aluno=aluno, disciplina=disciplina, **valores)
+
+        notas = list(Nota.objects.with_media())
+        self.assertEqual(len(notas), 16)
+        for nota in notas:
+            with self.subTest(notas=(nota.nota1, nota.nota2, nota.nota3, nota.nota4)):
+                if nota.media() is None:
+                    self.assertIsNone(nota.valor_media)
+                else:
+                    self.assertAlmostEqual(nota.valor_media, nota.media())
+
+        self.assertEqual(Nota.objects.with_media().filter(valor_media__isnull=True).count(), 1)
+        aprovadas = sum(1 for n in notas if n.media() is not None and n.media() >= 6)
+        self.assertEqual(Nota.objects.with_media().filter(valor_media__gte=6).count(), aprovadas)
+
+        # Partindo de outro model, pelo prefixo
+        por_aluno = dict(Aluno.objects.annotate(m=expressao_media('nota__')).values_list('id', 'm'))
+        for nota in notas:
+            media = nota.media()
+            if media is None:
+                self.assertIsNone(por_aluno[nota.aluno_id])
+            else:
+                self.assertAlmostEqual(por_aluno[nota.aluno_id], media)
+
+
+class SalvarNotaCelulaTests(TestCase):
+    """PATCH de uma célula de lancar_nota com concorrência otimista."""
+
+    def setUp(self):
+        self.dados = gerar_dados(turmas=2, alunos=10, disciplinas=4, notas=0, gestores=1)
+        self.disciplina = self.dados.disciplinas[0]
+        self.aluno = Aluno.objects.filter(turma_id=self.disciplina.turma_id).first()
+        self.url = reverse('salvar_nota', args=[self.disciplina.id, self.aluno.id])
+        self.client.force_login(self.disciplina.professor.user)
+
+    def patch(self, **dados):
+        return self.client.patch(self.url, json.dumps(dados), content_type='application/json')
+
+    def test_cria_atualiza_e_detecta_conflito(self):
+        resposta = self.patch(bimestre=1, valor='8', versao=0)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()['nota'], {
+            'nota1': 8.0, 'nota2': None, 'nota3': None, 'nota4': None, 'media': 8.0, 'versao': 1,
+        })
+
+        resposta = self.patch(bimestre=2, valor='6', versao=1)
+        self.assertEqual(resposta.json()['nota']['media'], 7.0)
+        self.assertEqual(resposta.json()['nota']['versao'], 2)
+
+        # Outro professor ainda com a versão 1 aberta na tela
+        resposta = self.patch(bimestre=1, valor='2', versao=1)
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.json()['nota']['nota1'], 8.0)
+        self.assertEqual(Nota.objects.get(aluno=self.aluno).nota1, 8.0)
+
+        # Criar de novo quem já existe também é conflito
+        self.assertEqual(self.patch(bimestre=3, valor='5', versao=0).status_code, 409)
+
+        # O formulário completo também incrementa a versão
+        salvar_notas(self.disciplina, {f'nota4_{self.aluno.id}': '10'})
+        self.assertEqual(Nota.objects.get(aluno=self.aluno).versao, 3)
+        self.assertEqual(self.patch(bimestre=1, valor='', versao=2).status_code, 409)
+        resposta = self.patch(bimestre=1, valor='', versao=3)
+        self.assertEqual(resposta.json()['nota']['nota1'], None)
+
+    def test_validacao_e_permissao(self):
+        self.assertEqual(self.patch(bimestre=1, valor='11', versao=0).status_code, 400)
+        self.assertEqual(self.patch(bimestre=5, valor='5', versao=0).status_code, 400)
+        self.assertEqual(self.patch(bimestre=1, valor='abc', versao=0).status_code, 400)
+        self.assertFalse(Nota.objects.exists())
+
+        outro = Aluno.objects.exclude(turma_id=self.disciplina.turma_id).first()
+        url = reverse('salvar_nota', args=[self.disciplina.id, outro.id])
+        resposta = self.client.patch(url, json.dumps({'bimestre': 1, 'valor': '5'}), content_type='application/json')
+        self.assertEqual(resposta.status_code, 404)
+
+        self.client.force_login(self.dados.usuarios['aluno'])
+        self.assertEqual(self.patch(bimestre=1, valor='10', versao=0).status_code, 403)
+
+
+class PainelProfessorTests(TestCase):
+    """Estatísticas por disciplina numa consulta agrupada só."""
+
+    def test_estatisticas_conferem_com_as_notas(self):
+        dados = gerar_dados(turmas=3, alunos=60, disciplinas=12, notas=400, professores=2, gestores=1)
+        professor = dados.disciplinas[0].professor
+        with self.assertNumQueries(1):
+            disciplinas = list(disciplinas_com_estatisticas(Disciplina.objects.filter(professor=professor)))
+        self.assertTrue(disciplinas)
+        for d in disciplinas:
+            medias = [n.media() for n in Nota.objects.filter(disciplina=d, aluno__turma=d.turma_id)]
+            medias = [m for m in medias if m is not None]
+            self.assertEqual(d.alunos, Aluno.objects.filter(turma=d.turma_id).count())
+            self.assertEqual(d.preenchidas2, Nota.objects.filter(disciplina=d, nota2__isnull=False).count())
+            self.assertAlmostEqual(d.media, sum(medias) / len(medias))
+            self.assertEqual(d.abaixo_da_media, sum(1 for m in medias if m < 6))
+
+        self.client.force_login(professor.user)
+        self.assertContains(self.client.get(reverse('painel_professor')), 'Abaixo de 6')
+
+
+class RelatorioTurmaTests(TestCase):
+    """Classificação, aprovação e distribuição calculadas no banco, em consultas fixas."""
+
+    def test_relatorio_confere_com_as_notas(self):
+        dados = gerar_dados(turmas=2, alunos=40, disciplinas=6, notas=200, gestores=1)
+        turma = dados.turmas[0]
+        with self.assertNumQueries(3):
+            relatorio = relatorio_turma(turma.id, media=6)
+
+        medias = {}
+        for nota in Nota.objects.filter(disciplina__turma=turma, aluno__turma=turma):
+            if nota.media() is not None:
+                medias.setdefault(nota.aluno_id, []).append(nota.media())
+        gerais = {a: sum(m) / len(m) for a, m in medias.items()}
+        for linha in relatorio['ranking']:
+            if linha['id'] not in gerais:
+                self.assertIsNone(linha['media'])
+                continue
+            self.assertAlmostEqual(linha['media'], gerais[linha['id']])
+            self.assertEqual(linha['posicao'], 1 + sum(1 for m in gerais.values() if m > linha['media']))
+
+        for d in relatorio['disciplinas']:
+            notas = Nota.objects.filter(disciplina_id=d['id'], aluno__turma=turma)
+            self.assertEqual(d['aprovados3'], notas.filter(nota3__gte=6).count())
+            self.assertEqual(d['aprovados'], sum(1 for n in notas if n.media() is not None and n.media() >= 6))
+
+        todas = [m for lista in medias.values() for m in lista]
+        self.assertEqual(sum(n for _, n, _ in relatorio['distribuicao']), len(todas))
+        self.assertEqual(relatorio['distribuicao'][9][1], sum(1 for m in todas if m >= 9))
+
+    def test_consultas_nao_crescem_com_a_turma(self):
+        for alunos in (10, 200):
+            with self.subTest(alunos=alunos), transaction.atomic():
+                dados = gerar_dados(turmas=1, alunos=alunos, disciplinas=5, notas=alunos * 5, gestores=0)
+                with self.assertNumQueries(3):
+                    relatorio_turma(dados.turmas[0].id)
+                transaction.set_rollback(True)
+
+    def test_pagina_para_gestores(self):
+        dados = gerar_dados(turmas=2, alunos=20, disciplinas=4, notas=40, gestores=1)
+        self.client.force_login(dados.usuarios['professor'])
+        self.assertEqual(self.client.get(reverse('relatorio_turma')).status_code, 302)
+        self.client.force_login(dados.usuarios['gestor'])
+        resposta = self.client.get(reverse('relatorio_turma'), {'turma': dados.turmas[1].id})
+        self.assertContains(resposta, 'CLASSIFICAÇÃO')
+        self.assertEqual(resposta.context['turma'][0], dados.turmas[1].id)
+
+
+TEM_NUMPY = importlib.util.find_spec('numpy') is not None
+
+
+class AnaliseNotasTests(TestCase):
+    """Estatísticas da escola com NumPy sobre as colunas de notas, guardadas no cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.dados = gerar_dados(turmas=3, alunos=60, disciplinas=9, notas=300, gestores=1)
+
+    @skipUnless(TEM_NUMPY, 'numpy não instalado')
+    def test_estatisticas_conferem_com_as_notas(self):
+        with self.assertNumQueries(4):
+            analise = calcular_analise(media=6)
+
+        notas = list(Nota.objects.filter(aluno__turma_id=F('disciplina__turma_id')))
+        segundo = [n.nota2 for n in notas if n.nota2 is not None]
+        _, resumo = analise['bimestres'][1]
+        self.assertEqual(resumo['quantidade'], len(segundo))
+        self.assertAlmostEqual(resumo['media'], statistics.mean(segundo))
+        self.assertAlmostEqual(resumo['desvio'], statistics.stdev(segundo))
+        self.assertAlmostEqual(resumo['mediana'], statistics.median(segundo))
+        self.assertAlmostEqual(resumo['aprovados'], 100 * sum(1 for v in segundo if v >= 6) / len(segundo))
+
+        pares = [(n.nota1, n.nota3) for n in notas if n.nota1 is not None and n.nota3 is not None]
+        _, linha = analise['correlacoes'][0]
+        self.assertAlmostEqual(linha[2], statistics.correlation(*zip(*pares)))
+
+        medias = [n.media() for n in notas if n.media() is not None]
+        self.assertAlmostEqual(analise['geral']['media'], statistics.mean(medias))
+        self.assertEqual(sum(n for _, n, _ in analise['distribuicao']), len(medias))
+        self.assertEqual(sum(t['quantidade'] for t in analise['turmas']), len(medias))
+        for a in analise['atipicos']:
+            self.assertGreaterEqual(abs(a['z']), analise['limite_z'])
+
+    @skipUnless(TEM_NUMPY, 'numpy não instalado')
+    def test_cache_ate_mudar_uma_nota(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            primeira = analise_notas()
+        with self.assertNumQueries(0):
+            self.assertEqual(analise_notas(), primeira)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Nota.objects.filter(nota1__isnull=False).first().save()
+        with self.assertNumQueries(4):
+            analise_notas()
+
+    def test_pagina_para_gestores(self):
+        self.client.force_login(self.dados.usuarios['aluno'])
+        self.assertEqual(self.client.get(reverse('analise_notas')).status_code, 302)
+        self.client.force_login(self.dados.usuarios['gestor'])
+        resposta = self.client.get(reverse('analise_notas'))
+        if TEM_NUMPY:
+            self.assertContains(resposta, 'CORRELAÇÃO ENTRE BIMESTRES')
+        else:
+            self.assertContains(resposta, 'instale o pacote numpy')
+
+
+TEM_PILLOW = importlib.util.find_spec('PIL') is not None
+
+
+class EstaticosTests(SimpleTestCase):
+    """Minificação do CSS, collectstatic com hash no nome e <picture> com as variantes."""
+
+    def test_minificar_css(self):
+        css = """
+            /* cabeçalho */
+            a::after { content: "x ,  y /* não é comentário */ {" ; }
+            .logo {
+                background: url( "img/logo branca.png" ) no-repeat ,  url(img/a.png) ;
+                font: 12px/1 'Fonte  Larga';
+                width: calc(100% - 2px);
+            }
+            ul > li a :hover { color: red; }
+        """
+        self.assertEqual(
+            minificar_css(css),
+            'a::after{content:"x ,  y /* não é comentário */ {"}'
+            '.logo{background:url( "img/logo branca.png" ) no-repeat,url(img/a.png);'
+            "font:12px/1 'Fonte  Larga';width:calc(100% - 2px)}"
+            'ul>li a :hover{color:red}',
+        )
+
+    def test_collectstatic_minifica_e_versiona(self):
+        with tempfile.TemporaryDirectory() as origem, tempfile.TemporaryDirectory() as destino:
+            os.makedirs(os.path.join(origem, 'css'))
+            with open(os.path.join(origem, 'css', 'a.css'), 'w', encoding='utf-8') as arquivo:
+                arquivo.write('/* topo */\n.a {\n  background: url("../img/b.png");\n}\n')
+            os.makedirs(os.path.join(origem, 'img'))
+            with open(os.path.join(origem, 'img', 'b.png'), 'wb') as arquivo:
+                arquivo.write(b'png')
+
+            with override_settings(
+                STATICFILES_DIRS=[origem], STATIC_ROOT=destino,
+                STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+                STORAGES={
+                    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                    'staticfiles': {'BACKEND': 'core.storage.EstaticosOtimizados'},
+                },
+            ):
+                call_command('collectstatic', interactive=False, verbosity=0)
+
+            with open(os.path.join(destino, 'staticfiles.json'), encoding='utf-8') as arquivo:
+                manifesto = json.load(arquivo)['paths']
+            self.assertRegex(manifesto['css/a.css'], r'^css/a\.[0-9a-f]{12}\.css$')
+            self.assertRegex(manifesto['img/b.png'], r'^img/b\.[0-9a-f]{12}\.png$')
+            with open(os.path.join(destino, manifesto['css/a.css']), encoding='utf-8') as arquivo:
+                self.assertEqual(arquivo.read(), f'.a{{background:url("../{manifesto["img/b.png"]}")}}')
+
+    @skipUnless(TEM_PILLOW, 'Pillow não instalado')
+    def test_gerar_variantes(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as pasta:
+            os.makedirs(os.path.join(pasta, 'img'))
+            Image.new('RGBA', (400, 200), (255, 0, 0, 255)).save(os.path.join(pasta, 'img', 'icone.png'))
+            try:
+                manifesto = gerar_variantes(pasta, ['img/icone.png'], larguras=(100, 200, 800))
+            finally:
+                carregar_variantes.cache_clear()
+
+            entrada = manifesto['img/icone.png']
+            self.assertEqual((entrada['largura'], entrada['altura']), (400, 200))
+            # Larguras acima do original ficam no tamanho original; o PNG é só o 2x
+            self.assertEqual(entrada['variantes']['png'], [[200, 'core/img/otimizadas/icone-200.png']])
+            for formato, variantes in entrada['variantes'].items():
+                if formato != 'png':
+                    self.assertEqual([l for l, _ in variantes], [100, 200, 400])
+                for largura, relativo in variantes:
+                    with Image.open(os.path.join(pasta, relativo)) as imagem:
+                        self.assertEqual(imagem.size, (largura, largura // 2))
+            with open(os.path.join(pasta, 'core/img/otimizadas/variantes.json'), encoding='utf-8') as arquivo:
+                self.assertEqual(json.load(arquivo), manifesto)
+
+    def test_imagem_responsiva(self):
+        from .templatetags.imagens import imagem_responsiva
+
+        # Sem variantes geradas: só o <img> com a imagem original
+        with mock.patch('core.templatetags.imagens.carregar_variantes', return_value={}):
+            self.assertEqual(
+                imagem_responsiva('core/img/aluno.png', 'Aluno'),
+                '<img src="/static/core/img/aluno.png" alt="Aluno" decoding="async" />',
+            )
+
+        # Sem AVIF (Pillow sem suporte): só a fonte WebP, e o PNG reduzido no <img>
+        variantes = {'core/img/aluno.png': {'largura': 640, 'altura': 320, 'variantes': {
+            'webp': [[160, 'core/img/otimizadas/aluno-160.webp'], [320, 'core/img/otimizadas/aluno-320.webp']],
+            'png': [[320, 'core/img/otimizadas/aluno-320.png']],
+        }}}
+        with mock.patch('core.templatetags.imagens.carregar_variantes', return_value=variantes):
+            self.assertEqual(
+                imagem_responsiva('core/img/aluno.png', 'Aluno & cia'),
+                '<picture><source type="image/webp" srcset="/static/core/img/otimizadas/aluno-160.webp 160w, '
+                '/static/core/img/otimizadas/aluno-320.webp 320w" sizes="160px" />'
+                '<img src="/static/core/img/otimizadas/aluno-320.png" width="320" height="160" '
+                'alt="Aluno &amp; cia" decoding="async" /></picture>',
+            )
@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 from .views import turma, turma_add1, turma_add2, disciplina, disciplina_add1, disciplina_add2
 
 urlpatterns = [
@@ -19,12 +19,14 @@ urlpatterns = [
     path('professores/excluir/<int:professor_id>/', views.excluir_professor, name='excluir_professor'),
     path('painel/professor/', views.painel_professor, name='painel_professor'),
     path('lancar-nota/<int:disciplina_id>/', views.lancar_nota, name='lancar_nota'),
+    path('notas/<int:disciplina_id>/<int:aluno_id>/', views.salvar_nota, name='salvar_nota'),
 
 
     #Discentes
     path('alunos/', views.listar_alunos, name='listar_alunos'),
     path('editar/perfil/aluno/', views.editar_perfil_aluno, name='editar_perfil_aluno'),
     path('alunos/cadastrar/', views.cadastrar_aluno, name='cadastrar_aluno'),
+    path('alunos/importar/', views.importar_alunos, name='importar_alunos'),
     path('alunos/editar/<int:aluno_id>/', views.editar_aluno, name='editar_aluno'),
     path('alunos/excluir/<int:aluno_id>/', views.excluir_aluno, name='excluir_aluno'),
 
@@ -45,7 +47,6 @@ urlpatterns = [
     path('gestores/', views.listar_gestores, name='listar_gestores'),
     path('gestores/cadastrar/', views.cadastrar_gestor, name='cadastrar_gestor'),
     path('gestores/excluir/<int:gestor_id>/', views.excluir_gestor, name='excluir_gestor'),
-    path('painel/gestor/', views.painel_gestor, name='painel_gestor'),
     path('gestores/<int:gestor_id>/editar/', views.editar_gestor, name='editar_gestor'),
 
 
@@ -74,6 +75,26 @@ urlpatterns = [
 
     path('painel/aluno/', views.painel_aluno, name='painel_aluno'),
 
+    # Exportação de notas (formato: csv, xlsx ou pdf)
+    path('exportar/turma/<int:turma_id>/<str:formato>/', views.exportar_notas_turma, name='exportar_notas_turma'),
+    path('exportar/disciplina/<int:disciplina_id>/<str:formato>/', views.exportar_notas_disciplina, name='exportar_notas_disciplina'),
+    path('exportar/boletim/<int:aluno_id>/<str:formato>/', views.exportar_boletim, name='exportar_boletim'),
+
+    # Relatórios da gestão (core/reports.py)
+    path('relatorios/turma/', views.relatorio_turma, name='relatorio_turma'),
+    path('relatorios/analise/', views.analise_notas, name='analise_notas'),
+
+    # Monitoramento (superusuário)
+    path('monitoramento/cache/', views.monitorar_cache, name='monitorar_cache'),
+    path('monitoramento/desempenho/', views.monitorar_desempenho, name='monitorar_desempenho'),
+
+    # API JSON somente leitura (core/api.py). ?campos=id,nome escolhe os campos; ETag/If-None-Match
+    path('api/turmas/', api.turmas, name='api_turmas'),
+    path('api/turmas/<int:turma_id>/alunos/', api.alunos_da_turma, name='api_alunos_da_turma'),
+    path('api/disciplinas/', api.disciplinas, name='api_disciplinas'),
+    path('api/disciplinas/<int:disciplina_id>/notas/', api.notas_da_disciplina, name='api_notas_da_disciplina'),
+    path('api/alunos/<int:aluno_id>/notas/', api.notas_do_aluno, name='api_notas_do_aluno'),
+
     #Diário
     path('turma/', turma, name="turma"),
     path('turma_add1/', turma_add1, name="turma_add1"),
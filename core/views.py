@@ -1,39 +1,53 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
 from django.contrib import messages
-from .models import Professor, Aluno, Disciplina, Turma, Nota, Gestor
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+from .models import Professor, Aluno, Disciplina, Turma, Gestor
 from .forms import (
     LoginForm, ProfessorForm, AlunoForm, DisciplinaForm, TurmaForm,
     NotaForm, EditarPerfilForm, EditarPerfilProfessorForm, EditarPerfilAlunoForm, GestorForm
 )
+from .backends import PAINEL_POR_PAPEL, EmailBackend, papel_da_sessao, papel_do_usuario
+from .counters import totais_painel
+from .fragments import estatisticas as estatisticas_fragmentos, fragmento
+from .hashers import hash_de_cadastro
+from .exports import ErroExportacao, linhas_notas, resposta_exportacao
+from .importers import ErroImportacao, importar_alunos as importar_alunos_planilha
+from .middleware import estatisticas as estatisticas_desempenho
+from .analytics import ErroAnalise, analise_notas as calcular_analise_notas
+from .pagination import paginar
+from .reports import relatorio_turma as calcular_relatorio_turma
+from .search import buscar
+from .services import (
+    ConflitoNota, carregar_matriz_notas, disciplinas_com_estatisticas, media_aprovacao, parse_nota,
+    salvar_nota_celula, salvar_notas,
+)
 
 # -------------------- LOGIN / LOGOUT --------------------
 def login_view(request):
     if request.user.is_authenticated:
-        if request.user.is_superuser:
-            return redirect('painel_super')
-        elif hasattr(request.user, 'professor'):
-            return redirect('painel_professor')
-        elif hasattr(request.user, 'aluno'):
-            return redirect('painel_aluno')
-        elif hasattr(request.user, 'gestor'):
-            return redirect('painel_gestor')
+        papel = papel_da_sessao(request)
+        if papel:
+            return redirect(PAINEL_POR_PAPEL[papel])
 
     if request.method == 'POST':
         form = LoginForm(request.POST)
         if form.is_valid():
             user = form.get_user()
             login(request, user)
-            if user.is_superuser:
-                return redirect('painel_super')
-            elif hasattr(user, 'professor'):
-                return redirect('painel_professor')
-            elif hasattr(user, 'aluno'):
-                return redirect('painel_aluno')
-            elif hasattr(user, 'gestor'):
-                return redirect('painel_gestor')  # <- adicionado
+            # O usuário veio do EmailBackend com professor/aluno/gestor já carregados
+            papel = papel_do_usuario(user)
+            request.session['papel'] = papel
+            if papel:
+                return redirect(PAINEL_POR_PAPEL[papel])
     else:
         form = LoginForm()
 
@@ -56,10 +70,7 @@ def is_superuser(user):
 def painel_super(request):
     return render(request, 'core/painel_super.html', {
         'usuario': request.user,
-        'total_professores': Professor.objects.count(),
-        'total_alunos': Aluno.objects.count(),
-        'total_turmas': Turma.objects.count(),
-        'total_disciplinas': Disciplina.objects.count(),
+        **totais_painel(),
     })
 
 
@@ -94,8 +105,11 @@ def editar_perfil(request):
 @user_passes_test(is_superuser)
 def listar_professores(request):
     query = request.GET.get('q', '')
-    professores = Professor.objects.filter(nome_completo__icontains=query) if query else Professor.objects.all()
-    return render(request, 'core/listar_professores.html', {'professores': professores, 'query': query})
+    professores = Professor.objects.select_related('user')
+    if query:
+        professores = buscar(professores, 'professor', query)
+    pagina = paginar(professores, request, ('nome_completo', 'id'))
+    return render(request, 'core/listar_professores.html', {'professores': pagina.itens, 'pagina': pagina, 'query': query})
 
 
 @login_required
@@ -109,10 +123,10 @@ def cadastrar_professor(request):
 
         if not nome_completo or not email or not senha:
             erro = 'Preencha todos os campos obrigatórios.'
-        elif User.objects.filter(email=email).exists():
+        elif EmailBackend.por_email(User.objects.all(), email).exists():
             erro = 'Já existe um usuário com este e-mail.'
         else:
-            user = User.objects.create_user(username=email, email=email, password=senha)
+            user = User.objects.create(username=email, email=email, password=hash_de_cadastro(senha))
             Professor.objects.create(user=user, nome_completo=nome_completo)
             messages.success(request, f'Professor {nome_completo} cadastrado com sucesso!')
             return redirect('listar_professores')
@@ -136,7 +150,8 @@ def editar_professor(request, professor_id):
             user.email = email
             user.username = email
             if senha:
-                user.set_password(senha)
+                # Senha definida pelo administrador: hash provisório até o próximo login
+                user.password = hash_de_cadastro(senha)
             user.save()
             professor.nome_completo = nome_completo
             professor.save()
@@ -150,34 +165,11 @@ def editar_professor(request, professor_id):
 @user_passes_test(is_superuser)
 def excluir_professor(request, professor_id):
     professor = get_object_or_404(Professor, id=professor_id)
+    # Excluir o User já exclui o perfil em cascata
     professor.user.delete()
-    professor.delete()
     messages.success(request, 'Professor removido.')
     return redirect('listar_professores')
 
-# ---- GESTOR (Painel da Gestão Escolar) ----
-@login_required
-def painel_gestor(request):
-    if not hasattr(request.user, 'gestor'):
-        return redirect('login')
-
-    gestor = request.user.gestor
-    cargo = gestor.cargo
-
-    total_professores = Professor.objects.count()
-    total_alunos = Aluno.objects.count()
-    total_turmas = Turma.objects.count()
-    total_disciplinas = Disciplina.objects.count()
-
-    return render(request, 'core/painel_gestor.html', {
-        'gestor': gestor,
-        'cargo': cargo,
-        'total_professores': total_professores,
-        'total_alunos': total_alunos,
-        'total_turmas': total_turmas,
-        'total_disciplinas': total_disciplinas,
-    })
-
 # ---- GESTORES ----
 @login_required
 @user_passes_test(lambda u: u.is_superuser or (hasattr(u, 'gestor') and u.gestor.cargo in ['diretor', 'vice_diretor']))
@@ -191,7 +183,7 @@ def cadastrar_gestor(request):
             cargo = form.cleaned_data['cargo']
 
             # Cria user e gestor
-            user = User.objects.create_user(username=email, email=email, password=senha)
+            user = User.objects.create(username=email, email=email, password=hash_de_cadastro(senha))
             Gestor.objects.create(user=user, nome_completo=nome_completo, cargo=cargo)
             messages.success(request, f"{cargo.title()} {nome_completo} cadastrado com sucesso!")
             return redirect('listar_gestores')
@@ -211,34 +203,26 @@ def painel_gestor(request):
     gestor = request.user.gestor
     cargo = gestor.cargo
 
-    total_professores = Professor.objects.count()
-    total_alunos = Aluno.objects.count()
-    total_turmas = Turma.objects.count()
-    total_disciplinas = Disciplina.objects.count()
-
     return render(request, 'core/painel_gestor.html', {
         'gestor': gestor,
         'cargo': cargo,
-        'total_professores': total_professores,
-        'total_alunos': total_alunos,
-        'total_turmas': total_turmas,
-        'total_disciplinas': total_disciplinas,
+        **totais_painel(),
     })
 
 
 @login_required
 @user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
 def listar_gestores(request):
-    gestores = Gestor.objects.select_related('user').all()
-    return render(request, 'core/listar_gestores.html', {'gestores': gestores})
+    pagina = paginar(Gestor.objects.select_related('user'), request, ('nome_completo', 'id'))
+    return render(request, 'core/listar_gestores.html', {'gestores': pagina.itens, 'pagina': pagina})
 
 
 @login_required
 @user_passes_test(lambda u: u.is_superuser or (hasattr(u, 'gestor') and u.gestor.cargo in ['diretor', 'vice_diretor']))
 def excluir_gestor(request, gestor_id):
     gestor = get_object_or_404(Gestor, id=gestor_id)
+    # Excluir o User já exclui o perfil em cascata
     gestor.user.delete()
-    gestor.delete()
     messages.success(request, 'Gestor excluído com sucesso.')
     return redirect('listar_gestores')
 
@@ -280,8 +264,11 @@ def editar_gestor(request, gestor_id):
 @user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
 def listar_alunos(request):
     query = request.GET.get('q', '')
-    alunos = Aluno.objects.filter(nome_completo__icontains=query) if query else Aluno.objects.all()
-    return render(request, 'core/listar_alunos.html', {'alunos': alunos, 'query': query})
+    alunos = Aluno.objects.select_related('user', 'turma')
+    if query:
+        alunos = buscar(alunos, 'aluno', query)
+    pagina = paginar(alunos, request, ('nome_completo', 'id'))
+    return render(request, 'core/listar_alunos.html', {'alunos': pagina.itens, 'pagina': pagina, 'query': query})
 
 
 @login_required
@@ -297,10 +284,10 @@ def cadastrar_aluno(request):
 
         if not nome_completo or not idade or not email or not senha or not turma_id:
             erro = 'Preencha todos os campos obrigatórios.'
-        elif User.objects.filter(email=email).exists():
+        elif EmailBackend.por_email(User.objects.all(), email).exists():
             erro = 'Já existe um usuário com este e-mail.'
         else:
-            user = User.objects.create_user(username=email, email=email, password=senha)
+            user = User.objects.create(username=email, email=email, password=hash_de_cadastro(senha))
             turma = get_object_or_404(Turma, id=turma_id)
             Aluno.objects.create(user=user, nome_completo=nome_completo, idade=idade, turma=turma)
             messages.success(request, f'Aluno {nome_completo} cadastrado com sucesso!')
@@ -310,6 +297,26 @@ def cadastrar_aluno(request):
     return render(request, 'core/cadastrar_aluno.html', {'turmas': turmas, 'erro': erro})
 
 
+@login_required
+@user_passes_test(is_superuser)
+def importar_alunos(request):
+    resultado = None
+    erro = None
+    if request.method == 'POST':
+        arquivo = request.FILES.get('arquivo')
+        if not arquivo:
+            erro = 'Selecione um arquivo CSV ou XLSX.'
+        else:
+            try:
+                resultado = importar_alunos_planilha(arquivo.file, arquivo.name)
+            except ErroImportacao as e:
+                erro = str(e)
+            else:
+                messages.success(request, f'{resultado.criados} alunos importados.')
+
+    return render(request, 'core/importar_alunos.html', {'resultado': resultado, 'erro': erro})
+
+
 @login_required
 @user_passes_test(is_superuser)
 def editar_aluno(request, aluno_id):
@@ -328,7 +335,8 @@ def editar_aluno(request, aluno_id):
             user.email = email
             user.username = email
             if senha:
-                user.set_password(senha)
+                # Senha definida pelo administrador: hash provisório até o próximo login
+                user.password = hash_de_cadastro(senha)
             user.save()
 
             aluno.nome_completo = nome_completo
@@ -346,8 +354,8 @@ def editar_aluno(request, aluno_id):
 @user_passes_test(is_superuser)
 def excluir_aluno(request, aluno_id):
     aluno = get_object_or_404(Aluno, id=aluno_id)
+    # Excluir o User já exclui o perfil em cascata
     aluno.user.delete()
-    aluno.delete()
     messages.success(request, 'Aluno removido.')
     return redirect('listar_alunos')
 
@@ -394,13 +402,24 @@ def editar_perfil_aluno(request):
 @login_required
 def listar_disciplinas(request):
     query = request.GET.get('q', '')
-    if query:
-        turmas = Turma.objects.filter(nome__icontains=query).prefetch_related('disciplina_set__professor')
-    else:
-        turmas = Turma.objects.prefetch_related('disciplina_set__professor').all()
 
+    def gerar():
+        turmas = Turma.objects.prefetch_related('disciplina_set__professor__user')
+        if query:
+            turmas = buscar(turmas, 'turma', query)
+        pagina = paginar(turmas, request, ('nome', 'id'))
+        return render_to_string('core/fragmentos/disciplinas_por_turma.html', {
+            'turmas': pagina.itens,
+            'pagina': pagina,
+        }, request)
+
+    # Busca e página fazem parte da chave: cada combinação é um fragmento
+    disciplinas_por_turma = fragmento(
+        'disciplinas_por_turma', ['turmas', 'disciplinas', 'professores'], gerar,
+        variacao=request.GET.urlencode(),
+    )
     return render(request, 'core/listar_disciplinas.html', {
-        'turmas': turmas,
+        'disciplinas_por_turma': disciplinas_por_turma,
         'query': query,
     })
 
@@ -417,15 +436,18 @@ def cadastrar_disciplina(request):
         professor_id = request.POST['professor']
         turma_id = request.POST['turma']
 
-        if Disciplina.objects.filter(nome=nome, professor_id=professor_id, turma_id=turma_id).exists():
+        professor = get_object_or_404(Professor, id=professor_id)
+        turma = get_object_or_404(Turma, id=turma_id)
+        # A restrição única (turma, nome, professor) decide se já existe
+        try:
+            with transaction.atomic():
+                Disciplina.objects.create(nome=nome, professor=professor, turma=turma)
+        except IntegrityError:
             erro = 'Essa disciplina já existe para este professor nessa turma.'
         else:
-            professor = get_object_or_404(Professor, id=professor_id)
-            turma = get_object_or_404(Turma, id=turma_id)
-            Disciplina.objects.create(nome=nome, professor=professor, turma=turma)
             return redirect('listar_disciplinas')
 
-    professores = Professor.objects.all()
+    professores = Professor.objects.select_related('user')
     turmas = Turma.objects.all()
     return render(request, 'core/cadastrar_disciplina.html', {
         'professores': professores,
@@ -442,19 +464,26 @@ def editar_disciplina(request, disciplina_id):
 
     disciplina = get_object_or_404(Disciplina, id=disciplina_id)
 
+    erro = None
     if request.method == 'POST':
         disciplina.nome = request.POST['nome']
         disciplina.professor = get_object_or_404(Professor, id=request.POST['professor'])
         disciplina.turma = get_object_or_404(Turma, id=request.POST['turma'])
-        disciplina.save()
-        return redirect('listar_disciplinas')
+        try:
+            with transaction.atomic():
+                disciplina.save()
+        except IntegrityError:
+            erro = 'Essa disciplina já existe para este professor nessa turma.'
+        else:
+            return redirect('listar_disciplinas')
 
-    professores = Professor.objects.all()
+    professores = Professor.objects.select_related('user')
     turmas = Turma.objects.all()
     return render(request, 'core/editar_disciplina.html', {
         'disciplina': disciplina,
         'professores': professores,
-        'turmas': turmas
+        'turmas': turmas,
+        'erro': erro,
     })
 
 
@@ -478,13 +507,14 @@ def listar_turmas(request):
         return redirect('login')
 
     query = request.GET.get('q', '')
+    turmas = Turma.objects.all()
     if query:
-        turmas = Turma.objects.filter(nome__icontains=query)
-    else:
-        turmas = Turma.objects.all()
+        turmas = buscar(turmas, 'turma', query)
+    pagina = paginar(turmas, request, ('nome', 'id'))
 
     return render(request, 'core/listar_turmas.html', {
-        'turmas': turmas,
+        'turmas': pagina.itens,
+        'pagina': pagina,
         'query': query,
     })
 
@@ -498,10 +528,12 @@ def cadastrar_turma(request):
 
     if request.method == 'POST':
         nome = request.POST['nome']
-        if Turma.objects.filter(nome=nome).exists():
+        try:
+            with transaction.atomic():
+                Turma.objects.create(nome=nome)
+        except IntegrityError:
             erro = 'Essa turma já existe.'
         else:
-            Turma.objects.create(nome=nome)
             return redirect('listar_turmas')
 
     return render(request, 'core/cadastrar_turma.html', {'erro': erro})
@@ -515,12 +547,18 @@ def editar_turma(request, turma_id):
 
     turma = get_object_or_404(Turma, id=turma_id)
 
+    erro = None
     if request.method == 'POST':
         turma.nome = request.POST['nome']
-        turma.save()
-        return redirect('listar_turmas')
+        try:
+            with transaction.atomic():
+                turma.save()
+        except IntegrityError:
+            erro = 'Essa turma já existe.'
+        else:
+            return redirect('listar_turmas')
 
-    return render(request, 'core/editar_turma.html', {'turma': turma})
+    return render(request, 'core/editar_turma.html', {'turma': turma, 'erro': erro})
 
 
 @login_required
@@ -540,8 +578,24 @@ def painel_professor(request):
     if not hasattr(request.user, 'professor'):
         return redirect('login')
     professor = request.user.professor
-    disciplinas = Disciplina.objects.filter(professor=professor)
-    return render(request, 'core/painel_professor.html', {'disciplinas': disciplinas})
+
+    def gerar():
+        disciplinas = disciplinas_com_estatisticas(
+            Disciplina.objects.filter(professor=professor).order_by('turma__nome', 'nome', 'id')
+        )
+        return render_to_string('core/fragmentos/disciplinas_professor.html', {
+            'disciplinas': disciplinas,
+            'media_aprovacao': media_aprovacao(),
+        }, request)
+
+    # As estatísticas mudam com as notas das disciplinas do professor e com os alunos das
+    # turmas delas; notas de outros professores não invalidam este fragmento
+    disciplinas = list(Disciplina.objects.filter(professor=professor).order_by('id').values_list('id', 'turma_id'))
+    escopos = [f'professor:{professor.id}']
+    escopos += [f'disciplina:{d}' for d, _ in disciplinas]
+    escopos += [f'turma:{t}' for t in sorted({t for _, t in disciplinas})]
+    disciplinas_professor = fragmento('disciplinas_professor', escopos, gerar, variacao=str(media_aprovacao()))
+    return render(request, 'core/painel_professor.html', {'disciplinas_professor': disciplinas_professor})
 
     
 
@@ -569,38 +623,79 @@ def editar_perfil_professor(request):
 
 @login_required
 def lancar_nota(request, disciplina_id):
-    disciplina = get_object_or_404(Disciplina, id=disciplina_id)
-    alunos = Aluno.objects.filter(turma=disciplina.turma)
+    disciplina = get_object_or_404(Disciplina.objects.select_related('turma'), id=disciplina_id)
 
     if request.method == 'POST':
-        for aluno in alunos:
-            nota_obj, _ = Nota.objects.get_or_create(aluno=aluno, disciplina=disciplina)
-
-            for i in range(1, 5):
-                campo = f'nota{i}_{aluno.id}'
-                valor_str = request.POST.get(campo)
-                if valor_str and valor_str.strip() != '':
-                    try:
-                        valor = float(valor_str)
-                        if 0 <= valor <= 10:
-                            setattr(nota_obj, f'nota{i}', valor)
-                    except ValueError:
-                        pass
-                # Se o campo veio vazio ou não existe, não altera o campo para manter a nota antiga
-
-            nota_obj.save()
+        resultado = salvar_notas(disciplina, request.POST)
+        messages.success(
+            request,
+            f'Notas salvas: {resultado.criadas} novas, {resultado.atualizadas} atualizadas, '
+            f'{resultado.inalteradas} sem alteração.'
+        )
+        if resultado.conflitos:
+            nomes = Aluno.objects.filter(id__in=resultado.conflitos).order_by('nome_completo').values_list('nome_completo', flat=True)
+            messages.warning(
+                request,
+                'As notas destes alunos foram alteradas por outra pessoa e não foram salvas; '
+                f'confira os valores atuais e lance de novo: {", ".join(nomes)}.'
+            )
 
         # Fica na mesma página após salvar
         return redirect(request.path)
 
-    notas_dict = {}
-    for aluno in alunos:
-        nota_obj = Nota.objects.filter(aluno=aluno, disciplina=disciplina).first()
-        notas_dict[aluno.id] = nota_obj
+    matriz = carregar_matriz_notas(
+        Aluno.objects.filter(turma_id=disciplina.turma_id).order_by('nome_completo', 'id'), [disciplina],
+    )
+
+    return render(request, 'core/lancar_nota.html', {
+        'disciplina': disciplina,
+        'alunos': matriz.alunos,
+        'notas_dict': matriz.notas_da_disciplina(disciplina.id),
+    })
+
+
 
-    return render(request, 'core/lancar_nota.html', {'disciplina': disciplina, 'alunos': alunos, 'notas_dict': notas_dict})
+def _nota_json(nota):
+    if nota is None:
+        return {'nota1': None, 'nota2': None, 'nota3': None, 'nota4': None, 'media': None, 'versao': 0}
+    return {
+        'nota1': nota.nota1, 'nota2': nota.nota2, 'nota3': nota.nota3, 'nota4': nota.nota4,
+        'media': nota.media(), 'versao': nota.versao,
+    }
 
 
+@login_required
+@require_http_methods(['PATCH'])
+def salvar_nota(request, disciplina_id, aluno_id):
+    """
+    Salvamento automático de uma célula de lancar_nota (core/static/core/js/lancar_nota.js).
+    Corpo JSON: {"bimestre": 1-4, "valor": "7.5" ou "" para apagar, "versao": versão lida}.
+    Responde a nota atualizada, ou 409 com a nota atual se outra pessoa gravou antes.
+    """
+    disciplina = get_object_or_404(Disciplina, id=disciplina_id)
+    professor = getattr(request.user, 'professor', None)
+    if not (request.user.is_superuser or (professor and disciplina.professor_id == professor.id)):
+        return JsonResponse({'erro': 'Sem permissão.'}, status=403)
+
+    try:
+        dados = json.loads(request.body)
+        bimestre = int(dados['bimestre'])
+        versao = int(dados.get('versao') or 0)
+        texto = str(dados.get('valor') or '').strip()
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'erro': 'Requisição inválida.'}, status=400)
+    valor = parse_nota(texto)
+    if not 1 <= bimestre <= 4 or (texto and valor is None):
+        return JsonResponse({'erro': 'A nota deve ser um número de 0 a 10.'}, status=400)
+
+    try:
+        nota = salvar_nota_celula(disciplina, aluno_id, bimestre, valor, versao)
+    except ConflitoNota as e:
+        return JsonResponse({'erro': str(e), 'nota': _nota_json(e.nota_atual)}, status=409)
+    except Aluno.DoesNotExist:
+        return JsonResponse({'erro': 'Aluno não encontrado nesta turma.'}, status=404)
+    return JsonResponse({'nota': _nota_json(nota)})
+
 
 # ALUNO
 @login_required
@@ -610,19 +705,110 @@ def painel_aluno(request):
 
     aluno = request.user.aluno
 
-    # Todas as disciplinas da turma do aluno
-    disciplinas = Disciplina.objects.filter(turma=aluno.turma)
+    def gerar():
+        # Todas as disciplinas da turma do aluno, com as notas carregadas de uma vez
+        matriz = carregar_matriz_notas([aluno], Disciplina.objects.filter(turma_id=aluno.turma_id))
+        return render_to_string('core/fragmentos/notas_aluno.html', {
+            'aluno': aluno,
+            'disciplinas': matriz.disciplinas,
+            'notas_dict': matriz.notas_do_aluno(aluno.id),
+        }, request)
 
-    # Monta um dicionário: disciplina_id -> Nota ou None
-    notas_dict = {}
-    for disciplina in disciplinas:
-        nota = Nota.objects.filter(aluno=aluno, disciplina=disciplina).first()
-        notas_dict[disciplina.id] = nota
+    notas_aluno = fragmento('notas_aluno', [f'aluno:{aluno.id}', f'turma:{aluno.turma_id}'], gerar)
+    return render(request, 'core/painel_aluno.html', {'aluno': aluno, 'notas_aluno': notas_aluno})
 
-    return render(request, 'core/painel_aluno.html', {
-        'aluno': aluno,
-        'disciplinas': disciplinas,
-        'notas_dict': notas_dict,
+# EXPORTAÇÃO DE NOTAS
+def _exportar(request, linhas, formato, nome_arquivo, titulo='', com_aluno=True):
+    try:
+        return resposta_exportacao(linhas, formato, nome_arquivo, titulo, com_aluno)
+    except ErroExportacao as e:
+        messages.error(request, str(e))
+        return redirect(request.META.get('HTTP_REFERER') or 'login')
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+def exportar_notas_turma(request, turma_id, formato):
+    turma = get_object_or_404(Turma, id=turma_id)
+    return _exportar(
+        request, linhas_notas(disciplina__turma=turma), formato, f'notas_{slugify(turma.nome)}', f'Notas - {turma.nome}',
+    )
+
+
+@login_required
+def exportar_notas_disciplina(request, disciplina_id, formato):
+    disciplina = get_object_or_404(Disciplina.objects.select_related('professor', 'turma'), id=disciplina_id)
+    user = request.user
+    if not (user.is_superuser or hasattr(user, 'gestor') or disciplina.professor.user_id == user.id):
+        return redirect('login')
+    nome_arquivo = f'notas_{slugify(disciplina.nome)}_{slugify(disciplina.turma.nome)}'
+    titulo = f'Notas - {disciplina.nome} ({disciplina.turma.nome})'
+    return _exportar(request, linhas_notas(disciplina=disciplina), formato, nome_arquivo, titulo)
+
+
+@login_required
+def exportar_boletim(request, aluno_id, formato):
+    aluno = get_object_or_404(Aluno, id=aluno_id)
+    user = request.user
+    if not (user.is_superuser or hasattr(user, 'gestor') or aluno.user_id == user.id):
+        return redirect('login')
+    return _exportar(
+        request, linhas_notas(aluno=aluno), formato,
+        f'boletim_{slugify(aluno.nome_completo)}', f'Boletim - {aluno.nome_completo}', com_aluno=False,
+    )
+
+# RELATÓRIOS
+@login_required
+@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+def relatorio_turma(request):
+    turmas = list(Turma.objects.order_by('nome', 'id').values_list('id', 'nome'))
+    turma_id = request.GET.get('turma', '')
+    turma = next((t for t in turmas if str(t[0]) == turma_id), turmas[0] if turmas else None)
+
+    relatorio = ''
+    if turma:
+        media = media_aprovacao()
+
+        def gerar():
+            return render_to_string('core/fragmentos/relatorio_turma.html', {
+                **calcular_relatorio_turma(turma[0], media),
+                'media_aprovacao': media,
+            }, request)
+
+        # turma:<id> muda com a turma, seus alunos e suas disciplinas; disciplina:<id> com as notas
+        disciplinas = Disciplina.objects.filter(turma_id=turma[0]).order_by('id').values_list('id', flat=True)
+        escopos = [f'turma:{turma[0]}', *[f'disciplina:{d}' for d in disciplinas]]
+        relatorio = fragmento('relatorio_turma', escopos, gerar, variacao=str(media))
+    return render(request, 'core/relatorio_turma.html', {
+        'turmas': turmas,
+        'turma': turma,
+        'relatorio': relatorio,
+    })
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser or hasattr(u, 'gestor'))
+def analise_notas(request):
+    analise = erro = None
+    try:
+        analise = calcular_analise_notas()
+    except ErroAnalise as e:
+        erro = str(e)
+    return render(request, 'core/analise_notas.html', {'analise': analise, 'erro': erro})
+
+# MONITORAMENTO
+@user_passes_test(is_superuser)
+def monitorar_cache(request):
+    return JsonResponse({'fragmentos': estatisticas_fragmentos()})
+
+
+@user_passes_test(is_superuser)
+def monitorar_desempenho(request):
+    if request.method == 'POST':
+        estatisticas_desempenho.limpar()
+        return redirect('monitorar_desempenho')
+    return render(request, 'core/monitorar_desempenho.html', {
+        'rotas': estatisticas_desempenho.resumo(),
+        'amostras': estatisticas_desempenho.amostras,
     })
 
 #Diário
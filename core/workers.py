@@ -0,0 +1,19 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _inicializar_processo():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'notas.settings')
+    django.setup()
+
+
+def pool_de_processos(processos=None):
+    """
+    ProcessPoolExecutor com o Django configurado em cada processo. Usa spawn em todas
+    as plataformas: com fork os filhos herdariam a conexão aberta do banco do processo pai.
+    """
+    return ProcessPoolExecutor(
+        processos, mp_context=multiprocessing.get_context('spawn'), initializer=_inicializar_processo,
+    )